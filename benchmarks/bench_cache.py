@@ -0,0 +1,78 @@
+"""Cost of the hot catalogue reads of the database repository, with and without a CachingRepository in front of it.
+
+Run from the project directory with:  python -m benchmarks.bench_cache [requests]
+
+The shipped catalogue is loaded into a temporary SQLite file. Each simulated request starts a new session, as the app
+does, and makes the reads of a catalogue page, a podcast page and a search; the podcast and the page vary so that the
+caches see a realistic mix of hits and misses. Reports the time per request and the caches' hit rates.
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from podcast.adapters import database_repository, repository_populate
+from podcast.adapters.caching_repository import CachingRepository
+from podcast.adapters.orm import map_model_to_tables, mapper_registry
+from utils import get_project_root
+
+DATA_PATH = get_project_root() / "podcast" / "adapters" / "data"
+PODCAST_CARD_LOAD = ('author', 'categories')
+SEARCH_TERMS = ('news', 'history', 'comedy', 'music', 'sport')
+
+
+def simulate_request(repository, rng: random.Random):
+    repository.reset_session()
+    # Popular pages are asked for far more often than the rest.
+    after_id = rng.choice((None, None, None, 10, 20, rng.randrange(0, 1000, 10)))
+    podcast_id = int(rng.paretovariate(1.2)) % 1000 + 1
+    podcasts = repository.get_podcasts_page(after_id, 10, load=PODCAST_CARD_LOAD)
+    repository.get_rating_summaries([podcast.id for podcast in podcasts])
+    repository.get_number_of_podcasts()
+    podcast = repository.get_podcast(podcast_id)
+    if podcast is not None:
+        [category.name for category in podcast.categories]
+        repository.get_episodes_page(podcast_id, None, 3)
+        repository.get_rating_summary(podcast_id)
+    term = rng.choice(SEARCH_TERMS)
+    repository.search_podcasts(term, 'Title', 10, 0)
+    repository.get_number_of_search_results(term, 'Title')
+
+
+def time_requests(repository, requests: int) -> float:
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(requests):
+        simulate_request(repository, rng)
+    return (time.perf_counter() - start) / requests * 1000
+
+
+def main(requests: int = 2000):
+    with tempfile.TemporaryDirectory() as directory:
+        clear_mappers()
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        mapper_registry.metadata.create_all(engine)
+        map_model_to_tables()
+        repository = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine), full_text_search=True)
+        repository_populate.populate(DATA_PATH, repository, database_mode=True, trusted_data=True)
+        repository.create_search_index(rebuild=True)
+
+        print(f"{requests} simulated requests")
+        print(f"  {'database repository':<24} {time_requests(repository, requests):6.2f} ms/request")
+        cached = CachingRepository(repository)
+        print(f"  {'with CachingRepository':<24} {time_requests(cached, requests):6.2f} ms/request")
+        for method, stats in cached.cache_stats().items():
+            reads = stats['hits'] + stats['misses']
+            if reads:
+                print(f"    {method:<30} {stats['hits'] / reads:6.1%} hits of {reads}")
+        repository.close_session()
+        engine.dispose()
+        clear_mappers()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
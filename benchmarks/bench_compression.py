@@ -0,0 +1,50 @@
+"""Bytes on the wire and CPU time per request of the main pages, uncompressed and gzip compressed.
+
+Run from the project directory with:  python -m benchmarks.bench_compression [requests]
+
+The app is built with the memory repository and the shipped catalogue, once for each compression level. Every page is
+requested by a client that takes gzip; level 0 sends it uncompressed. Reports the size of each response body and the
+process time spent per request, which includes building the page.
+"""
+import sys
+import time
+
+from podcast import create_app
+from utils import get_project_root
+
+DATA_PATH = get_project_root() / "podcast" / "adapters" / "data"
+PAGES = ('/', '/browse', '/browse?after=500', '/show_description/1?view_reviews_for=1', '/show_description/131',
+         '/search?search_term=news&search_filter=Title')
+LEVELS = (0, 1, 6, 9)
+
+
+def measure(level: int, requests: int) -> dict:
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': DATA_PATH,
+        'COMPRESSION_LEVEL': level,
+    })
+    client = app.test_client()
+    results = {}
+    for page in PAGES:
+        # Revisits would be answered with 304 Not Modified; every request here builds the page.
+        size = len(client.get(page, headers={'Accept-Encoding': 'gzip'}).data)
+        start = time.process_time()
+        for _ in range(requests):
+            client.get(page, headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"none"'})
+        results[page] = (size, (time.process_time() - start) / requests * 1000)
+    return results
+
+
+def main(requests: int = 200):
+    print(f"{requests} requests per page and level")
+    print(f"  {'page':<42}" + ''.join(f"{f'level {level}':>22}" for level in LEVELS))
+    by_level = {level: measure(level, requests) for level in LEVELS}
+    for page in PAGES:
+        print(f"  {page:<42}" + ''.join(f"{by_level[level][page][0]:>9} B {by_level[level][page][1]:6.2f} ms"
+                                         for level in LEVELS))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
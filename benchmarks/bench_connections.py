@@ -0,0 +1,63 @@
+"""Connection overhead per request for the database repository's pool modes.
+
+Run from the project directory with:  python -m benchmarks.bench_connections [requests]
+
+Each simulated request does what a page view does: take a fresh session, read a podcast and one page of its
+episodes, and close the session again.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from podcast.adapters import database_repository, repository_populate
+from podcast.adapters.database_repository import POOL_MODES, create_database_engine
+from podcast.adapters.orm import map_model_to_tables, mapper_registry
+from utils import get_project_root
+
+DATA_PATH = get_project_root() / "podcast" / "adapters" / "data"
+
+
+def populate_database(database_uri: str):
+    clear_mappers()
+    engine = create_database_engine(database_uri)
+    mapper_registry.metadata.create_all(engine)
+    map_model_to_tables()
+    repo = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+    repository_populate.populate(DATA_PATH, repo, database_mode=True, trusted_data=True)
+    engine.dispose()
+
+
+def time_requests(database_uri: str, pool_mode: str, requests: int) -> float:
+    engine = create_database_engine(database_uri, pool_mode=pool_mode)
+    repo = database_repository.SqlAlchemyRepository(sessionmaker(autocommit=False, autoflush=True, bind=engine))
+
+    start = time.perf_counter()
+    for i in range(requests):
+        repo.reset_session()
+        podcast = repo.get_podcast(i % 100 + 1)
+        podcast.episodes[:3]
+        repo.close_session()
+    elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    return elapsed
+
+
+def main(requests: int = 2000):
+    with tempfile.TemporaryDirectory() as directory:
+        database_uri = f"sqlite:///{Path(directory) / 'bench.db'}"
+        populate_database(database_uri)
+
+        for pool_mode in POOL_MODES:
+            # One untimed pass so both modes start with the database file in the OS cache.
+            time_requests(database_uri, pool_mode, 100)
+            elapsed = time_requests(database_uri, pool_mode, requests)
+            print(f"{pool_mode:>6} pool: {requests} requests in {elapsed:.2f}s, "
+                  f"{elapsed / requests * 1000:.3f} ms per request")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
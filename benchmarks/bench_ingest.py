@@ -0,0 +1,79 @@
+"""Construction cost per row for the podcasts and episodes of the shipped catalogue.
+
+Run from the project directory with:  python -m benchmarks.bench_ingest [repeats]
+
+The csv files are parsed once; only building the domain objects from the parsed rows is timed, for three paths: the
+validating constructors, batch validation followed by from_trusted_rows (untrusted csv), and from_trusted_rows alone
+(trusted data). Each path is timed with the classes unmapped, as in memory mode, and mapped, as in database mode.
+"""
+import sys
+import time
+
+from sqlalchemy.orm import clear_mappers
+
+from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.adapters.orm import map_model_to_tables
+from podcast.domainmodel.model import Episode, Podcast, validate_episode_rows, validate_podcast_rows
+from utils import get_project_root
+
+DATA_PATH = get_project_root() / "podcast" / "adapters" / "data"
+
+
+def read_rows():
+    reader = CSVDataReader(trusted=True)
+    reader.read_podcasts(DATA_PATH)
+    podcast_rows = [(podcast.id, podcast.author, podcast.title, podcast.image, podcast.description, podcast.website,
+                     podcast.itunes_id, podcast.language) for podcast in reader.dataset_of_podcasts]
+    episode_rows = [row for batch in reader.iter_episode_rows(DATA_PATH) for row in batch]
+    return podcast_rows, episode_rows
+
+
+def construct(cls, rows):
+    return [cls(*row) for row in rows]
+
+
+def validate_and_build(cls, rows):
+    (validate_podcast_rows if cls is Podcast else validate_episode_rows)(rows)
+    return cls.from_trusted_rows(rows)
+
+
+def build_trusted(cls, rows):
+    return cls.from_trusted_rows(rows)
+
+
+PATHS = (('constructor', construct), ('validated batch', validate_and_build), ('trusted', build_trusted))
+
+
+def time_path(build, cls, rows, repeats: int) -> float:
+    # Best of the repeats, in microseconds per row.
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        build(cls, rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(rows) * 1_000_000
+
+
+def report(label: str, repeats: int):
+    # The rows are read again for each mode, as the authors and podcasts they refer to must be mapped or not to match.
+    podcast_rows, episode_rows = read_rows()
+    print(f"{label}: {len(podcast_rows)} podcasts, {len(episode_rows)} episodes, best of {repeats}")
+    for name, build in PATHS:
+        podcast_cost = time_path(build, Podcast, podcast_rows, repeats)
+        episode_cost = time_path(build, Episode, episode_rows, repeats)
+        print(f"  {name:<16} podcast {podcast_cost:6.2f} us/row   episode {episode_cost:6.2f} us/row")
+
+
+def main(repeats: int = 5):
+    report("unmapped (memory mode)", repeats)
+
+    map_model_to_tables()
+    try:
+        report("mapped (database mode)", repeats)
+    finally:
+        clear_mappers()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
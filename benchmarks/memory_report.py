@@ -0,0 +1,77 @@
+"""Memory used by the domain objects of the shipped catalogue.
+
+Run from the project directory with:  python -m benchmarks.memory_report
+
+Loads podcasts.csv and episodes.csv the way memory mode does and reports, per domain class, the number of instances
+and the bytes taken by each instance itself (the object plus its attribute dict, if it has one), along with the total
+traced by tracemalloc for the whole load and the process's peak RSS. For comparison, each instance is also measured as
+it was before the classes had slots: an object of a plain class holding the same attributes in its dict.
+"""
+import gc
+import resource
+import sys
+import tracemalloc
+from collections import defaultdict
+
+from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.domainmodel.model import Author, Category, Episode, Podcast
+from utils import get_project_root
+
+DATA_PATH = get_project_root() / "podcast" / "adapters" / "data"
+REPORTED_CLASSES = (Podcast, Episode, Author, Category)
+# Reported class -> the plain class its instances are compared with.
+unslotted_classes = {}
+
+
+def instance_bytes(instance) -> int:
+    size = sys.getsizeof(instance)
+    # With '__dict__' among the slots the dict only exists once something outside the slots has been assigned.
+    attributes = getattr(instance, '__dict__', None)
+    if attributes is not None and (not hasattr(type(instance), '__slots__') or attributes):
+        size += sys.getsizeof(attributes)
+    return size
+
+
+def unslotted_equivalent(instance):
+    # A plain class of the same name, whose instances keep their attributes in a dict, with the instance's attributes
+    # set in the order of the slots, as the constructors did before.
+    plain = unslotted_classes.setdefault(type(instance), type(type(instance).__name__, (), {}))()
+    for cls in reversed(type(instance).__mro__):
+        for name in cls.__dict__.get('__slots__', ()):
+            if not name.startswith('__') and hasattr(instance, name):
+                setattr(plain, name, getattr(instance, name))
+    return plain
+
+
+def main():
+    gc.collect()
+    tracemalloc.start()
+    reader = CSVDataReader()
+    reader.read_podcasts(DATA_PATH)
+    reader.read_episodes(DATA_PATH)
+    gc.collect()
+    traced_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts = defaultdict(int)
+    sizes = defaultdict(int)
+    unslotted_sizes = defaultdict(int)
+    for instance in gc.get_objects():
+        if type(instance) in REPORTED_CLASSES:
+            counts[type(instance)] += 1
+            sizes[type(instance)] += instance_bytes(instance)
+            unslotted_sizes[type(instance)] += instance_bytes(unslotted_equivalent(instance))
+
+    print(f"{'':<21} {'bytes each':>22} {'total bytes':>26}")
+    print(f"{'class':<10} {'instances':>10} {'without slots':>14} {'slotted':>7} {'without slots':>14} {'slotted':>11}")
+    for cls in REPORTED_CLASSES:
+        if counts[cls]:
+            print(f"{cls.__name__:<10} {counts[cls]:>10} {unslotted_sizes[cls] / counts[cls]:>14.0f} "
+                  f"{sizes[cls] / counts[cls]:>7.0f} {unslotted_sizes[cls]:>14} {sizes[cls]:>11}")
+    print(f"traced by tracemalloc while loading: {traced_bytes / 1024 / 1024:.1f} MiB")
+    # ru_maxrss is in KiB on Linux.
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
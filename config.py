@@ -19,9 +19,41 @@ class Config:
 
     REPOSITORY = environ.get('REPOSITORY')
 
+    # Directory holding snapshots of the parsed catalogue for the memory repository (unset to always parse the csv files)
+    CATALOGUE_SNAPSHOT_DIR = environ.get('CATALOGUE_SNAPSHOT_DIR')
+
+    # File journaling users, reviews and playlist changes in memory mode, replayed on startup (unset to keep them in memory)
+    USER_JOURNAL_PATH = environ.get('USER_JOURNAL_PATH')
+
+    # Seconds between checks of the catalogue csv files for changes to reload while running (unset or 0 to never check)
+    CATALOGUE_RELOAD_INTERVAL = float(environ.get('CATALOGUE_RELOAD_INTERVAL') or 0)
+
+    # Results kept per cached repository read, and seconds each is served for (unset or 0 to read the repository every time)
+    REPOSITORY_CACHE_SIZE = int(environ.get('REPOSITORY_CACHE_SIZE') or 0)
+    REPOSITORY_CACHE_TTL = float(environ.get('REPOSITORY_CACHE_TTL') or 30)
+
+    # SQLite file of the cache shared by the worker processes in database mode, and seconds its entries are served for
+    SHARED_CACHE_PATH = environ.get('SHARED_CACHE_PATH')
+    SHARED_CACHE_TTL = float(environ.get('SHARED_CACHE_TTL') or 300)
+
+    # Pages and rendered fragments kept in each process when there is no shared cache file (unset or 0 to keep none)
+    LOCAL_CACHE_SIZE = int(environ.get('LOCAL_CACHE_SIZE') or 0)
+
+    # Gzip level of responses to clients that take it (unset or 0 to never compress), and the smallest body compressed
+    COMPRESSION_LEVEL = int(environ.get('COMPRESSION_LEVEL') or 0)
+    COMPRESSION_MIN_SIZE = int(environ.get('COMPRESSION_MIN_SIZE') or 1024)
+
     # Database configuration
     SQLALCHEMY_DATABASE_URI = environ.get('SQLALCHEMY_DATABASE_URI')
 
+    # 'null' opens a connection per session, 'queue' pools connections set up with WAL and the other SQLite pragmas
+    SQLALCHEMY_POOL = environ.get('SQLALCHEMY_POOL', 'null').lower().strip()
+    SQLALCHEMY_POOL_SIZE = int(environ.get('SQLALCHEMY_POOL_SIZE', 5))
+
+    # Use an SQLite FTS5 index for podcast search instead of ilike scans
+    full_text_search_string = environ.get('SQLALCHEMY_FULL_TEXT_SEARCH', 'False')
+    SQLALCHEMY_FULL_TEXT_SEARCH = full_text_search_string.lower().strip() == "true"
+
     echo_string = environ.get('SQLALCHEMY_ECHO')
     SQLALCHEMY_ECHO = False
     if echo_string.lower().strip() == "true":
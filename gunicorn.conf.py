@@ -0,0 +1,26 @@
+"""Gunicorn settings for running the app with several worker processes.
+
+Run from the project directory with:  gunicorn
+
+The app, and with it the whole catalogue, is built once in the master and shared with the forked workers, so adding
+workers does not multiply the memory the catalogue takes.
+"""
+from os import environ
+
+wsgi_app = 'wsgi:app'
+bind = environ.get('GUNICORN_BIND', 'localhost:5000')
+workers = int(environ.get('WEB_CONCURRENCY', 4))
+
+# Import wsgi.py, and so call create_app, in the master rather than in every worker.
+preload_app = True
+
+
+def when_ready(server):
+    # The app is loaded and no worker has been forked yet.
+    from podcast import prepare_for_fork
+    prepare_for_fork()
+
+
+def post_fork(server, worker):
+    from podcast import reinitialise_after_fork
+    reinitialise_after_fork()
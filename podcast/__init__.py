@@ -1,16 +1,18 @@
 """Initialize Flask app."""
 
+import gc
 from pathlib import Path
-from flask import Flask, render_template
+from flask import Flask, g, render_template
 
 # imports from SQLAlchemy
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect
 from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
 
 import podcast.adapters.repository as repo
-from podcast.adapters import memory_repository, database_repository, repository_populate
-from podcast.adapters.orm import map_model_to_tables, mapper_registry
+from podcast import assets, compression
+from podcast.adapters import memory_repository, database_repository, repository_populate, catalogue_reload, journal, \
+    caching_repository, shared_cache
+from podcast.adapters.orm import map_model_to_tables, mapper_registry, upgrade_schema
 
 def create_app(test_config=None):
     """Construct the core application."""
@@ -27,13 +29,25 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
         data_path = app.config['TEST_DATA_PATH']
 
+    shared_cache.instance = None
 
     if app.config['REPOSITORY'] == 'memory':
         # Create the MemoryRepository implementation for a memory-based repository.
         repo.repo_instance = memory_repository.MemoryRepository()
         # fill the content of the repository from the provided csv files (has to be done every time we start app!)
+        # When a snapshot directory is configured, the parsed catalogue is reused until the csv files change.
+        snapshot_dir = app.config.get('CATALOGUE_SNAPSHOT_DIR')
         database_mode = False
-        repository_populate.populate(data_path, repo.repo_instance, database_mode=False)
+        repository_populate.populate(data_path, repo.repo_instance, database_mode=False,
+                                     trusted_data=repository_populate.is_shipped_catalogue(data_path),
+                                     snapshot_dir=Path(snapshot_dir) if snapshot_dir else None)
+        # Registrations, reviews and playlist changes made before the last shutdown are replayed from the journal on
+        # top of the catalogue, and from now on every such change is appended to it.
+        journal_path = app.config.get('USER_JOURNAL_PATH')
+        if journal_path:
+            replayed = repo.repo_instance.replay_journal(journal.read_journal(Path(journal_path)))
+            print(f"Replayed {replayed} changes from {journal_path}")
+            repo.repo_instance.attach_journal(journal.Journal(Path(journal_path)))
 
     elif app.config['REPOSITORY'] == 'database':
         # Configure database.
@@ -44,14 +58,23 @@ def create_app(test_config=None):
         # leading to a URI of "sqlite:///covid-19.db".
         # Note that create_engine does not establish any actual DB connection directly!
         database_echo = app.config['SQLALCHEMY_ECHO']
-        # Please do not change the settings for connect_args and poolclass!
-        database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                        echo=database_echo)
+        # SQLALCHEMY_POOL selects between a new connection per session (null) and a pool of tuned connections (queue).
+        database_engine = database_repository.create_database_engine(
+            database_uri, echo=database_echo, pool_mode=app.config.get('SQLALCHEMY_POOL', 'null'),
+            pool_size=app.config.get('SQLALCHEMY_POOL_SIZE', 5))
 
         # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
-        repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
+        repo.repo_instance = database_repository.SqlAlchemyRepository(
+            session_factory, full_text_search=app.config.get('SQLALCHEMY_FULL_TEXT_SEARCH', False))
+
+        # Worker processes share cached pages through a file next to the database. Memory mode has no such cache, as
+        # every worker there keeps users and reviews of its own.
+        shared_cache_path = app.config.get('SHARED_CACHE_PATH')
+        if shared_cache_path:
+            shared_cache.instance = shared_cache.SharedCache(
+                Path(shared_cache_path), ttl=float(app.config.get('SHARED_CACHE_TTL') or 300))
 
         inspector = inspect(database_engine)
         if app.config['TESTING'] == 'True' or len(inspector.get_table_names()) == 0:
@@ -59,6 +82,7 @@ def create_app(test_config=None):
             # For testing, or first-time use of the web application, reinitialise the database.
             clear_mappers()
             mapper_registry.metadata.create_all(database_engine)  # Conditionally create database tables.
+            upgrade_schema(database_engine)  # Bring tables kept from an older version up to date.
             for table in reversed(mapper_registry.metadata.sorted_tables):  # Remove any data from the tables.
                 with database_engine.connect() as conn:
                     conn.execute(table.delete())
@@ -68,12 +92,49 @@ def create_app(test_config=None):
             map_model_to_tables()
 
             database_mode = True
-            repository_populate.populate(data_path, repo.repo_instance, database_mode)
-            print("REPOPULATING DATABASE... FINISHED")
+            stats = repository_populate.populate(data_path, repo.repo_instance, database_mode,
+                                                 trusted_data=repository_populate.is_shipped_catalogue(data_path))
+            if stats is not None:
+                print(f"REPOPULATING DATABASE... FINISHED ({stats['rows']} rows in {stats['seconds']:.2f}s, "
+                      f"{stats['rows_per_second']:.0f} rows/s)")
+            else:
+                print("REPOPULATING DATABASE... FINISHED")
+            # The search index is rebuilt from the freshly loaded tables.
+            repo.repo_instance.create_search_index(rebuild=True)
 
         else:
             # Solely generate mappings that map domain model classes to the database tables.
             map_model_to_tables()
+            # Databases created by older versions lack columns and indexes added to the tables since.
+            if upgrade_schema(database_engine):
+                repo.repo_instance.rebuild_rating_summaries()
+            # Databases created before full text search was enabled get their search index on first start.
+            repo.repo_instance.create_search_index(rebuild=False)
+
+        # Pages cached before this start may come from a database since repopulated or from templates since changed.
+        # Clearing the entries also bumps the epoch, which gives every page a new ETag.
+        if shared_cache.instance is not None:
+            shared_cache.instance.clear()
+
+    # Without a shared file, pages and fragments are cached in this process alone. In memory mode that is all there
+    # can be, as every worker keeps users and reviews of its own.
+    local_cache_size = int(app.config.get('LOCAL_CACHE_SIZE') or 0)
+    if shared_cache.instance is None and local_cache_size > 0:
+        shared_cache.instance = shared_cache.LocalCache(
+            local_cache_size, ttl=float(app.config.get('SHARED_CACHE_TTL') or 300))
+
+    # Serve repeated catalogue reads from caches in front of the repository, which also tells the shared cache about
+    # every write.
+    cache_size = int(app.config.get('REPOSITORY_CACHE_SIZE') or 0)
+    if cache_size > 0 or shared_cache.instance is not None:
+        repo.repo_instance = caching_repository.CachingRepository(
+            repo.repo_instance, max_size=cache_size, ttl=float(app.config.get('REPOSITORY_CACHE_TTL') or 30),
+            shared_cache=shared_cache.instance)
+
+    # Reload the catalogue in the background whenever podcasts.csv or episodes.csv change.
+    reload_interval = float(app.config.get('CATALOGUE_RELOAD_INTERVAL') or 0)
+    if reload_interval > 0:
+        catalogue_reload.start_watcher(data_path, reload_interval)
 
     with app.app_context():
         from .home import home
@@ -98,13 +159,57 @@ def create_app(test_config=None):
         # We reset the session inside the database repository before a new flask request is generated
         @app.before_request
         def before_flask_http_request_function():
-            if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
-                repo.repo_instance.reset_session()
+            # Views use the repository the request started with, so a catalogue reload that swaps repo_instance
+            # midway does not mix the old and new catalogues within one page.
+            g.repository = repo.repo_instance
+            if isinstance(caching_repository.underlying_repository(g.repository),
+                          database_repository.SqlAlchemyRepository):
+                g.repository.reset_session()
+
+        # Pages are compressed for clients that take gzip; static files are served from their precompressed copies.
+        compression_level = int(app.config.get('COMPRESSION_LEVEL') or 0)
+        if compression_level > 0:
+            compression_min_size = int(app.config.get('COMPRESSION_MIN_SIZE') or 0)
+            app.view_functions['static'] = compression.send_static_file
+
+            @app.after_request
+            def compress_response(response):
+                return compression.compress_response(response, compression_min_size, compression_level)
+
+        # Templates link to the static files under fingerprinted names, which browsers keep without checking back.
+        assets.load_manifest(Path(app.static_folder))
+        app.add_template_global(assets.static_url)
+        app.view_functions['static'] = assets.immutable_static_view(app.view_functions['static'])
 
         # Register a tear-down method that will be called after each request has been processed.
         @app.teardown_appcontext
         def shutdown_session(exception=None):
-            if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
-                repo.repo_instance.close_session()
+            repository = caching_repository.underlying_repository(g.get('repository', repo.repo_instance))
+            if isinstance(repository, database_repository.SqlAlchemyRepository):
+                repository.close_session()
 
     return app
+
+
+def prepare_for_fork():
+    """Call in a preloading server's master process once the app is built, before the workers are forked.
+
+    The catalogue is the bulk of what has been allocated by then. Freezing moves it out of the garbage collector's
+    generations, so collections in the workers never write to those objects and the pages holding them stay shared
+    between the master and every worker instead of being copied into each one.
+    """
+    gc.collect()
+    # Collections in the master would otherwise free objects between the frozen ones and leave holes in their pages
+    # for later allocations, which the workers would then copy.
+    gc.disable()
+    gc.freeze()
+
+
+def reinitialise_after_fork():
+    """Call first thing in each worker forked from a master that ran prepare_for_fork."""
+    gc.enable()
+    # Database connections cannot be shared between processes; the memory repository has nothing per process.
+    repository = caching_repository.underlying_repository(repo.repo_instance)
+    if isinstance(repository, database_repository.SqlAlchemyRepository):
+        repository.reinitialise_after_fork()
+    catalogue_reload.restart_watcher_after_fork()
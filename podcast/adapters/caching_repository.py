@@ -0,0 +1,326 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+from podcast.adapters.repository import AbstractRepository, LoadPlan, RepositoryException
+from podcast.adapters.shared_cache import CATALOGUE, REVIEWS, SharedCache, podcast_scope, user_scope
+from podcast.domainmodel.model import Podcast, Episode, User, Review, Playlist, Author, Category, RatingSummary
+
+# Returned by LRUCache.get for keys it does not hold; None is a result worth caching too (an unknown podcast id).
+MISSING = object()
+
+# The reads served from a cache. Each has its own, so a burst of one kind of read cannot evict the others' results.
+# Keys are the read's arguments, with podcasts and users replaced by their ids and user names; the reads about one
+# podcast, or one user's playlist, have that podcast's id, or the user name, first.
+CACHED_METHODS = (
+    'get_podcast', 'get_podcasts', 'get_podcasts_page', 'get_podcasts_page_before', 'get_number_of_podcasts',
+    'get_episodes', 'get_episodes_page', 'get_episodes_page_before', 'get_number_of_episodes',
+    'get_reviews_for_podcast', 'get_number_of_reviews_for_podcast', 'get_rating_summary', 'get_rating_summaries',
+    'search_podcasts', 'get_number_of_search_results', 'get_user_podcast_playlist', 'get_user_episode_playlist',
+)
+EPISODE_METHODS = ('get_episodes', 'get_episodes_page', 'get_episodes_page_before', 'get_number_of_episodes')
+REVIEW_METHODS = ('get_reviews_for_podcast', 'get_number_of_reviews_for_podcast', 'get_rating_summary')
+PLAYLIST_METHODS = ('get_user_podcast_playlist', 'get_user_episode_playlist')
+
+
+class LRUCache:
+    """Up to max_size results of one repository read, each served for at most ttl seconds after it was read.
+
+    Every invalidation starts a new generation. A result read while an invalidation happened is not stored, as the
+    write behind it may have come too late for the read to see.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__clock = clock
+        # Key -> (expiry time, result), least recently used first.
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: tuple):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self.__clock():
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.__entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return MISSING
+
+    def put(self, key: tuple, value, generation: int):
+        with self.__lock:
+            if generation != self.generation:
+                return
+            self.__entries[key] = (self.__clock() + self.ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: tuple):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def invalidate(self, matches: Callable[[tuple], bool]) -> int:
+        with self.__lock:
+            self.generation += 1
+            stale = [key for key in self.__entries if matches(key)]
+            for key in stale:
+                del self.__entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self.__lock:
+            self.generation += 1
+            self.__entries.clear()
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {'size': len(self.__entries), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'expirations': self.expirations}
+
+
+class CachingRepository(AbstractRepository):
+    """Serves the catalogue and review reads of another repository from LRU caches with a time to live.
+
+    Writes go straight to the wrapped repository and then drop the cached results they change: a review those of its
+    podcast, an episode those of its podcast's episodes, a playlist change those of the user's playlist, and a podcast,
+    author or category everything. Other methods, such as reset_session or attach_journal, are passed through.
+
+    Only writes made through this repository invalidate its caches. Another process writing to the same database is
+    seen once the results it changed expire, after at most ttl seconds. Writes also bump the versions of the data they
+    change in shared_cache, if given, which every process sees at once. A max_size of 0 only does the latter. Results
+    read while the shared cache computes an entry come from the wrapped repository, as its entries outlive this
+    process's view of the data; they are still cached here for later reads.
+    """
+
+    def __init__(self, repository: AbstractRepository, max_size: int = 256, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, shared_cache: SharedCache = None):
+        self.__repository = repository
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self.__caches = {method: LRUCache(max_size, ttl, clock) for method in CACHED_METHODS}
+
+    @property
+    def repository(self) -> AbstractRepository:
+        return self.__repository
+
+    def __getattr__(self, name):
+        # Only reached for attributes this class does not define. Its own private ones are never passed on, so a
+        # half-built instance does not look them up on the wrapped repository.
+        if name.startswith('_CachingRepository__'):
+            raise AttributeError(name)
+        return getattr(self.__repository, name)
+
+    def cache_stats(self) -> Dict[str, dict]:
+        return {method: cache.stats() for method, cache in self.__caches.items()}
+
+    def clear_caches(self):
+        for cache in self.__caches.values():
+            cache.clear()
+
+    def __read(self, method: str, key: tuple, read: Callable):
+        if self.max_size == 0:
+            return read()
+        cache = self.__caches[method]
+        fresh = self.shared_cache is not None and self.shared_cache.computing()
+        value = MISSING if fresh else cache.get(key)
+        if value is not MISSING:
+            try:
+                return self.__repository.adopt_cached(value)
+            except RepositoryException:
+                # The wrapped repository cannot hand this result to the current request; read it again.
+                cache.discard(key)
+        generation = cache.generation
+        value = read()
+        cache.put(key, value, generation)
+        return value
+
+    def __invalidate(self, methods: tuple, matches: Callable[[tuple], bool]):
+        for method in methods:
+            self.__caches[method].invalidate(matches)
+
+    def __invalidate_podcast(self, podcast_id: int, methods: tuple):
+        self.__invalidate(methods, lambda key: key[0] == podcast_id)
+
+    def __bump(self, *scopes: str):
+        if self.shared_cache is not None:
+            self.shared_cache.bump(*scopes)
+
+    def __catalogue_changed(self):
+        self.clear_caches()
+        # Reviews and playlist entries of podcasts no longer in the catalogue may have gone with them.
+        self.__bump(CATALOGUE, REVIEWS)
+
+    # Reads
+
+    def get_podcast(self, podcast_id) -> Podcast:
+        return self.__read('get_podcast', (podcast_id,), lambda: self.__repository.get_podcast(podcast_id))
+
+    def get_podcasts(self, load: LoadPlan = ()) -> List[Podcast]:
+        return self.__read('get_podcasts', (load,), lambda: self.__repository.get_podcasts(load))
+
+    def get_podcasts_page(self, after_id: int = None, limit: int = 10, load: LoadPlan = ()) -> List[Podcast]:
+        return self.__read('get_podcasts_page', (after_id, limit, load),
+                           lambda: self.__repository.get_podcasts_page(after_id, limit, load))
+
+    def get_podcasts_page_before(self, before_id: int = None, limit: int = 10,
+                                 load: LoadPlan = ()) -> List[Podcast]:
+        return self.__read('get_podcasts_page_before', (before_id, limit, load),
+                           lambda: self.__repository.get_podcasts_page_before(before_id, limit, load))
+
+    def get_number_of_podcasts(self):
+        return self.__read('get_number_of_podcasts', (), self.__repository.get_number_of_podcasts)
+
+    def get_episodes(self, podcast: Podcast) -> List[Episode]:
+        return self.__read('get_episodes', (podcast.id,), lambda: self.__repository.get_episodes(podcast))
+
+    def get_episodes_page(self, podcast_id: int, after_id: int = None, limit: int = 3) -> List[Episode]:
+        return self.__read('get_episodes_page', (podcast_id, after_id, limit),
+                           lambda: self.__repository.get_episodes_page(podcast_id, after_id, limit))
+
+    def get_episodes_page_before(self, podcast_id: int, before_id: int = None, limit: int = 3) -> List[Episode]:
+        return self.__read('get_episodes_page_before', (podcast_id, before_id, limit),
+                           lambda: self.__repository.get_episodes_page_before(podcast_id, before_id, limit))
+
+    def get_number_of_episodes(self, podcast: Podcast) -> int:
+        return self.__read('get_number_of_episodes', (podcast.id,),
+                           lambda: self.__repository.get_number_of_episodes(podcast))
+
+    def get_reviews_for_podcast(self, podcast_id: int, limit: int = None, offset: int = 0) -> List[Review]:
+        return self.__read('get_reviews_for_podcast', (podcast_id, limit, offset),
+                           lambda: self.__repository.get_reviews_for_podcast(podcast_id, limit, offset))
+
+    def get_number_of_reviews_for_podcast(self, podcast_id: int) -> int:
+        return self.__read('get_number_of_reviews_for_podcast', (podcast_id,),
+                           lambda: self.__repository.get_number_of_reviews_for_podcast(podcast_id))
+
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        return self.__read('get_rating_summary', (podcast_id,),
+                           lambda: self.__repository.get_rating_summary(podcast_id))
+
+    def get_rating_summaries(self, podcast_ids: List[int]) -> Dict[int, RatingSummary]:
+        return self.__read('get_rating_summaries', (tuple(podcast_ids),),
+                           lambda: self.__repository.get_rating_summaries(podcast_ids))
+
+    def search_podcasts(self, search_term: str, search_filter: str, limit: int = None, offset: int = 0):
+        return self.__read('search_podcasts', (search_term, search_filter, limit, offset),
+                           lambda: self.__repository.search_podcasts(search_term, search_filter, limit, offset))
+
+    def get_number_of_search_results(self, search_term: str, search_filter: str) -> int:
+        return self.__read('get_number_of_search_results', (search_term, search_filter),
+                           lambda: self.__repository.get_number_of_search_results(search_term, search_filter))
+
+    def get_user_podcast_playlist(self, user: User, load: LoadPlan = ()):
+        return self.__read('get_user_podcast_playlist', (user.username, load),
+                           lambda: self.__repository.get_user_podcast_playlist(user, load))
+
+    def get_user_episode_playlist(self, user: User, load: LoadPlan = ()):
+        return self.__read('get_user_episode_playlist', (user.username, load),
+                           lambda: self.__repository.get_user_episode_playlist(user, load))
+
+    # Reads that are not cached, as they are cheap or about users
+
+    def get_user(self, user_name) -> User:
+        return self.__repository.get_user(user_name)
+
+    def get_reviews(self):
+        return self.__repository.get_reviews()
+
+    def get_user_playlist(self, user: User):
+        return self.__repository.get_user_playlist(user)
+
+    def get_playlist_total(self, playlist: Playlist):
+        return self.__repository.get_playlist_total(playlist)
+
+    def get_user_count(self):
+        return self.__repository.get_user_count()
+
+    # Writes, each invalidating what it changes once it is done, so that a read cannot cache what came before it
+
+    def add_user(self, user: User):
+        self.__repository.add_user(user)
+
+    def add_review(self, review: Review):
+        self.__repository.add_review(review)
+        podcast_id = review._podcast.id
+        # The podcast's reviews are read through its own collection as well.
+        self.__invalidate_podcast(podcast_id, ('get_podcast',) + REVIEW_METHODS)
+        self.__invalidate(('get_rating_summaries',), lambda key: podcast_id in key[0])
+        self.__bump(REVIEWS, podcast_scope(podcast_id))
+
+    def add_to_user_playlist(self, user: User, item: Podcast | Episode):
+        self.__repository.add_to_user_playlist(user, item)
+        self.__invalidate(PLAYLIST_METHODS, lambda key: key[0] == user.username)
+        self.__bump(user_scope(user.username))
+
+    def remove_from_user_playlist(self, user: User, item: Podcast | Episode):
+        self.__repository.remove_from_user_playlist(user, item)
+        self.__invalidate(PLAYLIST_METHODS, lambda key: key[0] == user.username)
+        self.__bump(user_scope(user.username))
+
+    def add_episode(self, episode: Episode):
+        self.__repository.add_episode(episode)
+        self.__invalidate_podcast(episode._podcast.id, ('get_podcast',) + EPISODE_METHODS)
+        self.__bump(podcast_scope(episode._podcast.id))
+
+    def remove_episode(self, episode: Episode):
+        self.__repository.remove_episode(episode)
+        self.__invalidate_podcast(episode._podcast.id, ('get_podcast',) + EPISODE_METHODS)
+        # Playlists holding the episode lose it with it.
+        self.__invalidate(PLAYLIST_METHODS, lambda key: True)
+        self.__bump(podcast_scope(episode._podcast.id))
+
+    # Podcasts, authors and categories appear in listings, search results and playlists alike.
+
+    def add_podcast(self, podcast: Podcast):
+        self.__repository.add_podcast(podcast)
+        self.__catalogue_changed()
+
+    def remove_podcast(self, podcast: Podcast):
+        self.__repository.remove_podcast(podcast)
+        self.__catalogue_changed()
+
+    def add_author(self, author: Author):
+        self.__repository.add_author(author)
+        self.__catalogue_changed()
+
+    def add_category(self, cat: Category):
+        self.__repository.add_category(cat)
+        self.__catalogue_changed()
+
+    # Bulk writes of one backend
+
+    def bulk_load(self, *args, **kwargs) -> dict:
+        stats = self.__repository.bulk_load(*args, **kwargs)
+        self.__catalogue_changed()
+        return stats
+
+    def replace_catalogue(self, *args, **kwargs) -> dict:
+        stats = self.__repository.replace_catalogue(*args, **kwargs)
+        self.__catalogue_changed()
+        return stats
+
+    def replay_journal(self, records) -> int:
+        applied = self.__repository.replay_journal(records)
+        self.__catalogue_changed()
+        return applied
+
+
+def underlying_repository(repository: AbstractRepository) -> AbstractRepository:
+    # The repository doing the work, for code that depends on which backend it is.
+    if isinstance(repository, CachingRepository):
+        return repository.repository
+    return repository
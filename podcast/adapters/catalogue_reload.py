@@ -0,0 +1,106 @@
+import threading
+from pathlib import Path
+
+import podcast.adapters.repository as repo
+from podcast.adapters import repository_populate
+from podcast.adapters.caching_repository import CachingRepository, underlying_repository
+from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.adapters.database_repository import SqlAlchemyRepository
+from podcast.adapters.memory_repository import MemoryRepository
+from podcast.adapters.shared_cache import CATALOGUE, REVIEWS
+
+# The data files that make up the catalogue; users.csv and reviews.csv only seed a new app with users and reviews.
+CATALOGUE_FILES = ('podcasts.csv', 'episodes.csv')
+
+# The watcher started by start_watcher, if any, so that a forked worker can start its own.
+watcher = None
+
+
+def catalogue_stamp(data_path: Path) -> tuple:
+    # Cheap enough to check every few seconds; a changed file changes its size or modification time.
+    stamp = []
+    for name in CATALOGUE_FILES:
+        file_name = Path(data_path) / name
+        if file_name.exists():
+            stat = file_name.stat()
+            stamp.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(stamp)
+
+
+def reload_catalogue(data_path: Path):
+    """Load the catalogue in data_path into the running app without interrupting requests.
+
+    In memory mode a new MemoryRepository is populated while the current one keeps serving, the users, reviews and
+    playlists are handed over to it, and it then replaces repo.repo_instance. Requests bind the repository when they
+    start, so the ones in flight finish against the old catalogue. In database mode the catalogue tables are replaced
+    in one transaction. Returns the repository now serving the catalogue.
+    """
+    current = repo.repo_instance
+    if isinstance(underlying_repository(current), SqlAlchemyRepository):
+        # Files edited while the app runs have not been through the tests, so every row is validated.
+        reader = CSVDataReader(trusted=False)
+        reader.read_podcasts(data_path)
+        stats = current.replace_catalogue(reader.authors_by_name.values(), reader.categories_by_name.values(),
+                                          reader.podcasts_by_id.values(), reader.iter_episodes(data_path))
+        print(f"CATALOGUE RELOADED ({stats['rows']} rows in {stats['seconds']:.2f}s)")
+        return current
+
+    successor = MemoryRepository()
+    repository_populate.populate(data_path, successor, database_mode=False, trusted_data=False, catalogue_only=True)
+    current.hand_over_to(successor)
+    if isinstance(current, CachingRepository):
+        # The new catalogue gets caches of its own, as the ones in use may still be filled from the old catalogue.
+        successor = CachingRepository(successor, max_size=current.max_size, ttl=current.ttl,
+                                       shared_cache=current.shared_cache)
+    repo.repo_instance = successor
+    if isinstance(current, CachingRepository) and current.shared_cache is not None:
+        # Pages and fragments rendered from the old catalogue are not served again.
+        current.shared_cache.bump(CATALOGUE, REVIEWS)
+    print(f"CATALOGUE RELOADED ({successor.get_number_of_podcasts()} podcasts)")
+    return successor
+
+
+class CatalogueWatcher(threading.Thread):
+    """Background thread that reloads the catalogue whenever its data files change."""
+
+    def __init__(self, data_path: Path, interval: float):
+        super().__init__(name='catalogue-watcher', daemon=True)
+        self.data_path = data_path
+        self.interval = interval
+        self.stamp = catalogue_stamp(data_path)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def check(self) -> bool:
+        stamp = catalogue_stamp(self.data_path)
+        if stamp == self.stamp:
+            return False
+        try:
+            reload_catalogue(self.data_path)
+        except Exception as error:
+            # A half-written or invalid file leaves the current catalogue in place; the next change is tried again.
+            print(f"Catalogue reload failed, still serving the previous catalogue: {error!r}")
+        self.stamp = stamp
+        return True
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_watcher(data_path: Path, interval: float) -> CatalogueWatcher:
+    global watcher
+    if watcher is not None:
+        watcher.stop()
+    watcher = CatalogueWatcher(data_path, interval)
+    watcher.start()
+    return watcher
+
+
+def restart_watcher_after_fork():
+    # Threads do not survive a fork, so in memory mode each worker watches the files for its own catalogue. In database
+    # mode the workers share one database, which the master's watcher, still running, reloads once for all of them.
+    if watcher is not None and not isinstance(underlying_repository(repo.repo_instance), SqlAlchemyRepository):
+        start_watcher(watcher.data_path, watcher.interval)
@@ -1,12 +1,160 @@
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import create_engine, event, insert, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import InvalidRequestError, OperationalError
+from sqlalchemy.pool import NullPool, QueuePool
 from sqlalchemy.orm.exc import NoResultFound
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import scoped_session, joinedload, selectinload, InstanceState
 
-from podcast.domainmodel.model import User, Podcast, Episode, Review, Playlist, Author, Category
-from podcast.adapters.repository import AbstractRepository, RepositoryException
+from podcast.domainmodel.model import User, Podcast, Episode, Review, Playlist, Author, Category, RatingSummary, \
+    OrderedSet, RATING_VALUES
+from podcast.adapters.repository import AbstractRepository, RepositoryException, LoadPlan
+from podcast.adapters.orm import author_table, category_table, podcast_table, podcast_categories_table, \
+    episode_table, users_table, playlist_table, playlist_podcasts_table, playlist_episodes_table, reviews_table, \
+    RATING_COLUMNS
 
 repo_instance = None
 
+# SQLite FTS5 table over the searchable podcast fields. Its rowid is the podcast id, and the trigram tokenizer makes
+# MATCH a case-insensitive substring test, which is what the ilike queries it replaces did.
+SEARCH_TABLE = 'podcast_search'
+SEARCH_COLUMNS = {'Title': 'title', 'Category': 'categories', 'Author': 'author', 'Language': 'language'}
+# Trigram matching needs at least this many characters; shorter terms are searched with ilike.
+MIN_FULL_TEXT_TERM_LENGTH = 3
+
+SEARCH_ROWS_SELECT = f"""
+    SELECT podcasts.podcast_id, podcasts.title, authors.name, group_concat(categories.category_name, ' | '),
+           podcasts.language
+    FROM podcasts
+    LEFT JOIN authors ON authors.author_id = podcasts.author_id
+    LEFT JOIN podcast_categories ON podcast_categories.podcast_id = podcasts.podcast_id
+    LEFT JOIN categories ON categories.category_id = podcast_categories.category_id
+"""
+# A podcast's categories are indexed as one string, in which a term could match across two category names. Category
+# matches are therefore checked against each name on its own, as the ilike query does.
+CATEGORY_NAME_CHECK = """
+    rowid IN (SELECT podcast_categories.podcast_id FROM podcast_categories
+              JOIN categories ON categories.category_id = podcast_categories.category_id
+              WHERE lower(categories.category_name) LIKE lower(:pattern) ESCAPE '\\')
+"""
+
+# Pool modes selectable through SQLALCHEMY_POOL: 'null' opens a new connection for every session, 'queue' keeps
+# connections open and hands them out again.
+POOL_MODES = ('null', 'queue')
+
+# Run on every new connection in pooled mode. WAL lets readers carry on while a review or playlist write commits, and
+# with WAL synchronous=NORMAL is still safe against corruption. The costs are paid once per pooled connection.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 64 * 1024 * 1024,  # bytes
+    'cache_size': -16 * 1024,       # negative means KiB, so 16 MiB of page cache per connection
+    'busy_timeout': 5000,           # milliseconds a writer waits for the lock before failing
+}
+
+
+def create_database_engine(database_uri: str, echo: bool = False, pool_mode: str = 'null',
+                           pool_size: int = 5) -> Engine:
+    if pool_mode not in POOL_MODES:
+        raise ValueError(f"Unknown pool mode {pool_mode!r}, expected one of {POOL_MODES}")
+
+    if pool_mode == 'null':
+        return create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
+                             echo=echo)
+
+    engine_args = {}
+    if database_uri not in ('sqlite://', 'sqlite:///:memory:'):
+        # An in-memory database only exists on its own connection, so it keeps SQLAlchemy's default pool.
+        engine_args = {'poolclass': QueuePool, 'pool_size': pool_size}
+    engine = create_engine(database_uri, connect_args={"check_same_thread": False}, echo=echo, **engine_args)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+    return engine
+
+
+# Load plan names for each mapped class's relationships. Many-to-one relationships are joined into the main query,
+# collections are fetched with one extra SELECT ... IN query for all rows, so a plan costs a fixed number of queries.
+LOAD_PLAN_RELATIONSHIPS = {
+    Podcast: {'author': ('_author', Author), 'categories': ('categories', Category), 'episodes': ('episodes', Episode),
+              'reviews': ('_reviews', Review)},
+    Episode: {'podcast': ('podcast', Podcast)},
+    Review: {'poster': ('_poster', User), 'podcast': ('podcast', Podcast)},
+}
+
+
+def load_options(entity, load: LoadPlan) -> list:
+    options = []
+    for path in load:
+        option = None
+        cls = entity
+        for name in path.split('.'):
+            try:
+                attribute_name, target = LOAD_PLAN_RELATIONSHIPS[cls][name]
+            except KeyError:
+                raise RepositoryException(f"{cls.__name__} has no relationship {name!r} to load")
+            attribute = getattr(cls, attribute_name)
+            loader = selectinload if attribute.property.uselist else joinedload
+            option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+            cls = target
+        options.append(option)
+    return options
+
+
+# Recomputes every podcast's rating columns from the reviews table, for bulk loads and upgraded databases.
+RATING_SUMMARY_REBUILD = "UPDATE podcasts SET " + ", ".join(
+    ["review_count = (SELECT count(*) FROM reviews WHERE reviews.podcast_id = podcasts.podcast_id)",
+     "rating_total = (SELECT coalesce(sum(rating), 0) FROM reviews WHERE reviews.podcast_id = podcasts.podcast_id)"]
+    + [f"rating_{rating} = (SELECT count(*) FROM reviews "
+       f"WHERE reviews.podcast_id = podcasts.podcast_id AND rating = {rating})" for rating in RATING_VALUES])
+
+
+def rating_summary_from_row(row) -> RatingSummary:
+    return RatingSummary(row.review_count, row.rating_total,
+                         [getattr(row, f'rating_{rating}') for rating in RATING_VALUES])
+
+
+def insert_rows(session, table, values: list) -> int:
+    if values:
+        session.execute(insert(table), values)
+    return len(values)
+
+
+def insert_catalogue_rows(session, authors: Iterable[Author], categories: Iterable[Category],
+                          podcasts: Iterable[Podcast], episode_batches: Iterable[List[Episode]]) -> int:
+    # One executemany per table into the caller's transaction; returns the number of rows written.
+    rows = insert_rows(session, author_table, [{'author_id': author.id, 'name': author.name} for author in authors])
+    rows += insert_rows(session, category_table, [
+        {'category_id': category.id, 'category_name': category.name} for category in categories])
+
+    podcasts = list(podcasts)
+    rows += insert_rows(session, podcast_table, [{
+        'podcast_id': podcast.id, 'title': podcast.title, 'image_url': podcast.image,
+        'description': podcast.description, 'language': podcast.language, 'website': podcast.website,
+        'author_id': podcast.author.id, 'itunes_id': podcast.itunes_id
+    } for podcast in podcasts])
+    rows += insert_rows(session, podcast_categories_table, [
+        {'podcast_id': podcast.id, 'category_id': category.id}
+        for podcast in podcasts for category in podcast.categories])
+
+    # Episodes arrive in batches so that the caller never has to hold all of them at once.
+    for batch in episode_batches:
+        rows += insert_rows(session, episode_table, [{
+            'id': episode.id, 'title': episode.title, 'audio': episode.audio_link,
+            'audio_length': episode.audio_length, 'description': episode.description,
+            'pub_date': episode.publish_date, 'podcast_id': episode._podcast.id
+        } for episode in batch])
+    return rows
+
+
 class SessionContextManager:
     def __init__(self, session_factory):
         self.__session_factory = session_factory
@@ -29,8 +177,9 @@ class SessionContextManager:
         self.__session.rollback()
 
     def reset_session(self):
-        self.close_current_session()
-        self.__session = scoped_session(self.__session_factory)
+        # The scoped session keeps one session per thread, so only the calling thread's session is closed and dropped;
+        # the next use in this thread starts a new one, and requests running in other threads keep theirs.
+        self.__session.remove()
 
     def close_current_session(self):
         if not self.__session is None:
@@ -38,8 +187,57 @@ class SessionContextManager:
 
 
 class SqlAlchemyRepository(AbstractRepository):
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, full_text_search: bool = False):
+        self._session_factory = session_factory
         self._session_cm = SessionContextManager(session_factory)
+        self._full_text_search = full_text_search
+
+    def reinitialise_after_fork(self):
+        # Connections and sessions inherited from the process this one was forked from still belong to that process,
+        # so they are forgotten rather than closed: the engine's pool is replaced without closing its connections, and
+        # sessions start from a new registry.
+        self._session_factory.kw['bind'].dispose(close=False)
+        self._session_cm = SessionContextManager(self._session_factory)
+
+    def create_search_index(self, rebuild: bool = True):
+        """Create the FTS5 search table if needed and, when rebuild is set or it was just created, fill it.
+
+        Full text search is switched off if this SQLite build has no FTS5 trigram tokenizer.
+        """
+        if not self._full_text_search:
+            return
+        with self._session_cm as scm:
+            exists = scm.session.execute(text("SELECT name FROM sqlite_master WHERE name = :name"),
+                                         {'name': SEARCH_TABLE}).first() is not None
+            try:
+                scm.session.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                    f"USING fts5(title, categories, author, language, tokenize='trigram')"))
+            except OperationalError:
+                print("Full text search is not available in this SQLite build, falling back to ilike search")
+                self._full_text_search = False
+                return
+            if rebuild or not exists:
+                self._fill_search_index(scm.session)
+            scm.commit()
+
+    @staticmethod
+    def _fill_search_index(session):
+        session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, author, categories, language) "
+            f"{SEARCH_ROWS_SELECT} GROUP BY podcasts.podcast_id"))
+
+    def _index_podcast(self, session, podcast_id: int):
+        # Keeps the podcast's search row in step with its table rows; runs inside the caller's transaction.
+        if not self._full_text_search:
+            return
+        session.flush()
+        session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :podcast_id"), {'podcast_id': podcast_id})
+        session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, author, categories, language) "
+            f"{SEARCH_ROWS_SELECT} WHERE podcasts.podcast_id = :podcast_id GROUP BY podcasts.podcast_id"),
+            {'podcast_id': podcast_id})
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -47,6 +245,83 @@ class SqlAlchemyRepository(AbstractRepository):
     def reset_session(self):
         self._session_cm.reset_session()
 
+    def adopt_cached(self, value):
+        # A cached object belongs to the session of the request that read it, which has since been closed, so its
+        # relationships could not be loaded. A copy merged into the current session without a query can load them.
+        if isinstance(value, (list, OrderedSet)):
+            return [self.adopt_cached(item) for item in value]
+        if not isinstance(inspect(value, raiseerr=False), InstanceState):
+            return value
+        try:
+            return self._session_cm.session.merge(value, load=False)
+        except InvalidRequestError as error:
+            # The object has changes not yet flushed by the request that is using it.
+            raise RepositoryException(error)
+
+    def bulk_load(self, authors: Iterable[Author], categories: Iterable[Category], podcasts: Iterable[Podcast],
+                  episode_batches: Iterable[List[Episode]] = (), users: Iterable[User] = (),
+                  reviews: Iterable[Review] = ()) -> dict:
+        """Insert a whole catalogue into empty tables in one transaction, with one executemany per table.
+
+        Unlike the add_* methods nothing is merged, so rows must not already exist. Returns the number of rows written,
+        the elapsed seconds and the resulting rows per second.
+        """
+        start = time.perf_counter()
+        with self._session_cm as scm:
+            session = scm.session
+            rows = insert_catalogue_rows(session, authors, categories, podcasts, episode_batches)
+
+            users = list(users)
+            rows += insert_rows(session, users_table, [
+                {'id': user.id, 'user_name': user.username, 'password': user.password} for user in users])
+            rows += insert_rows(session, playlist_table, [
+                {'id': user.playlist.id, 'name': user.playlist.name, 'user_id': user.id} for user in users])
+            rows += insert_rows(session, playlist_podcasts_table, [
+                {'podcast_id': podcast.id, 'playlist_id': user.playlist.id}
+                for user in users for podcast in user.playlist.podcast_list])
+            rows += insert_rows(session, playlist_episodes_table, [
+                {'episode_id': episode.id, 'playlist_id': user.playlist.id}
+                for user in users for episode in user.playlist.episode_list])
+            review_rows = insert_rows(session, reviews_table, [{
+                'user_id': review._poster.id, 'podcast_id': review._podcast.id, 'rating': review.rating,
+                'comment': review.comment
+            } for review in reviews])
+            if review_rows:
+                session.execute(text(RATING_SUMMARY_REBUILD))
+            rows += review_rows
+
+            scm.commit()
+
+        seconds = time.perf_counter() - start
+        return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds > 0 else float(rows)}
+
+    def replace_catalogue(self, authors: Iterable[Author], categories: Iterable[Category], podcasts: Iterable[Podcast],
+                          episode_batches: Iterable[List[Episode]] = ()) -> dict:
+        """Swap the authors, categories, podcasts and episodes for new ones in one transaction, keeping user data.
+
+        Reviews and playlist entries stay, except for those of podcasts and episodes that are not in the new
+        catalogue. Rating summaries and the search index are rebuilt in the same transaction, so requests see either
+        the old catalogue or the new one, never a mix. Returns the same statistics as bulk_load.
+        """
+        start = time.perf_counter()
+        with self._session_cm as scm:
+            session = scm.session
+            for table in (podcast_categories_table, episode_table, podcast_table, author_table, category_table):
+                session.execute(table.delete())
+            rows = insert_catalogue_rows(session, authors, categories, podcasts, episode_batches)
+
+            session.execute(text("DELETE FROM reviews WHERE podcast_id NOT IN (SELECT podcast_id FROM podcasts)"))
+            session.execute(text(
+                "DELETE FROM playlist_podcasts WHERE podcast_id NOT IN (SELECT podcast_id FROM podcasts)"))
+            session.execute(text("DELETE FROM playlist_episodes WHERE episode_id NOT IN (SELECT id FROM episodes)"))
+            session.execute(text(RATING_SUMMARY_REBUILD))
+            if self._full_text_search:
+                self._fill_search_index(session)
+            scm.commit()
+
+        seconds = time.perf_counter() - start
+        return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds > 0 else float(rows)}
+
     def add_user(self, user: User):
         with self._session_cm as scm:
             scm.session.merge(user)
@@ -64,11 +339,15 @@ class SqlAlchemyRepository(AbstractRepository):
     def add_podcast(self, podcast: Podcast):
         with self._session_cm as scm:
             scm.session.merge(podcast)
+            self._index_podcast(scm.session, podcast.id)
             scm.commit()
 
     def remove_podcast(self, podcast: Podcast):
         with self._session_cm as scm:
             scm.session.delete(podcast)
+            if self._full_text_search:
+                scm.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :podcast_id"),
+                                    {'podcast_id': podcast.id})
             scm.commit()
 
     def add_author(self, author: Author):
@@ -84,6 +363,9 @@ class SqlAlchemyRepository(AbstractRepository):
 
     def add_episode(self, episode: Episode):
         with self._session_cm as scm:
+            if episode.podcast is None:
+                # Streamed episodes are not in their podcast's episode list, so link them to it by key.
+                episode.podcast_id = episode._podcast.id
             scm.session.merge(episode)
             scm.commit()
 
@@ -103,9 +385,44 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_reviews(self):
         return self._session_cm.session.query(Review).all()
 
+    def get_reviews_for_podcast(self, podcast_id: int, limit: int = None, offset: int = 0):
+        # Served by the index on reviews.podcast_id rather than a scan of every review.
+        query = self._session_cm.session.query(Review).filter(reviews_table.c.podcast_id == podcast_id) \
+            .order_by(Review._id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def get_number_of_reviews_for_podcast(self, podcast_id: int) -> int:
+        return self._session_cm.session.query(Review).filter(reviews_table.c.podcast_id == podcast_id).count()
+
     def add_review(self, review: Review):
         with self._session_cm as scm:
             scm.session.merge(review)
+            # Merging a review cascades to its podcast, so the podcast's search row is refreshed as well.
+            self._index_podcast(scm.session, review._podcast.id)
+            # The aggregates are incremented in SQL, so concurrent reviews of the same podcast cannot lose updates.
+            increments = {'review_count': podcast_table.c.review_count + 1,
+                          'rating_total': podcast_table.c.rating_total + review.rating}
+            if review.rating in RATING_VALUES:
+                column = podcast_table.c[f'rating_{review.rating}']
+                increments[column.name] = column + 1
+            scm.session.execute(update(podcast_table).where(podcast_table.c.podcast_id == review._podcast.id)
+                                .values(**increments))
+            scm.commit()
+
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        return self.get_rating_summaries([podcast_id]).get(podcast_id, RatingSummary())
+
+    def get_rating_summaries(self, podcast_ids: List[int]) -> Dict[int, RatingSummary]:
+        rows = self._session_cm.session.execute(
+            select(podcast_table.c.podcast_id, *[podcast_table.c[name] for name in RATING_COLUMNS])
+            .where(podcast_table.c.podcast_id.in_(podcast_ids)))
+        return {row.podcast_id: rating_summary_from_row(row) for row in rows}
+
+    def rebuild_rating_summaries(self):
+        with self._session_cm as scm:
+            scm.session.execute(text(RATING_SUMMARY_REBUILD))
             scm.commit()
 
     def add_to_user_playlist(self, user: User, item: Podcast | Episode):
@@ -137,6 +454,19 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_episodes(self, podcast: Podcast):
         return self._session_cm.session.query(Episode).filter_by(podcast=podcast).all()
 
+    def get_episodes_page(self, podcast_id: int, after_id: int = None, limit: int = 3):
+        query = self._session_cm.session.query(Episode).filter(episode_table.c.podcast_id == podcast_id)
+        if after_id is not None:
+            query = query.filter(Episode._id > after_id)
+        return query.order_by(Episode._id).limit(limit).all()
+
+    def get_episodes_page_before(self, podcast_id: int, before_id: int = None, limit: int = 3):
+        # Walk backwards from before_id, then put the page back into id order.
+        query = self._session_cm.session.query(Episode).filter(episode_table.c.podcast_id == podcast_id)
+        if before_id is not None:
+            query = query.filter(Episode._id < before_id)
+        return list(reversed(query.order_by(Episode._id.desc()).limit(limit).all()))
+
     def get_number_of_episodes(self, podcast: Podcast):
         return self._session_cm.session.query(Episode).filter_by(podcast=podcast).count()
 
@@ -150,32 +480,95 @@ class SqlAlchemyRepository(AbstractRepository):
         total_episodes = len(playlist._podcast_list)
         return total_podcasts + total_episodes
 
-    def get_podcasts(self):
-        return self._session_cm.session.query(Podcast).all()
-
-    def get_user_episode_playlist(self, user: User):
-        return user._playlist._episode_list
-
-    def get_user_podcast_playlist(self, user: User):
-        return user._playlist._podcast_list
-
-    def search_podcasts(self, search_term: str, search_filter: str):
-        results = []
-
-        if search_term != "":
-            if search_filter == "Title":
-                results = self._session_cm.session.query(Podcast).filter(Podcast._title.ilike('%' + search_term + '%')).all()
-
-            if search_filter == "Category":
-                results = self._session_cm.session.query(Podcast).join(Podcast.categories).filter(Category._name.ilike('%' + search_term + '%')).all()
-
-            if search_filter == "Author":
-                results = self._session_cm.session.query(Podcast).join(Author).filter(Author._name.ilike('%' + search_term + '%')).all()
-
-            if search_filter == "Language":
-                results = self._session_cm.session.query(Podcast).filter(Podcast._language.ilike('%' + search_term + '%')).all()
+    def get_podcasts(self, load: LoadPlan = ()):
+        return self._session_cm.session.query(Podcast).options(*load_options(Podcast, load)).order_by(Podcast._id).all()
+
+    def get_podcasts_page(self, after_id: int = None, limit: int = 10, load: LoadPlan = ()):
+        query = self._session_cm.session.query(Podcast).options(*load_options(Podcast, load))
+        if after_id is not None:
+            query = query.filter(Podcast._id > after_id)
+        return query.order_by(Podcast._id).limit(limit).all()
+
+    def get_podcasts_page_before(self, before_id: int = None, limit: int = 10, load: LoadPlan = ()):
+        query = self._session_cm.session.query(Podcast).options(*load_options(Podcast, load))
+        if before_id is not None:
+            query = query.filter(Podcast._id < before_id)
+        return list(reversed(query.order_by(Podcast._id.desc()).limit(limit).all()))
+
+    def get_user_episode_playlist(self, user: User, load: LoadPlan = ()):
+        if not load:
+            return user._playlist._episode_list
+        # Same rows as the lazy collection, in the order they were added, with the plan's relationships preloaded.
+        return self._session_cm.session.query(Episode) \
+            .join(playlist_episodes_table, playlist_episodes_table.c.episode_id == Episode._id) \
+            .filter(playlist_episodes_table.c.playlist_id == user._playlist.id) \
+            .options(*load_options(Episode, load)).order_by(playlist_episodes_table.c.id).all()
+
+    def get_user_podcast_playlist(self, user: User, load: LoadPlan = ()):
+        if not load:
+            return user._playlist._podcast_list
+        return self._session_cm.session.query(Podcast) \
+            .join(playlist_podcasts_table, playlist_podcasts_table.c.podcast_id == Podcast._id) \
+            .filter(playlist_podcasts_table.c.playlist_id == user._playlist.id) \
+            .options(*load_options(Podcast, load)).order_by(playlist_podcasts_table.c.id).all()
+
+    def search_podcasts(self, search_term: str, search_filter: str, limit: int = None, offset: int = 0):
+        if search_term == "" or search_filter not in SEARCH_COLUMNS:
+            return []
+
+        if self._full_text_search and len(search_term) >= MIN_FULL_TEXT_TERM_LENGTH:
+            # Best matches first; only the podcasts on the requested page are loaded.
+            condition, parameters = self._match_condition(search_term, search_filter)
+            podcast_ids = [row[0] for row in self._session_cm.session.execute(text(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {condition} ORDER BY rank LIMIT :limit OFFSET :offset"),
+                {**parameters, 'limit': -1 if limit is None else limit, 'offset': offset})]
+            podcasts = {podcast.id: podcast for podcast in
+                        self._session_cm.session.query(Podcast).filter(Podcast._id.in_(podcast_ids)).all()}
+            return [podcasts[podcast_id] for podcast_id in podcast_ids if podcast_id in podcasts]
+
+        query = self._search_query(search_term, search_filter).order_by(Podcast._id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def get_number_of_search_results(self, search_term: str, search_filter: str) -> int:
+        if search_term == "" or search_filter not in SEARCH_COLUMNS:
+            return 0
 
-        return results
+        if self._full_text_search and len(search_term) >= MIN_FULL_TEXT_TERM_LENGTH:
+            condition, parameters = self._match_condition(search_term, search_filter)
+            return self._session_cm.session.execute(
+                text(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {condition}"), parameters).scalar()
+
+        return self._search_query(search_term, search_filter).count()
+
+    @staticmethod
+    def _match_query(search_term: str, search_filter: str) -> str:
+        # A quoted FTS5 string restricted to one column; quotes inside the term are escaped by doubling them.
+        return '{%s} : "%s"' % (SEARCH_COLUMNS[search_filter], search_term.replace('"', '""'))
+
+    @classmethod
+    def _match_condition(cls, search_term: str, search_filter: str) -> Tuple[str, dict]:
+        condition = f"{SEARCH_TABLE} MATCH :query"
+        parameters = {'query': cls._match_query(search_term, search_filter)}
+        if search_filter == "Category":
+            condition += f" AND {CATEGORY_NAME_CHECK}"
+            escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            parameters['pattern'] = f'%{escaped}%'
+        return condition, parameters
+
+    def _search_query(self, search_term: str, search_filter: str):
+        pattern = '%' + search_term + '%'
+        query = self._session_cm.session.query(Podcast)
+
+        if search_filter == "Title":
+            return query.filter(Podcast._title.ilike(pattern))
+        if search_filter == "Category":
+            # A podcast matching through several of its categories is still listed once.
+            return query.join(Podcast.categories).filter(Category._name.ilike(pattern)).distinct()
+        if search_filter == "Author":
+            return query.join(Author).filter(Author._name.ilike(pattern))
+        return query.filter(Podcast._language.ilike(pattern))
 
     def get_user_count(self):
         users = self._session_cm.session.query(User).all()
@@ -1,11 +1,18 @@
 import os
 import csv
-from podcast.domainmodel.model import Podcast, Episode, Author, Category, User, Review
+from podcast.domainmodel.model import Podcast, Episode, Author, Category, User, Review, validate_podcast_rows, \
+    validate_episode_rows
+
+# Number of episodes iter_episodes hands out at a time.
+EPISODE_BATCH_SIZE = 1000
 
 
 # Note: When using, make sure to run both and to run read_podcasts first BEFORE read_episodes
 class CSVDataReader:
-    def __init__(self):
+    def __init__(self, trusted: bool = False):
+        # Podcasts and episodes are validated a batch at a time and then built without the constructors' per-field
+        # checks. Files known to be valid already, such as the catalogue shipped with the app, can skip validation.
+        self.trusted = trusted
         self.dataset_of_podcasts = []
         self.dataset_of_episodes = []
         self.dataset_of_authors = []
@@ -13,6 +20,12 @@ class CSVDataReader:
         self.dataset_of_users = []
         self.dataset_of_reviews = []
 
+        # Indexes built while parsing so that linking rows together is a dict lookup rather than a list scan.
+        self.podcasts_by_id = {}
+        self.authors_by_name = {}
+        self.categories_by_name = {}
+        self.users_by_id = {}
+
     def read_podcasts(self, data_path): #make it take data_path parameter
         #current_dir_name = os.path.dirname(os.path.abspath(__file__))
         #dir_name = os.path.dirname(os.path.abspath(current_dir_name))
@@ -20,6 +33,7 @@ class CSVDataReader:
         podcast_file_name = os.path.join(data_path, "podcasts.csv")
         with open(podcast_file_name, encoding='utf-8', mode='r', newline='') as csvfile:
             reader = csv.DictReader(csvfile)
+            rows = []
 
             for row in reader:
                 podcast_id = int(row['id'].strip())
@@ -29,47 +43,75 @@ class CSVDataReader:
                 lang = row['language'].strip()
                 website = row['website'].strip()
                 itunes_id = int(row['itunes_id'].strip())
-                author = row['author'].strip()
+                author_name = row['author'].strip()
                 categories = row['categories'].split('|')
 
-                if author == "": #is
-                    author = "Unknown Author"
+                if author_name == "": #is
+                    author_name = "Unknown Author"
+
+                author = self.get_or_create_author(author_name)
+                rows.append(((podcast_id, author, title, img, desc, website, itunes_id, lang), categories))
 
-                if author not in self.dataset_of_authors:
-                    new_author = Author(len(self.dataset_of_authors) + 1, author)
-                    self.dataset_of_authors.append(new_author)
+        if not self.trusted:
+            validate_podcast_rows(arguments for arguments, _ in rows)
 
-                podcast = Podcast(podcast_id, new_author, title, img, desc, website, itunes_id, lang)
-                new_author.add_podcast(podcast)
+        podcasts = Podcast.from_trusted_rows(arguments for arguments, _ in rows)
+        for podcast, (_, categories) in zip(podcasts, rows):
+            podcast.author.add_podcast(podcast)
 
-                for category in categories:
-                    category = category.strip()
-                    added = False
+            for category_name in categories:
+                podcast.add_category(self.get_or_create_category(category_name.strip()))
 
-                    for existing in self.dataset_of_categories:
-                        if existing.name == category:
-                            podcast.add_category(existing)
-                            added = True
+            self.dataset_of_podcasts.append(podcast)
+            self.podcasts_by_id[podcast.id] = podcast
 
-                    if not added:
-                        new_cat = Category(len(self.dataset_of_categories) + 1, category)
-                        self.dataset_of_categories.append(new_cat)
-                        podcast.add_category(new_cat)
+    def get_or_create_author(self, name: str) -> Author:
+        author = self.authors_by_name.get(name)
+        if author is None:
+            author = Author(len(self.dataset_of_authors) + 1, name)
+            self.dataset_of_authors.append(author)
+            self.authors_by_name[name] = author
+        return author
 
-                self.dataset_of_podcasts.append(podcast)
+    def get_or_create_category(self, name: str) -> Category:
+        category = self.categories_by_name.get(name)
+        if category is None:
+            category = Category(len(self.dataset_of_categories) + 1, name)
+            self.dataset_of_categories.append(category)
+            self.categories_by_name[name] = category
+        return category
 
     def read_episodes(self, data_path): #make it take data_path parameter
+        for batch in self.iter_episodes(data_path):
+            for episode in batch:
+                episode._podcast.add_episode(episode)
+            self.dataset_of_episodes.extend(batch)
+
+    def iter_episodes(self, data_path, batch_size: int = EPISODE_BATCH_SIZE):
+        """Yield Episodes from episodes.csv in lists of at most batch_size, validated unless the reader is trusted.
+
+        Each episode refers to its podcast, but is neither added to the podcast's episode list nor kept by the reader,
+        so memory use is bounded by the batch size rather than by the size of the file. read_podcasts must run first.
+        """
+        for rows in self.iter_episode_rows(data_path, batch_size):
+            if not self.trusted:
+                validate_episode_rows(rows)
+            yield Episode.from_trusted_rows(rows)
+
+    def iter_episode_rows(self, data_path, batch_size: int = EPISODE_BATCH_SIZE):
+        # The parsed Episode argument tuples behind iter_episodes, before any validation.
         #current_dir_name = os.path.dirname(os.path.abspath(__file__))
         #dir_name = os.path.dirname(os.path.abspath(current_dir_name))
         #episode_file_name = os.path.join(dir_name, "data/episodes.csv")
         episode_file_name = os.path.join(data_path, "episodes.csv")
         with open(episode_file_name, encoding='utf-8', mode='r', newline='') as csvfile:
             reader = csv.DictReader(csvfile)
+            batch = []
 
             for row in reader:
                 episode_id = int(row['id'].strip())
                 podcast_id = int(row['podcast_id'].strip())
-                current_podcast = next((podcast for podcast in self.dataset_of_podcasts if podcast.id == podcast_id), None)
+                current_podcast = self.podcasts_by_id.get(podcast_id)
                 title = row['title'].strip()
                 audio= row['audio'].strip()
                 if audio == "":         # Resolving issue with some episode links being empty
@@ -78,10 +120,13 @@ class CSVDataReader:
                 desc = row['description'].strip()
                 pub_date = row['pub_date'].strip()
 
-                episode = Episode(episode_id, current_podcast, audio, audio_length, title, desc, pub_date)
-                current_podcast.add_episode(episode)
-                self.dataset_of_episodes.append(episode)
+                batch.append((episode_id, current_podcast, audio, audio_length, title, desc, pub_date))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
 
+            if batch:
+                yield batch
 
     def read_users(self, data_path):
         user_file_name = os.path.join(data_path, "users.csv")
@@ -95,6 +140,7 @@ class CSVDataReader:
 
                 user = User(user_id, username, password)
                 self.dataset_of_users.append(user)
+                self.users_by_id[user_id] = user
 
     def read_reviews(self, data_path):
         review_file_name = os.path.join(data_path, "reviews.csv")
@@ -107,9 +153,8 @@ class CSVDataReader:
                 rating = int(row['rating'].strip())
                 comment = row['comment-text'].strip()
 
-                podcast = next((podcast for podcast in self.dataset_of_podcasts if podcast.id == podcast_id),None)
-                user = next((user for user in self.dataset_of_users if user.id == user_id),
-                                       None)
+                podcast = self.podcasts_by_id.get(podcast_id)
+                user = self.users_by_id.get(user_id)
 
                 review = Review(user,podcast,rating,comment)
                 user.add_review(review)
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterator
+
+
+class Journal:
+    """Append-only file of JSON lines recording the user, review and playlist changes made in memory mode.
+
+    write appends a record and returns its position; wait_durable(position) returns once that record is on disk.
+    Writers waiting at the same time share one fsync: whichever of them finds no fsync running flushes and syncs
+    everything written so far, and the others wait for it instead of each paying for their own (group commit).
+    """
+
+    def __init__(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.__path = Path(path)
+        # New records must start on a line of their own, not after the remains of one cut short by a crash.
+        truncate_incomplete_line(path)
+        self.__file = open(path, mode='a', encoding='utf-8')
+        self.__lock = threading.Lock()
+        self.__synced = threading.Condition(self.__lock)
+        self.__written = 0
+        self.__durable = 0
+        self.__syncing = False
+        # Number of fsyncs, for comparing against the number of records written.
+        self.syncs = 0
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def write(self, record: dict) -> int:
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.__lock:
+            self.__file.write(line)
+            self.__written += 1
+            return self.__written
+
+    def wait_durable(self, position: int):
+        with self.__lock:
+            while self.__durable < position:
+                if self.__syncing:
+                    self.__synced.wait()
+                    continue
+                # Lead the next group: everything written so far goes to disk with this one fsync.
+                self.__syncing = True
+                target = self.__written
+                try:
+                    self.__file.flush()
+                    # Other writers keep appending to the file's buffer while the disk catches up.
+                    self.__lock.release()
+                    try:
+                        os.fsync(self.__file.fileno())
+                    finally:
+                        self.__lock.acquire()
+                    self.__durable = target
+                    self.syncs += 1
+                finally:
+                    self.__syncing = False
+                    self.__synced.notify_all()
+
+    def append(self, record: dict):
+        self.wait_durable(self.write(record))
+
+    def close(self):
+        with self.__lock:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__file.close()
+
+
+def truncate_incomplete_line(path: Path):
+    if not Path(path).exists():
+        return
+    with open(path, mode='rb+') as journal_file:
+        end = journal_file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(position - 4096, 0)
+            journal_file.seek(start)
+            newline = journal_file.read(position - start).rfind(b'\n')
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            journal_file.truncate(position)
+
+
+def read_journal(path: Path) -> Iterator[dict]:
+    # Records in the order they were written. A line cut short by a crash while it was being written ends the
+    # journal; nothing after it was ever reported as saved.
+    if not Path(path).exists():
+        return
+    with open(path, mode='r', encoding='utf-8') as journal_file:
+        for line in journal_file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Ignoring the incomplete end of journal {path}")
+                return
@@ -1,12 +1,17 @@
 import abc
+import copy
+import threading
 from pathlib import Path
-from bisect import insort_left
-from typing import List
+from bisect import insort_left, bisect_left, bisect_right
+from typing import Dict, Iterable, List
 import os
 
-from podcast.adapters.repository import AbstractRepository
-from podcast.domainmodel.model import Podcast, Episode, User, Review, Playlist, Author, Episode, Category
+from podcast.adapters.repository import AbstractRepository, LoadPlan
+from podcast.adapters.search_index import PodcastSearchIndex
+from podcast.domainmodel.model import Podcast, Episode, User, Review, Playlist, Author, Episode, Category, \
+    RatingSummary, OrderedSet, make_review
 from podcast.adapters.datareader.csvdatareader import CSVDataReader
+from podcast.adapters.journal import Journal
 from utils import get_project_root
 
 
@@ -19,115 +24,352 @@ class MemoryRepository(AbstractRepository):
         self.__categories = []
         self.__episodes = []
 
+        # Keyed indexes over the lists above, kept in step by the add_* and remove_* methods.
+        self.__users_by_name = {}
+        self.__podcasts_by_id = {}
+        self.__episodes_by_key = {}
+        # Each podcast's episodes sorted by id, for keyset pagination.
+        self.__episodes_by_podcast = {}
+        # Reviews of each podcast, in the order they were added.
+        self.__reviews_by_podcast = {}
+        self.__rating_summaries = {}
+        self.__author_ids = set()
+        self.__category_ids = set()
+        self.__episode_ids = set()
+        self.__search_index = PodcastSearchIndex()
+
+        # Request threads read without locking. Writes are serialised by this lock and never change a list, summary or
+        # playlist that a reader may be iterating: they build a changed copy and publish it with a single assignment,
+        # which is atomic. Copies are only made of the small per-podcast and per-user lists; dicts and lists that are
+        # only looked up by key, index or length are changed in place. The podcast list and the search index only
+        # change with the catalogue, which is loaded before the repository serves requests.
+        self.__write_lock = threading.Lock()
+        # Set once the catalogue has been reloaded into another repository. Writes from requests that started before
+        # the swap, and so still hold this repository, are passed on to it.
+        self.__successor = None
+        # Records user, review and playlist changes once attached, so they can be replayed after a restart.
+        self.__journal = None
+
+    def attach_journal(self, journal: Journal):
+        self.__journal = journal
+
+    def __record(self, record: dict) -> int | None:
+        # Called with the write lock held, so the journal has the changes in the order they were made. The caller
+        # waits for the record to reach the disk only after releasing the lock, so that concurrent writers share fsyncs.
+        if self.__journal is None:
+            return None
+        return self.__journal.write(record)
+
+    def __wait_durable(self, position: int | None):
+        if position is not None:
+            self.__journal.wait_durable(position)
+
     def add_user(self, user: User):
-        self.__users.append(user)
+        with self.__write_lock:
+            if self.__successor is not None:
+                return self.__successor.add_user(user)
+            self.__users.append(user)
+            self.__users_by_name[user.username] = user
+            position = self.__record(
+                {'op': 'add_user', 'user_id': user.id, 'username': user.username, 'password': user.password})
+        self.__wait_durable(position)
 
     def get_user(self, user_name) -> User:
-        return next((user for user in self.__users if user.username == user_name), None)
+        return self.__users_by_name.get(user_name)
 
     def add_podcast(self, podcast: Podcast):
         if isinstance(podcast, Podcast):
-            insort_left(self.__podcasts, podcast)
+            with self.__write_lock:
+                # Podcasts are read in order, so they are only added in place while the catalogue is loaded. They
+                # usually arrive in id order, which makes each insertion an append.
+                insort_left(self.__podcasts, podcast)
+                self.__podcasts_by_id[podcast.id] = podcast
+                self.__search_index.add(podcast)
+                # The episodes the podcast already has are indexed along with it, next to any added on their own.
+                episodes = {episode.id: episode for episode in self.__episodes_by_podcast.get(podcast.id, [])}
+                for episode in podcast.episodes:
+                    self.__episodes_by_key[(podcast.id, episode.id)] = episode
+                    episodes[episode.id] = episode
+                self.__episodes_by_podcast[podcast.id] = sorted(episodes.values(), key=episode_sort_key)
 
     def get_podcast(self, podcast_id) -> Podcast:
-        return next((podcast for podcast in self.__podcasts if podcast._id == podcast_id), None)
+        return self.__podcasts_by_id.get(podcast_id)
 
-    def get_podcasts(self) -> List[Podcast]:
+    # Load plans are accepted for interface compatibility; every object is already in memory.
+    def get_podcasts(self, load: LoadPlan = ()) -> List[Podcast]:
         return self.__podcasts
 
+    def get_podcasts_page(self, after_id: int = None, limit: int = 10, load: LoadPlan = ()) -> List[Podcast]:
+        start = 0 if after_id is None else bisect_right(self.__podcasts, after_id, key=podcast_sort_key)
+        return self.__podcasts[start:start + limit]
+
+    def get_podcasts_page_before(self, before_id: int = None, limit: int = 10,
+                                 load: LoadPlan = ()) -> List[Podcast]:
+        end = len(self.__podcasts)
+        if before_id is not None:
+            end = bisect_left(self.__podcasts, before_id, key=podcast_sort_key)
+        return self.__podcasts[max(end - limit, 0):end]
+
     def get_number_of_podcasts(self):
         return len(self.__podcasts)
 
     def get_episode(self, podcast_id, episode_id) -> Episode:
-        return next((episode for episode in self.get_episodes(self.get_podcast(podcast_id)) if episode.id == episode_id), None)
+        return self.__episodes_by_key.get((podcast_id, episode_id))
 
+    # Episodes are listed, paged and counted from the same index, which add_episode and remove_episode keep up to date.
     def get_episodes(self, podcast: Podcast) -> List[Episode]:
-        return podcast.episodes
+        return self.__episodes_by_podcast.get(podcast.id, [])
+
+    def get_episodes_page(self, podcast_id: int, after_id: int = None, limit: int = 3) -> List[Episode]:
+        episodes = self.__episodes_by_podcast.get(podcast_id, [])
+        start = 0 if after_id is None else bisect_right(episodes, after_id, key=episode_sort_key)
+        return episodes[start:start + limit]
+
+    def get_episodes_page_before(self, podcast_id: int, before_id: int = None, limit: int = 3) -> List[Episode]:
+        episodes = self.__episodes_by_podcast.get(podcast_id, [])
+        end = len(episodes) if before_id is None else bisect_left(episodes, before_id, key=episode_sort_key)
+        return episodes[max(end - limit, 0):end]
 
     def get_number_of_episodes(self, podcast: Podcast) -> int:
-        return len(podcast.episodes)
+        return len(self.__episodes_by_podcast.get(podcast.id, []))
 
     def add_review(self, review: Review):
         # call parent class first, add_comment relies on implementation of code common to all derived classes
         super().add_review(review)
-        self.__reviews.append(review)
-        review._poster._reviews.append(review)
+        podcast_id = review._podcast.id
+        with self.__write_lock:
+            if self.__successor is not None:
+                return self.__successor.adopt_review(review)
+            # Nothing iterates all the reviews while requests are served, but a podcast's reviews are shown in pages
+            # and a user's are iterated, so those lists are copied.
+            self.__reviews.append(review)
+            self.__reviews_by_podcast[podcast_id] = self.__reviews_by_podcast.get(podcast_id, []) + [review]
+            review._poster._reviews = review._poster._reviews + [review]
+            summary = self.__rating_summaries.get(podcast_id, RatingSummary())
+            summary = RatingSummary(summary.count, summary.total, summary.histogram.values())
+            summary.add_rating(review.rating)
+            self.__rating_summaries[podcast_id] = summary
+            position = self.__record({'op': 'add_review', 'username': review._poster.username,
+                                      'podcast_id': podcast_id, 'rating': review.rating, 'comment': review.comment})
+        self.__wait_durable(position)
 
     def get_reviews(self):
         return self.__reviews
 
+    def get_reviews_for_podcast(self, podcast_id: int, limit: int = None, offset: int = 0) -> List[Review]:
+        reviews = self.__reviews_by_podcast.get(podcast_id, [])
+        return reviews[offset:] if limit is None else reviews[offset:offset + limit]
+
+    def get_number_of_reviews_for_podcast(self, podcast_id: int) -> int:
+        return len(self.__reviews_by_podcast.get(podcast_id, []))
+
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        return self.__rating_summaries.get(podcast_id, RatingSummary())
+
+    def get_rating_summaries(self, podcast_ids: List[int]) -> Dict[int, RatingSummary]:
+        return {podcast_id: self.get_rating_summary(podcast_id) for podcast_id in podcast_ids}
+
     def add_to_user_playlist(self, user: User, item: Podcast | Episode):
-        playlist = user.playlist
-        playlist.add_item(item)
+        with self.__write_lock:
+            if self.__successor is not None:
+                return self.__successor.adopt_playlist_change(user, item, add=True)
+            change_playlist(user.playlist, lambda playlist: playlist.add_item(item))
+            position = self.__record(playlist_record('add_to_playlist', user, item))
+        self.__wait_durable(position)
 
     def remove_from_user_playlist(self, user: User, item: Podcast | Episode):
-        playlist = user.playlist
-        if isinstance(item, Episode):
-            playlist._episode_list.remove(item)
-        elif isinstance(item, Podcast):
-            playlist._podcast_list.remove(item)
+        def remove_item(playlist: Playlist):
+            if isinstance(item, Episode):
+                playlist._episode_list.remove(item)
+            elif isinstance(item, Podcast):
+                playlist._podcast_list.remove(item)
+
+        with self.__write_lock:
+            if self.__successor is not None:
+                return self.__successor.adopt_playlist_change(user, item, add=False)
+            change_playlist(user.playlist, remove_item)
+            position = self.__record(playlist_record('remove_from_playlist', user, item))
+        self.__wait_durable(position)
 
     def get_user_playlist(self, user: User) -> Playlist:
         return user.playlist
 
-    def get_user_podcast_playlist(self, user: User):
+    def get_user_podcast_playlist(self, user: User, load: LoadPlan = ()):
         playlist = user.playlist
         return playlist.podcast_list
 
-    def get_user_episode_playlist(self, user: User):
+    def get_user_episode_playlist(self, user: User, load: LoadPlan = ()):
         playlist = user.playlist
         return playlist.episode_list
 
     def get_playlist_total(self, playlist: Playlist):
         return len(playlist._podcast_list) + len(playlist._episode_list)
 
-    def search_podcasts(self, search_term: str, search_filter: str):
-        results = []
-
-        if search_term != "":
-            if search_filter == "Title":
-                for podcast in self.__podcasts:
-                    if search_term.lower() in podcast.title.lower():
-                        results.append(podcast)
+    def search_podcasts(self, search_term: str, search_filter: str, limit: int = None, offset: int = 0):
+        results = self.__search_index.search(search_term, search_filter)
+        return results[offset:] if limit is None else results[offset:offset + limit]
 
-            if search_filter == "Category":
-                for podcast in self.__podcasts:
-                    for category in podcast.categories:
-                        if search_term.lower() in category.name.lower():
-                            results.append(podcast)
-
-            if search_filter == "Author":
-                for podcast in self.__podcasts:
-                    if search_term.lower() in podcast.author.name.lower():
-                        results.append(podcast)
-
-            if search_filter == "Language":
-                for podcast in self.__podcasts:
-                    if search_term.lower() in podcast.language.lower():
-                        results.append(podcast)
-
-        return results
+    def get_number_of_search_results(self, search_term: str, search_filter: str) -> int:
+        return len(self.__search_index.search(search_term, search_filter))
 
     def add_author(self, author: Author):
-        if isinstance(author, Author) and (author not in self.__authors):
-            insort_left(self.__authors, author)
+        with self.__write_lock:
+            if isinstance(author, Author) and (author.id not in self.__author_ids):
+                insort_left(self.__authors, author)
+                self.__author_ids.add(author.id)
 
     def add_category(self, category: Category):
-        if isinstance(category, Category) and (category not in self.__categories):
-            insort_left(self.__categories, category)
+        with self.__write_lock:
+            if isinstance(category, Category) and (category.id not in self.__category_ids):
+                insort_left(self.__categories, category)
+                self.__category_ids.add(category.id)
 
     def add_episode(self, episode: Episode):
-        if isinstance(episode, Episode) and (episode not in self.__episodes):
-            insort_left(self.__episodes, episode)
+        with self.__write_lock:
+            if isinstance(episode, Episode) and (episode.id not in self.__episode_ids):
+                insort_left(self.__episodes, episode)
+                self.__episode_ids.add(episode.id)
+                if (episode.podcast.id, episode.id) not in self.__episodes_by_key:
+                    episodes = list(self.__episodes_by_podcast.get(episode.podcast.id, []))
+                    insort_left(episodes, episode, key=episode_sort_key)
+                    self.__episodes_by_podcast[episode.podcast.id] = episodes
+                self.__episodes_by_key[(episode.podcast.id, episode.id)] = episode
 
     def get_user_count(self):
         return len(self.__users)
 
     def remove_episode(self, episode: Episode):
-        self.__episodes.remove(episode)
+        with self.__write_lock:
+            self.__episodes.remove(episode)
+            self.__episode_ids.discard(episode.id)
+            if self.__episodes_by_key.pop((episode.podcast.id, episode.id), None) is not None:
+                self.__episodes_by_podcast[episode.podcast.id] = [
+                    other for other in self.__episodes_by_podcast[episode.podcast.id] if other != episode]
 
     def remove_podcast(self, podcast: Podcast):
-        self.__podcasts.remove(podcast)
+        with self.__write_lock:
+            podcasts = list(self.__podcasts)
+            podcasts.remove(podcast)
+            self.__podcasts = podcasts
+            self.__podcasts_by_id.pop(podcast.id, None)
+            self.__search_index.remove(podcast)
+            for episode in podcast.episodes:
+                self.__episodes_by_key.pop((podcast.id, episode.id), None)
+            self.__episodes_by_podcast.pop(podcast.id, None)
+
+    def hand_over_to(self, successor: 'MemoryRepository'):
+        """Move the users, reviews and playlists into successor, a repository holding a newly loaded catalogue only.
+
+        Reviews and playlist items are matched to the successor's podcasts and episodes by id, and left behind if
+        those are no longer in the catalogue. Requests still holding this repository keep reading its catalogue, and
+        any user, review or playlist change they make from now on is passed on to the successor.
+        """
+        with self.__write_lock:
+            for user in self.__users:
+                successor.add_user(User(user.id, user.username, user.password))
+            for user in self.__users:
+                for item in list(user.playlist.podcast_list) + list(user.playlist.episode_list):
+                    successor.adopt_playlist_change(user, item, add=True)
+            for review in self.__reviews:
+                successor.adopt_review(review)
+            # Only changes made from now on are journaled, by the successor; the carried over ones already are.
+            successor.attach_journal(self.__journal)
+            self.__successor = successor
+
+    def own_item(self, item: Podcast | Episode) -> Podcast | Episode | None:
+        # This repository's podcast or episode with the same ids as one from another repository's catalogue.
+        if isinstance(item, Episode):
+            return self.get_episode(item.podcast.id, item.id)
+        return self.get_podcast(item.id)
+
+    def adopt_review(self, review: Review):
+        # Adds a copy of a review from another repository, made for this repository's user and podcast.
+        poster = self.get_user(review._poster.username)
+        podcast = self.get_podcast(review._podcast.id)
+        if poster is not None and podcast is not None:
+            self.add_review(make_review(review.comment, poster, podcast, review.rating))
+
+    def adopt_playlist_change(self, user: User, item: Podcast | Episode, add: bool):
+        # Applies a playlist change made through another repository to this repository's user and podcast or episode.
+        own_user, own_item = self.get_user(user.username), self.own_item(item)
+        if own_user is None or own_item is None:
+            return
+        if add and own_item not in own_user.playlist.podcast_list and own_item not in own_user.playlist.episode_list:
+            self.add_to_user_playlist(own_user, own_item)
+        elif not add and (own_item in own_user.playlist.podcast_list or own_item in own_user.playlist.episode_list):
+            self.remove_from_user_playlist(own_user, own_item)
+
+    def replay_journal(self, records: Iterable[dict]) -> int:
+        """Apply the changes recorded in a journal on top of the catalogue, before a journal is attached.
+
+        Records of reviews and playlist items whose podcast or episode is no longer in the catalogue are skipped, as
+        are users who already exist. Returns the number of records applied.
+        """
+        applied = 0
+        for record in records:
+            operation = record['op']
+            user = self.get_user(record['username'])
+            if operation == 'add_user':
+                if user is None:
+                    self.add_user(User(record['user_id'], record['username'], record['password']))
+                    applied += 1
+                continue
+            podcast = self.get_podcast(record['podcast_id'])
+            if user is None or podcast is None:
+                continue
+            if operation == 'add_review':
+                self.add_review(make_review(record['comment'], user, podcast, record['rating']))
+                applied += 1
+                continue
+            item = podcast if record['episode_id'] is None else self.get_episode(podcast.id, record['episode_id'])
+            if item is None:
+                continue
+            in_playlist = item in user.playlist.podcast_list or item in user.playlist.episode_list
+            if in_playlist == (operation == 'add_to_playlist'):
+                continue
+            if operation == 'add_to_playlist':
+                self.add_to_user_playlist(user, item)
+            else:
+                self.remove_from_user_playlist(user, item)
+            applied += 1
+        return applied
+
+    def export_state(self) -> dict:
+        # Everything the repository holds, for saving as a catalogue snapshot. The lock, any successor and the journal
+        # belong to this running instance.
+        state = dict(self.__dict__)
+        del state['_MemoryRepository__write_lock']
+        del state['_MemoryRepository__successor']
+        del state['_MemoryRepository__journal']
+        return state
+
+    def restore_state(self, state: dict):
+        self.__dict__.update(state)
+
+
+def playlist_record(operation: str, user: User, item: Podcast | Episode) -> dict:
+    if isinstance(item, Episode):
+        return {'op': operation, 'username': user.username, 'podcast_id': item.podcast.id, 'episode_id': item.id}
+    return {'op': operation, 'username': user.username, 'podcast_id': item.id, 'episode_id': None}
+
+
+def change_playlist(playlist: Playlist, change):
+    # Applies change to copies of the playlist's lists and then puts the copies in place, so that a page iterating the
+    # current lists never sees them change underneath it.
+    draft = copy.copy(playlist)
+    draft._episode_list = OrderedSet(playlist._episode_list)
+    draft._podcast_list = OrderedSet(playlist._podcast_list)
+    change(draft)
+    playlist._episode_list = draft._episode_list
+    playlist._podcast_list = draft._podcast_list
+
+
+def podcast_sort_key(podcast: Podcast) -> int:
+    return podcast.id
+
+
+def episode_sort_key(episode: Episode) -> int:
+    return episode.id
 
 
 def populate(data_path: Path, repo: AbstractRepository):
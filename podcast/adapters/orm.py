@@ -1,7 +1,8 @@
-from sqlalchemy import Table, Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Table, Column, Integer, String, Text, ForeignKey, event, inspect, text
 from sqlalchemy.orm import registry, relationship
 
-from podcast.domainmodel.model import Podcast, Episode, Author, Category, User, Review, Playlist
+from podcast.domainmodel.model import Podcast, Episode, Author, Category, User, Review, Playlist, OrderedSet, \
+    MAPPED_CLASS_SLOTS, RATING_VALUES
 
 # global variable giving access to the MetaData (schema) information of the database
 # metadata = MetaData()
@@ -16,9 +17,17 @@ podcast_table = Table(
     Column('language', String(255), nullable=True),
     Column('website', String(255), nullable=True),
     Column('author_id', ForeignKey('authors.author_id')),
-    Column('itunes_id', Integer, nullable=True)
+    Column('itunes_id', Integer, nullable=True),
+    # Rating aggregates, maintained by SqlAlchemyRepository.add_review rather than computed from the reviews table.
+    Column('review_count', Integer, nullable=False, default=0, server_default='0'),
+    Column('rating_total', Integer, nullable=False, default=0, server_default='0'),
+    *[Column(f'rating_{rating}', Integer, nullable=False, default=0, server_default='0') for rating in RATING_VALUES]
 )
 
+# Columns read and written with SQL only. They are left out of the Podcast mapping so that merging a stale Podcast
+# object can never overwrite counts that were incremented since it was loaded.
+RATING_COLUMNS = ['review_count', 'rating_total'] + [f'rating_{rating}' for rating in RATING_VALUES]
+
 author_table = Table(
     'authors', mapper_registry.metadata,
     Column('author_id', Integer, primary_key=True), #autoincrement=True),
@@ -53,7 +62,7 @@ reviews_table = Table(
     'reviews', mapper_registry.metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('user_id', Integer, ForeignKey('users.id')),
-    Column('podcast_id', Integer, ForeignKey('podcasts.podcast_id')),
+    Column('podcast_id', Integer, ForeignKey('podcasts.podcast_id'), index=True),
     Column('rating', Integer, nullable=False),
     Column('comment', Text, nullable=True)
 )
@@ -86,6 +95,47 @@ playlist_episodes_table = Table(
     Column('playlist_id', ForeignKey('playlists.id'))
 )
 
+def upgrade_schema(engine) -> list:
+    """Add columns and indexes that were introduced after a database file was created. Returns the added columns."""
+    inspector = inspect(engine)
+    added_columns = []
+    with engine.begin() as connection:
+        for table in mapper_registry.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                definition = f"{column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    definition += f" NOT NULL DEFAULT {column.server_default.arg}"
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+                added_columns.append(f"{table.name}.{column.name}")
+    for table in mapper_registry.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    return added_columns
+
+# Mapping replaces the slot descriptors of the slotted domain classes with instrumented attributes, and clear_mappers()
+# deletes those without putting the slots back, which would leave unmapped instances keeping every attribute in their
+# __dict__. The descriptors are kept from before any mapping and restored as each class is unmapped.
+SLOTTED_CLASSES = (User, Podcast, Author, Episode, Category, Review)
+slot_descriptors = {
+    cls: {name: cls.__dict__[name] for name in cls.__slots__ if name not in MAPPED_CLASS_SLOTS}
+    for cls in SLOTTED_CLASSES
+}
+
+
+def restore_slots(cls):
+    for name, descriptor in slot_descriptors[cls].items():
+        setattr(cls, name, descriptor)
+
+
+for slotted_class in SLOTTED_CLASSES:
+    event.listen(slotted_class, 'class_uninstrument', restore_slots)
+
+
 def map_model_to_tables():
     mapper_registry.map_imperatively(User, users_table, properties={
         '_id': users_table.c.id,
@@ -104,9 +154,9 @@ def map_model_to_tables():
         '_itunes_id': podcast_table.c.itunes_id,
         '_author': relationship(Author, back_populates='_podcast_list'),
         '_reviews': relationship(Review, back_populates='podcast'),
-        'episodes': relationship(Episode, back_populates='podcast'),
-        'categories': relationship(Category, secondary=podcast_categories_table),
-    })
+        'episodes': relationship(Episode, back_populates='podcast', collection_class=OrderedSet),
+        'categories': relationship(Category, secondary=podcast_categories_table, collection_class=OrderedSet),
+    }, exclude_properties=RATING_COLUMNS)
     mapper_registry.map_imperatively(Author, author_table, properties={
         '_id': author_table.c.author_id,
         '_name': author_table.c.name,
@@ -139,6 +189,6 @@ def map_model_to_tables():
         '_id' : playlist_table.c.id,
         '_name': playlist_table.c.name,
         '_creator': relationship(User, back_populates='_playlist'),
-        '_podcast_list': relationship(Podcast, secondary=playlist_podcasts_table),
-        '_episode_list': relationship(Episode, secondary=playlist_episodes_table),
+        '_podcast_list': relationship(Podcast, secondary=playlist_podcasts_table, collection_class=OrderedSet),
+        '_episode_list': relationship(Episode, secondary=playlist_episodes_table, collection_class=OrderedSet),
     })
\ No newline at end of file
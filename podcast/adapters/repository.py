@@ -1,9 +1,14 @@
 import abc
-from typing import List
+from typing import Dict, List, Tuple
 
-from podcast.domainmodel.model import Podcast, Episode, User, Review, Playlist, Author, Category, Episode
+from podcast.domainmodel.model import Podcast, Episode, User, Review, Playlist, Author, Category, Episode, \
+    RatingSummary
 repo_instance = None
 
+# A load plan names the relationships a caller is about to read, e.g. ('author', 'categories') for podcasts or
+# ('podcast.author',) for episodes, so a database repository can fetch them up front instead of one query per object.
+LoadPlan = Tuple[str, ...]
+
 class RepositoryException(Exception):
     def __init__(self, message=None):
         print(f'Repository exception: {message}')
@@ -46,7 +51,19 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_podcasts(self) -> List[Podcast]:
+    def get_podcasts(self, load: LoadPlan = ()) -> List[Podcast]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_podcasts_page(self, after_id: int = None, limit: int = 10, load: LoadPlan = ()) -> List[Podcast]:
+        """ Returns up to limit podcasts with ids greater than after_id (from the first podcast if None), in id
+        order. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_podcasts_page_before(self, before_id: int = None, limit: int = 10,
+                                 load: LoadPlan = ()) -> List[Podcast]:
+        """ Returns up to limit podcasts immediately before before_id (the last podcasts if None), in id order. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -57,6 +74,17 @@ class AbstractRepository(abc.ABC):
     def get_episodes(self, podcast: Podcast) -> List[Episode]:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_episodes_page(self, podcast_id: int, after_id: int = None, limit: int = 3) -> List[Episode]:
+        """ Returns up to limit of the podcast's episodes with ids greater than after_id, in id order. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_episodes_page_before(self, podcast_id: int, before_id: int = None, limit: int = 3) -> List[Episode]:
+        """ Returns up to limit of the podcast's episodes immediately before before_id (the last ones if None), in id
+        order. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_number_of_episodes(self, podcast: Podcast) -> int:
         raise NotImplementedError
@@ -72,6 +100,26 @@ class AbstractRepository(abc.ABC):
     def get_reviews(self):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_reviews_for_podcast(self, podcast_id: int, limit: int = None, offset: int = 0) -> List[Review]:
+        """ Returns the podcast's reviews in the order they were added, skipping the first offset of them and
+        returning at most limit. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_number_of_reviews_for_podcast(self, podcast_id: int) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_rating_summary(self, podcast_id: int) -> RatingSummary:
+        """ Returns the review count, rating total and rating histogram of the podcast, which add_review keeps up to
+        date. A podcast without reviews has an empty summary. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_rating_summaries(self, podcast_ids: List[int]) -> Dict[int, RatingSummary]:
+        raise NotImplementedError
+
     @abc.abstractmethod
     def add_to_user_playlist(self, user: User, item: Podcast | Episode):
         raise NotImplementedError
@@ -85,11 +133,11 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_user_podcast_playlist(self, user: User):
+    def get_user_podcast_playlist(self, user: User, load: LoadPlan = ()):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_user_episode_playlist(self, user: User):
+    def get_user_episode_playlist(self, user: User, load: LoadPlan = ()):
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -97,9 +145,20 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def search_podcasts(self, search_term: str, search_filter: str):
+    def search_podcasts(self, search_term: str, search_filter: str, limit: int = None, offset: int = 0):
+        """ Returns the podcasts matching search_term in the search_filter field, skipping the first offset matches
+        and returning at most limit of them. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_number_of_search_results(self, search_term: str, search_filter: str) -> int:
         raise NotImplementedError
 
     @abc.abstractmethod
     def get_user_count(self):
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def adopt_cached(self, value):
+        """ Returns a result read earlier, possibly by another request, in a form the current request can use. Results
+        of this repository can be used as they are. """
+        return value
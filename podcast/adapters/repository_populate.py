@@ -1,39 +1,70 @@
 from pathlib import Path
 
+from podcast.adapters import snapshot
 from podcast.adapters.repository import AbstractRepository
 from podcast.adapters.datareader.csvdatareader import CSVDataReader
 from utils import get_project_root
 
-def populate(data_path: Path, repo: AbstractRepository, database_mode: bool):
-    data_reader = CSVDataReader()
+# The catalogue that ships with the app, which is covered by the tests.
+SHIPPED_CATALOGUE_PATH = get_project_root() / "podcast" / "adapters" / "data"
+
+
+def is_shipped_catalogue(data_path: Path) -> bool:
+    return Path(data_path).resolve() == SHIPPED_CATALOGUE_PATH.resolve()
+
+
+def populate(data_path: Path, repo: AbstractRepository, database_mode: bool, snapshot_dir: Path = None,
+             trusted_data: bool = False, catalogue_only: bool = False):
+    # catalogue_only loads podcasts and episodes without the users and reviews of the test data, for a catalogue
+    # reload that carries over the users and reviews already in the running app. Such a repository is not snapshotted.
+    use_snapshot = not database_mode and snapshot_dir is not None and not catalogue_only
+    if use_snapshot:
+        # Reuse the already parsed and linked catalogue unless the data files have changed since it was saved.
+        state = snapshot.load_snapshot(snapshot_dir, data_path)
+        if state is not None:
+            repo.restore_state(state)
+            return
+        signature = snapshot.source_signature(data_path)
+
+    # Podcasts and episodes are validated unless the caller vouches for the files, as for the shipped catalogue.
+    data_reader = CSVDataReader(trusted=trusted_data)
+    test_data = data_path == get_project_root() / "tests" / "data" and not catalogue_only
 
     # Load podcasts and episodes into the repository
     data_reader.read_podcasts(data_path)
-    data_reader.read_episodes(data_path)
 
+    if database_mode and repo.get_number_of_podcasts() == 0:
+        # An empty database is filled in a single transaction, one executemany per table, with episodes streamed in.
+        if test_data:
+            data_reader.read_users(data_path)
+            data_reader.read_reviews(data_path)
+        return repo.bulk_load(data_reader.authors_by_name.values(), data_reader.categories_by_name.values(),
+                              data_reader.podcasts_by_id.values(), data_reader.iter_episodes(data_path),
+                              data_reader.users_by_id.values(), data_reader.dataset_of_reviews)
+
+    if not database_mode:
+        # The memory repository serves episodes from each podcast's episode list, so they are all attached up front.
+        data_reader.read_episodes(data_path)
+
+    # The reader's indexes hold exactly one object per key, so each entity is handed to the repository once.
     if database_mode:
         # Add authors to the repo
-        for author in data_reader.dataset_of_authors:
+        for author in data_reader.authors_by_name.values():
             repo.add_author(author)
 
         # Add categories to the repo
-        for category in data_reader.dataset_of_categories:
+        for category in data_reader.categories_by_name.values():
             repo.add_category(category)
 
 
-    for podcast in data_reader.dataset_of_podcasts:
+    for podcast in data_reader.podcasts_by_id.values():
         repo.add_podcast(podcast)
 
-    if database_mode:
-        # Add episodes to the repo
-        for episode in data_reader.dataset_of_episodes:
-            repo.add_episode(episode)
-
-    if data_path == get_project_root() / "tests" / "data":
+    if test_data:
         data_reader.read_users(data_path)  # data path paramter
         data_reader.read_reviews(data_path)  # data path paramter
 
-        users = data_reader.dataset_of_users
+        users = data_reader.users_by_id.values()
         for user in users:
             repo.add_user(user)
 
@@ -41,4 +72,14 @@ def populate(data_path: Path, repo: AbstractRepository, database_mode: bool):
         for review in reviews:
             repo.add_review(review)
             review._poster.add_review(review)
-            review._podcast.add_review(review)
\ No newline at end of file
+            review._podcast.add_review(review)
+
+    if use_snapshot:
+        snapshot.save_snapshot(snapshot_dir, data_path, repo.export_state(), signature)
+
+    if database_mode:
+        # Stream episodes into the repo last, one batch at a time, so they are never all held in memory. Podcasts are
+        # stored without their episodes, so nothing merged after this point may cascade an empty episode list.
+        for batch in data_reader.iter_episodes(data_path):
+            for episode in batch:
+                repo.add_episode(episode)
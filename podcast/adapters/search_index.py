@@ -0,0 +1,93 @@
+from typing import Dict, List, Set
+
+from podcast.domainmodel.model import Podcast, Author
+
+SEARCH_FILTERS = ('Title', 'Category', 'Author', 'Language')
+
+# Substrings up to this length are indexed directly; longer search terms are narrowed down through them.
+GRAM_LENGTH = 3
+
+
+def grams_of(text: str, length: int = GRAM_LENGTH) -> Set[str]:
+    return {text[start:start + size] for size in range(1, length + 1) for start in range(len(text) - size + 1)}
+
+
+class PodcastSearchIndex:
+    """Case-insensitive substring search over podcast titles, categories, authors and languages.
+
+    For each search filter, every distinct lowercased field value maps to the ids of the podcasts that have it, and
+    every substring of up to GRAM_LENGTH characters maps to the values containing it. A search only looks at the
+    values sharing all of the term's grams, so its cost follows the number of matches rather than the catalogue size.
+    """
+
+    def __init__(self):
+        self.__podcasts: Dict[int, Podcast] = {}
+        self.__fields: Dict[int, list] = {}
+        self.__values: Dict[str, Dict[str, Set[int]]] = {search_filter: {} for search_filter in SEARCH_FILTERS}
+        self.__grams: Dict[str, Dict[str, Set[str]]] = {search_filter: {} for search_filter in SEARCH_FILTERS}
+
+    @staticmethod
+    def field_values(podcast: Podcast) -> list:
+        author_name = podcast.author.name if isinstance(podcast.author, Author) else None
+        fields = [('Title', podcast.title), ('Author', author_name), ('Language', podcast.language)]
+        fields += [('Category', category.name) for category in podcast.categories]
+        return [(search_filter, value.lower()) for search_filter, value in fields if value]
+
+    def add(self, podcast: Podcast):
+        if podcast.id in self.__podcasts:
+            self.remove(self.__podcasts[podcast.id])
+
+        # The indexed values are remembered so the podcast can be removed even if its fields are edited later.
+        fields = self.field_values(podcast)
+        self.__podcasts[podcast.id] = podcast
+        self.__fields[podcast.id] = fields
+
+        for search_filter, value in fields:
+            podcast_ids = self.__values[search_filter].get(value)
+            if podcast_ids is None:
+                podcast_ids = self.__values[search_filter][value] = set()
+                for gram in grams_of(value):
+                    self.__grams[search_filter].setdefault(gram, set()).add(value)
+            podcast_ids.add(podcast.id)
+
+    def remove(self, podcast: Podcast):
+        fields = self.__fields.pop(podcast.id, None)
+        if fields is None:
+            return
+        del self.__podcasts[podcast.id]
+
+        for search_filter, value in fields:
+            podcast_ids = self.__values[search_filter].get(value)
+            if podcast_ids is None:
+                continue
+            podcast_ids.discard(podcast.id)
+            if not podcast_ids:
+                del self.__values[search_filter][value]
+                for gram in grams_of(value):
+                    values = self.__grams[search_filter][gram]
+                    values.discard(value)
+                    if not values:
+                        del self.__grams[search_filter][gram]
+
+    def search(self, search_term: str, search_filter: str) -> List[Podcast]:
+        term = search_term.lower()
+        if term == "" or search_filter not in self.__values:
+            return []
+
+        grams = self.__grams[search_filter]
+        if len(term) <= GRAM_LENGTH:
+            candidates = grams.get(term, ())
+        else:
+            postings = [grams.get(gram) for gram in grams_of(term, GRAM_LENGTH) if len(gram) == GRAM_LENGTH]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+
+        podcast_ids = set()
+        for value in candidates:
+            if term in value:
+                podcast_ids.update(self.__values[search_filter][value])
+
+        # Each podcast is returned once, in the same id order as the repository's podcast list.
+        return [self.__podcasts[podcast_id] for podcast_id in sorted(podcast_ids)]
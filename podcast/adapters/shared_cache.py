@@ -0,0 +1,215 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable
+
+# Version scopes. Every cached entry names the scopes its data came from, and a write bumps the scopes it changes:
+# the catalogue for podcasts, authors and categories, reviews for any review (ratings show on catalogue pages), and
+# one podcast's scope for its reviews and episodes, and one user's scope for their playlist. Versions are the time of
+# the last bump in milliseconds, or one more than the version before if the clock is behind it, so that they also tell
+# when the data last changed.
+CATALOGUE = 'catalogue'
+REVIEWS = 'reviews'
+# Set when the cache is created and bumped when it is cleared, for data that may have changed without any bumps.
+EPOCH = 'epoch'
+
+# The cache of pages and fragments used by this process's requests, a SharedCache or a LocalCache set up by create_app;
+# None when there is none.
+instance = None
+
+
+def podcast_scope(podcast_id: int) -> str:
+    return f'podcast:{podcast_id}'
+
+
+def user_scope(user_name: str) -> str:
+    return f'user:{user_name}'
+
+
+def now_version() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def format_stamp(scopes: Iterable[str], versions: dict) -> str:
+    return ' '.join(f'{scope}={versions.get(scope, 0)}' for scope in sorted(set(scopes)))
+
+
+class SharedCache:
+    """Cache shared by every worker process on a host, kept in an SQLite file.
+
+    Entries hold plain, picklable data, such as the podcast dicts of a catalogue page, together with the version stamp
+    of the scopes they were computed from. Writes bump the versions of the scopes they change, in the same file, so an
+    entry stops being served in every process as soon as one of them changes its data. Entries also expire after ttl
+    seconds, for changes made around the app. A worker started after the others begins with the entries they have
+    already computed; create_app clears them when the app itself starts, as its templates or data may have changed.
+    """
+
+    # Expired entries are removed, and the oldest ones beyond max_entries, once every this many stores.
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: Path, ttl: float = 300.0, max_entries: int = 10000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__stores = 0
+        self.hits = 0
+        self.misses = 0
+        connection = self.__connection()
+        connection.execute("CREATE TABLE IF NOT EXISTS versions (scope TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stamp TEXT NOT NULL, "
+                           "expires REAL NOT NULL, value BLOB NOT NULL)")
+        connection.execute("INSERT OR IGNORE INTO versions (scope, version) VALUES (?, ?)", (EPOCH, now_version()))
+
+    def __connection(self) -> sqlite3.Connection:
+        # SQLite connections can be used neither from several threads nor after a fork, so each thread of each process
+        # opens its own.
+        local = self.__local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # Readers are not blocked by the writer, and writes are not synced to disk; a lost entry is recomputed.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def versions(self, scopes: Iterable[str]) -> dict:
+        scopes = sorted(set(scopes))
+        rows = self.__connection().execute(
+            f"SELECT scope, version FROM versions WHERE scope IN ({', '.join('?' * len(scopes))})", scopes)
+        return dict(rows.fetchall())
+
+    def stamp(self, scopes: Iterable[str]) -> str:
+        return format_stamp(scopes, self.versions(scopes))
+
+    def bump(self, *scopes: str):
+        version = now_version()
+        self.__connection().executemany(
+            "INSERT INTO versions (scope, version) VALUES (?, ?) "
+            "ON CONFLICT (scope) DO UPDATE SET version = max(version + 1, excluded.version)",
+            [(scope, version) for scope in scopes])
+
+    def get_or_compute(self, key: str, scopes: Iterable[str], compute: Callable):
+        # The stamp is taken before computing, so data computed while a write bumped one of its scopes is stored
+        # under the old stamp and never served.
+        stamp = self.stamp(scopes)
+        row = self.__connection().execute("SELECT value FROM entries WHERE key = ? AND stamp = ? AND expires > ?",
+                                          (key, stamp, time.time())).fetchone()
+        if row is not None:
+            with self.__lock:
+                self.hits += 1
+            return pickle.loads(row[0])
+        with self.__lock:
+            self.misses += 1
+        # Everything computed here is served by every process until one of the scopes is bumped, so it must come from
+        # the repository itself rather than from the results a process cached before another one's write.
+        local = self.__local
+        local.computing = getattr(local, 'computing', 0) + 1
+        try:
+            value = compute()
+        finally:
+            local.computing -= 1
+        self.put(key, stamp, value)
+        return value
+
+    def computing(self) -> bool:
+        # Whether this thread is computing an entry.
+        return getattr(self.__local, 'computing', 0) > 0
+
+    def put(self, key: str, stamp: str, value):
+        connection = self.__connection()
+        connection.execute("INSERT OR REPLACE INTO entries (key, stamp, expires, value) VALUES (?, ?, ?, ?)",
+                           (key, stamp, time.time() + self.ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        with self.__lock:
+            self.__stores += 1
+            prune = self.__stores % self.PRUNE_EVERY == 0
+        if prune:
+            connection.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+            connection.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires DESC "
+                               "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        self.__connection().execute("DELETE FROM entries")
+        self.bump(EPOCH)
+
+    def stats(self) -> dict:
+        size = self.__connection().execute("SELECT count(*) FROM entries").fetchone()[0]
+        return {'size': size, 'hits': self.hits, 'misses': self.misses}
+
+
+class LocalCache:
+    """The same cache as SharedCache, kept in this process: for memory mode, or when there is no shared file.
+
+    Up to max_entries values are kept, least recently used first out. They are not copied, so callers must not change
+    what they get.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 300.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.__versions = {EPOCH: now_version()}
+        # Key -> (stamp, expiry time, value), least recently used first.
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def versions(self, scopes: Iterable[str]) -> dict:
+        with self.__lock:
+            return {scope: self.__versions[scope] for scope in scopes if scope in self.__versions}
+
+    def stamp(self, scopes: Iterable[str]) -> str:
+        return format_stamp(scopes, self.versions(scopes))
+
+    def bump(self, *scopes: str):
+        version = now_version()
+        with self.__lock:
+            for scope in scopes:
+                self.__versions[scope] = max(self.__versions.get(scope, 0) + 1, version)
+
+    def get_or_compute(self, key: str, scopes: Iterable[str], compute: Callable):
+        stamp = self.stamp(scopes)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] == stamp and entry[1] > time.monotonic():
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = compute()
+        self.put(key, stamp, value)
+        return value
+
+    def computing(self) -> bool:
+        # The process's own caches are dropped by its writes as they are made, so they may be used for entries here.
+        return False
+
+    def put(self, key: str, stamp: str, value):
+        with self.__lock:
+            self.__entries[key] = (stamp, time.monotonic() + self.ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+        self.bump(EPOCH)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {'size': len(self.__entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def cached(key: tuple, scopes: Iterable[str], compute: Callable):
+    # Computes the value directly when no cache is set up. Keys are tuples of plain values.
+    if instance is None:
+        return compute()
+    return instance.get_or_compute(repr(key), scopes, compute)
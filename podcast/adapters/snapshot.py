@@ -0,0 +1,80 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+# Bump whenever the pickled repository state changes shape, so snapshots written by older code are rebuilt.
+SNAPSHOT_VERSION = 8
+
+# Data files a memory repository can be populated from; whichever of them exist make up the snapshot key.
+SOURCE_FILES = ('podcasts.csv', 'episodes.csv', 'users.csv', 'reviews.csv')
+
+
+def snapshot_file(snapshot_dir: Path, data_path: Path) -> Path:
+    # One snapshot per data directory, so the app's catalogue and the test catalogue do not overwrite each other.
+    key = hashlib.sha1(str(Path(data_path).resolve()).encode('utf-8')).hexdigest()[:16]
+    return Path(snapshot_dir) / f'catalogue-{key}.pickle'
+
+
+def file_digest(file_name: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_name, mode='rb') as data_file:
+        for chunk in iter(lambda: data_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_signature(data_path: Path) -> dict:
+    signature = {}
+    for name in SOURCE_FILES:
+        file_name = Path(data_path) / name
+        if file_name.exists():
+            stat = file_name.stat()
+            signature[name] = (stat.st_size, stat.st_mtime_ns, file_digest(file_name))
+    return signature
+
+
+def signature_matches(data_path: Path, signature: dict) -> bool:
+    present = {name for name in SOURCE_FILES if (Path(data_path) / name).exists()}
+    if present != set(signature):
+        return False
+
+    for name, (size, mtime_ns, digest) in signature.items():
+        stat = (Path(data_path) / name).stat()
+        if stat.st_size != size:
+            return False
+        # Size and mtime unchanged is taken as unchanged; otherwise only the content hash decides.
+        if stat.st_mtime_ns != mtime_ns and file_digest(Path(data_path) / name) != digest:
+            return False
+    return True
+
+
+def load_snapshot(snapshot_dir: Path, data_path: Path):
+    """Return the repository state saved for data_path, or None if there is none or the data files have changed."""
+    file_name = snapshot_file(snapshot_dir, data_path)
+    try:
+        with open(file_name, mode='rb') as snapshot:
+            # The header is pickled separately so a stale snapshot is rejected without unpickling the catalogue.
+            header = pickle.load(snapshot)
+            if header.get('version') != SNAPSHOT_VERSION or not signature_matches(data_path, header['signature']):
+                return None
+            return pickle.load(snapshot)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, KeyError, TypeError):
+        return None
+
+
+def save_snapshot(snapshot_dir: Path, data_path: Path, state: dict, signature: dict):
+    # signature should be taken before the data files are parsed, so an edit made meanwhile invalidates the snapshot.
+    file_name = snapshot_file(snapshot_dir, data_path)
+    file_name.parent.mkdir(parents=True, exist_ok=True)
+    header = {'version': SNAPSHOT_VERSION, 'signature': signature}
+
+    # Write to a temporary file and rename it into place, so a concurrently starting worker never reads half a file.
+    temp_name = file_name.with_name(f'{file_name.name}.{os.getpid()}.tmp')
+    try:
+        with open(temp_name, mode='wb') as snapshot:
+            pickle.dump(header, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(state, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_name, file_name)
+    except (OSError, pickle.PicklingError, RecursionError):
+        temp_name.unlink(missing_ok=True)
@@ -0,0 +1,65 @@
+"""Fingerprinted URLs of the static files, which browsers may keep for good.
+
+A file's fingerprinted name carries a hash of its content, css/main.css becoming css/main.<hash>.css, so a changed file
+gets a new URL and the old one never has to be checked again. The names are worked out when the app starts; restart
+it after changing a static file.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict
+
+from flask import Response, url_for
+
+# A year, the longest max-age browsers are expected to honour.
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Static file name -> fingerprinted name, built by create_app.
+manifest: Dict[str, str] = {}
+# Fingerprinted name -> static file name.
+originals: Dict[str, str] = {}
+
+
+def fingerprint(filename: str, data: bytes) -> str:
+    path = Path(filename)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()
+
+
+def build_manifest(static_folder: Path) -> Dict[str, str]:
+    static_folder = Path(static_folder)
+    result = {}
+    for path in sorted(static_folder.rglob('*')):
+        # Precompressed copies are found through the file they were made from.
+        if path.is_file() and path.suffix != '.gz':
+            filename = path.relative_to(static_folder).as_posix()
+            result[filename] = fingerprint(filename, path.read_bytes())
+    return result
+
+
+def load_manifest(static_folder: Path):
+    global manifest, originals
+    manifest = build_manifest(static_folder)
+    originals = {fingerprinted: filename for filename, fingerprinted in manifest.items()}
+
+
+def static_url(endpoint: str, **values) -> str:
+    # Takes the same arguments as url_for, and links static files under their fingerprinted names.
+    if endpoint == 'static' and values.get('filename') in manifest:
+        values['filename'] = manifest[values['filename']]
+    return url_for(endpoint, **values)
+
+
+def immutable_static_view(send_static_file: Callable[..., Response]) -> Callable[..., Response]:
+    # Wraps the app's static view so that fingerprinted names are served from their files, to be kept for good. Flask
+    # calls views with keyword arguments only, and its own static view takes nothing else.
+    def static_view(filename: str) -> Response:
+        if filename not in originals:
+            return send_static_file(filename=filename)
+        response = send_static_file(filename=originals[filename])
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    return static_view
@@ -1,10 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, session, request, flash
+from flask import Blueprint, render_template, redirect, url_for, session, request, flash, g
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Length, ValidationError
 from password_validator import PasswordValidator
 from functools import wraps
-import podcast.adapters.repository as repo
 import podcast.authentication.services as services
 
 authentication_blueprint = Blueprint(
@@ -17,7 +16,7 @@ def register():
 
     if form.validate_on_submit():
         try:
-            services.add_user(form.user_name.data, form.password.data, repo.repo_instance)
+            services.add_user(form.user_name.data, form.password.data, g.repository)
             flash('Registration successful! You can now log in.', 'success')
             return redirect(url_for('authentication_bp.login'))
         except services.NameNotUniqueException:
@@ -43,9 +42,9 @@ def login():
 
     if form.validate_on_submit():
         try:
-            user = services.get_user(form.user_name.data, repo.repo_instance)
+            user = services.get_user(form.user_name.data, g.repository)
 
-            services.authenticate_user(user['user_name'], form.password.data, repo.repo_instance)
+            services.authenticate_user(user['user_name'], form.password.data, g.repository)
 
             session.clear()
             session['user_name'] = user['user_name']
@@ -1,62 +1,54 @@
-from flask import Blueprint, render_template, request, url_for, session
+from flask import Blueprint, render_template, request, url_for, session, g
 
-import podcast.adapters.repository as repo
 import podcast.browse.services as services
+from podcast.adapters.shared_cache import CATALOGUE, REVIEWS
+from podcast.conditional import conditional
+from podcast.fragments import render_fragment
 
 browse_blueprint = Blueprint('browse_bp', __name__)
 
 @browse_blueprint.route('/browse', methods=['GET'])
+@conditional(lambda: (CATALOGUE, REVIEWS))
 def browse():
     podcasts_per_page = 10
 
-    cursor = request.args.get('cursor')
+    # Pages are addressed by podcast id: after=<id> for the page following a podcast, before=<id> for the page
+    # preceding it, and page=last for the end of the catalogue.
+    after_id = request.args.get('after', type=int)
+    before_id = request.args.get('before', type=int)
+    last_page = request.args.get('page') == 'last'
 
-    if cursor is None:
-        # Cursor starts at beginning
-        cursor = 0
-    else:
-        # Convert string cursor to int
-        cursor = int(cursor)
-
-    num_podcasts = services.get_number_of_podcasts(repo.repo_instance)
-    all_podcasts = services.get_podcasts(repo.repo_instance)
-
-    # Podcasts to show on this page
-    podcasts = all_podcasts[cursor : cursor + podcasts_per_page]
-
-    # Ensure each podcast has a unique podcast_id that considers the cursor
-    for i, podcast in enumerate(podcasts):
-        podcast['podcast_id'] = cursor + i+1
+    num_podcasts, podcasts, has_previous, has_next = services.get_catalogue_page(
+        g.repository, after_id=after_id, before_id=before_id, last=last_page, limit=podcasts_per_page)
+    podcast_cards = render_fragment(
+        'fragments/podcast_cards.html', ('browse', after_id, before_id, last_page, podcasts_per_page),
+        (CATALOGUE, REVIEWS), lambda: {'podcasts': podcasts, 'number_of_podcasts': num_podcasts})
 
     first_podcast_url = None
     last_podcast_url = None
     next_podcast_url = None
     prev_podcast_url = None
 
-    if cursor > 0:
+    if has_previous:
         # There are podcasts before
-        prev_podcast_url = url_for('browse_bp.browse', cursor=cursor - podcasts_per_page)
+        prev_podcast_url = url_for('browse_bp.browse', before=podcasts[0]['id'])
         first_podcast_url = url_for('browse_bp.browse')
 
-    if cursor + podcasts_per_page < num_podcasts:
+    if has_next:
         # There are next and last podcasts
-        next_podcast_url = url_for('browse_bp.browse', cursor=cursor + podcasts_per_page)
-
-        last_cursor = podcasts_per_page * int(num_podcasts / podcasts_per_page)
-        if num_podcasts % podcasts_per_page == 0:
-            last_cursor -= podcasts_per_page
-        last_podcast_url = url_for('browse_bp.browse', cursor=last_cursor)
+        next_podcast_url = url_for('browse_bp.browse', after=podcasts[-1]['id'])
+        last_podcast_url = url_for('browse_bp.browse', page='last')
 
-    session['history'] = url_for('browse_bp.browse', cursor=cursor)
+    session['history'] = url_for('browse_bp.browse', after=after_id, before=before_id,
+                                 page='last' if last_page else None)
 
     return render_template(
         '/catalogue.html',
         title='Podcast Catalogue',
-        podcasts=podcasts,
+        podcast_cards=podcast_cards,
         first_podcast_url=first_podcast_url,
         last_podcast_url=last_podcast_url,
         prev_podcast_url=prev_podcast_url,
         next_podcast_url=next_podcast_url,
-        cursor=cursor,
         number_of_podcasts=num_podcasts
     )
\ No newline at end of file
@@ -1,25 +1,66 @@
 from podcast.adapters.repository import AbstractRepository
+from podcast.adapters.shared_cache import CATALOGUE, REVIEWS, cached
 from podcast.domainmodel.model import Podcast
 
+# Relationships each catalogue card reads
+PODCAST_CARD_LOAD = ('author', 'categories')
+
 def get_number_of_podcasts(repo: AbstractRepository):
     return repo.get_number_of_podcasts()
 
+def podcast_to_dict(podcast: Podcast):
+    # Plain values only, so the dicts can be kept in the shared cache.
+    category_names = [category.name for category in podcast.categories]
+    podcast_dict = {
+        'id': podcast.id,
+        'podcast_id': podcast.id,
+        'title': podcast.title,
+        'author':  podcast.author.name if podcast.author is not None else None,
+        'image': podcast.image,
+        'description': podcast.description,
+        'language': podcast.language,
+        'website': podcast.website,
+        'itunes': podcast.itunes_id,
+        'categories': category_names
+    }
+    return podcast_dict
+
 def get_podcasts(repo: AbstractRepository):
-    podcasts = repo.get_podcasts()
-    podcast_dicts = []
+    podcasts = repo.get_podcasts(load=PODCAST_CARD_LOAD)
+    return [podcast_to_dict(podcast) for podcast in podcasts]
+
+def get_podcasts_page(repo: AbstractRepository, after_id: int = None, before_id: int = None, last: bool = False,
+                      limit: int = 10):
+    """Return one catalogue page as (podcast dicts, has previous page, has next page).
+
+    Pages are found by podcast id (after_id, before_id, or the last page), so only the podcasts shown are loaded.
+    """
+    if before_id is not None or last:
+        podcasts = repo.get_podcasts_page_before(before_id, limit, load=PODCAST_CARD_LOAD)
+        if len(podcasts) < limit:
+            # Walking back reached the start of the catalogue; show a full first page instead of a short one.
+            podcasts = repo.get_podcasts_page(None, limit, load=PODCAST_CARD_LOAD)
+    else:
+        podcasts = repo.get_podcasts_page(after_id, limit, load=PODCAST_CARD_LOAD)
 
+    has_previous = len(podcasts) > 0 and len(repo.get_podcasts_page_before(podcasts[0].id, 1)) > 0
+    has_next = len(podcasts) > 0 and len(repo.get_podcasts_page(podcasts[-1].id, 1)) > 0
+
+    # Ratings for the whole page come from the stored aggregates in one lookup.
+    rating_summaries = repo.get_rating_summaries([podcast.id for podcast in podcasts])
+    podcast_dicts = []
     for podcast in podcasts:
-        category_names = [category.name for category in podcast.categories]
-        podcast_dict = {
-            'id': podcast.id,
-            'title': podcast.title,
-            'author':  podcast.author,
-            'image': podcast.image,
-            'description': podcast.description,
-            'language': podcast.language,
-            'website': podcast.website,
-            'itunes': podcast.itunes_id,
-            'categories': category_names
-        }
+        podcast_dict = podcast_to_dict(podcast)
+        podcast_dict['rating_summary'] = rating_summaries.get(podcast.id)
         podcast_dicts.append(podcast_dict)
-    return podcast_dicts
\ No newline at end of file
+    return podcast_dicts, has_previous, has_next
+
+
+def get_catalogue_page(repo: AbstractRepository, after_id: int = None, before_id: int = None, last: bool = False,
+                       limit: int = 10):
+    """Return (number of podcasts, podcast dicts, has previous page, has next page) for one catalogue page.
+
+    Shared between worker processes through the shared cache, if there is one, until the catalogue or a review changes.
+    """
+    return cached(('browse', after_id, before_id, last, limit), (CATALOGUE, REVIEWS),
+                  lambda: (get_number_of_podcasts(repo),) + get_podcasts_page(repo, after_id, before_id, last, limit))
@@ -0,0 +1,94 @@
+"""Gzip compression of responses, and of the static files ahead of time.
+
+Precompress the static files as part of a build, from the project directory, with:  python -m podcast.compression
+"""
+
+import gzip
+import mimetypes
+import sys
+from pathlib import Path
+
+from flask import Response, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+# Types worth compressing; images and audio are compressed already.
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                      'application/json', 'image/svg+xml')
+STATIC_FOLDER = Path(__file__).parent / 'static'
+
+
+def is_compressible(mimetype: str) -> bool:
+    return mimetype in COMPRESSIBLE_TYPES
+
+
+def accepts_gzip() -> bool:
+    return request.accept_encodings['gzip'] > 0
+
+
+def compress(data: bytes, level: int) -> bytes:
+    # Without a modification time in the header, the same data always compresses to the same bytes.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_response(response: Response, min_size: int, level: int) -> Response:
+    # Files are streamed from disk, and the static ones that are worth it have been compressed ahead of time.
+    if response.direct_passthrough or response.status_code != 200 or not is_compressible(response.mimetype) \
+            or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip() or response.content_length is None or response.content_length < min_size:
+        return response
+
+    response.set_data(compress(response.get_data(), level))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The compressed bytes are a different representation of the same page.
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def send_static_file(filename: str) -> Response:
+    # Replaces Flask's static view: a compressed copy made by precompress_static is sent to clients that take gzip, as
+    # long as it is not older than the file itself.
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    max_age = current_app.get_send_file_max_age(filename)
+    if not is_compressible(mimetype):
+        return send_from_directory(static_folder, filename, max_age=max_age)
+
+    original, compressed = safe_join(static_folder, filename), safe_join(static_folder, filename + '.gz')
+    if accepts_gzip() and original is not None and compressed is not None and Path(compressed).is_file() \
+            and Path(original).is_file() and Path(compressed).stat().st_mtime >= Path(original).stat().st_mtime:
+        response = send_from_directory(static_folder, filename + '.gz', mimetype=mimetype, max_age=max_age)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(static_folder, filename, max_age=max_age)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def precompress_static(static_folder: Path = STATIC_FOLDER, min_size: int = 0, level: int = 9) -> dict:
+    """Write a .gz copy next to every compressible file in static_folder of at least min_size bytes, unless it would
+    not be smaller. Returns the number of files compressed and their total size before and after."""
+    stats = {'files': 0, 'bytes': 0, 'compressed_bytes': 0}
+    for path in sorted(Path(static_folder).rglob('*')):
+        if not path.is_file() or path.suffix == '.gz' or not is_compressible(mimetypes.guess_type(path.name)[0]):
+            continue
+        data = path.read_bytes()
+        compressed = compress(data, level)
+        target = path.with_name(path.name + '.gz')
+        if len(data) < min_size or len(compressed) >= len(data):
+            target.unlink(missing_ok=True)
+            continue
+        target.write_bytes(compressed)
+        stats['files'] += 1
+        stats['bytes'] += len(data)
+        stats['compressed_bytes'] += len(compressed)
+    return stats
+
+
+if __name__ == "__main__":
+    folder = Path(sys.argv[1]) if len(sys.argv) > 1 else STATIC_FOLDER
+    result = precompress_static(folder)
+    print(f"Compressed {result['files']} files in {folder}: {result['bytes']} bytes to {result['compressed_bytes']}")
@@ -0,0 +1,69 @@
+"""Validators for pages built from versioned data, so that revisits are answered with 304 Not Modified."""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Iterable
+
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+from podcast.adapters import shared_cache
+from podcast.adapters.shared_cache import EPOCH, format_stamp, user_scope
+
+
+def conditional(scopes: Callable[..., Iterable[str]], personal: Iterable[str] = ('user_name',),
+                records_history: bool = True):
+    """Give the responses of a GET view an ETag and a Last-Modified date, and answer requests that already have them
+    with 304 Not Modified before the view runs.
+
+    scopes is called with the view's arguments and names the data the page shows; the ETag changes whenever one of
+    them is bumped, and with the values of the personal session keys the page shows. A logged in user's page also
+    follows their playlist. Changes made around the app are never bumped, so the validators also change once per
+    time to live of the cache, after which its entries are recomputed anyway. Views that record themselves as the
+    session's history have it recorded for them on a 304.
+    """
+    personal = tuple(personal)
+
+    def decorator(view):
+        @wraps(view)
+        def conditional_view(**kwargs):
+            cache = shared_cache.instance
+            # Without versions there is nothing to validate against, and a flashed message has to be shown.
+            if cache is None or '_flashes' in session:
+                return view(**kwargs)
+
+            page_scopes = set(scopes(**kwargs)) | {EPOCH}
+            if 'user_name' in session:
+                page_scopes.add(user_scope(session['user_name']))
+            versions = cache.versions(page_scopes)
+            period_start = time.time() // cache.ttl * cache.ttl
+            personal_values = tuple(session.get(key) for key in personal)
+            etag = hashlib.sha1(repr((format_stamp(page_scopes, versions), period_start,
+                                      personal_values)).encode()).hexdigest()
+            last_modified = datetime.fromtimestamp(max(max(versions.values()) / 1000, period_start), timezone.utc)
+
+            # If-Modified-Since knows nothing of the session, so it is only trusted for pages without anything personal.
+            anonymous = all(value is None for value in personal_values)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified if anonymous else None):
+                response = current_app.response_class(status=304)
+                if records_history:
+                    session['history'] = request.full_path if request.query_string else request.path
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # Weak, as the page is the same for any representation of it, compressed or not.
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            # Browsers check back every time, and shared caches keep the page apart for every session.
+            response.cache_control.no_cache = True
+            response.cache_control.private = True
+            response.vary.add('Cookie')
+            return response
+
+        return conditional_view
+
+    return decorator
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import List, Iterable
+from functools import partial
+from typing import Callable, List, Iterable
 
 
 def validate_non_negative_int(value):
@@ -12,13 +13,156 @@ def validate_non_empty_string(value, field_name="value"):
         raise ValueError(f"{field_name} must be a non-empty string.")
 
 
+def validate_podcast_rows(rows: Iterable[tuple]):
+    # Applies the checks of Podcast() to a batch of its argument tuples, so that rows from an untrusted source can then
+    # be built with Podcast.from_trusted_rows. Errors name the position of the offending row within the batch.
+    for position, (podcast_id, _, title, *_) in enumerate(rows):
+        try:
+            validate_non_negative_int(podcast_id)
+            validate_non_empty_string(title, "Podcast title")
+        except (ValueError, TypeError) as error:
+            raise type(error)(f"Row {position}: {error}") from error
+
+
+def validate_episode_rows(rows: Iterable[tuple]):
+    # The same for Episode() and Episode.from_trusted_rows.
+    for position, (episode_id, podcast, audio_link, audio_length, *_) in enumerate(rows):
+        try:
+            validate_non_negative_int(episode_id)
+            validate_non_empty_string(audio_link)
+            validate_non_negative_int(audio_length)
+            if not isinstance(podcast, Podcast):
+                raise TypeError("Podcast must be a Podcast object.")
+        except (ValueError, TypeError) as error:
+            raise type(error)(f"Row {position}: {error}") from error
+
+
+class OrderedSet:
+    """Collection that keeps insertion order like a list but checks membership, appends and removes in O(1).
+
+    It reads like the lists it replaces: it can be indexed, sliced, iterated, compared with a list and printed as one.
+    Appending an item that is already present does nothing, and remove raises ValueError for a missing item, as
+    list.remove does. SQLAlchemy relationships use it as their collection_class and instrument it as a set.
+    """
+    __emulates__ = set
+
+    def __init__(self, items: Iterable = ()):
+        self._items = dict.fromkeys(items)
+        # List copy of the items for indexing and iteration, rebuilt after the first read following a change.
+        self._list = None
+
+    def _keys(self) -> dict:
+        # After unpickling only the list is set; the dict is built on first use, once every item has its state back.
+        if self._items is None:
+            self._items = dict.fromkeys(self._list)
+        return self._items
+
+    def _as_list(self) -> list:
+        if self._list is None:
+            self._list = list(self._items)
+        return self._list
+
+    def _insert(self, item):
+        self._keys()[item] = None
+        self._list = None
+
+    def _delete(self, item):
+        del self._keys()[item]
+        self._list = None
+
+    # add, remove, discard and clear are the methods SQLAlchemy instruments, so they must not call one another.
+    def add(self, item):
+        if item not in self._keys():
+            self._insert(item)
+
+    def remove(self, item):
+        if item not in self._keys():
+            raise ValueError(f"{item!r} is not in the collection")
+        self._delete(item)
+
+    def discard(self, item):
+        if item in self._keys():
+            self._delete(item)
+
+    def clear(self):
+        self._items = {}
+        self._list = None
+
+    def append(self, item):
+        self.add(item)
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.add(item)
+
+    def index(self, item) -> int:
+        return self._as_list().index(item)
+
+    def __contains__(self, item) -> bool:
+        return item in self._keys()
+
+    def __iter__(self):
+        # Iterates over the list copy, so the collection may be changed while it is being iterated.
+        return iter(self._as_list())
+
+    def __reversed__(self):
+        return reversed(self._as_list())
+
+    def __len__(self) -> int:
+        # Counted without rebuilding the list copy, and without building the dict while items may still be unpickled.
+        return len(self._items) if self._items is not None else len(self._list)
+
+    def __getitem__(self, index):
+        return self._as_list()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, OrderedSet):
+            return self._as_list() == other._as_list()
+        if isinstance(other, list):
+            return self._as_list() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._as_list())
+
+    def __getstate__(self):
+        # Pickled as a plain list: hashing the items while a snapshot is unpickled could reach objects whose own state
+        # has not been restored yet. SQLAlchemy's per-instance adapter is not part of the collection either.
+        return {'_list': self._as_list()}
+
+    def __setstate__(self, state):
+        self._items = None
+        self._list = state['_list']
+
+
+# Slotted domain classes keep their attributes in fixed slots instead of a per-instance dict, which is most of an
+# object's size. '__dict__' stays available (it is only allocated when first used) because SQLAlchemy's imperative
+# mapping stores its instance state and instrumented column values there, and '__weakref__' is needed by the
+# session's identity map.
+MAPPED_CLASS_SLOTS = ('__dict__', '__weakref__')
+
+
+def trusted_instance_factory(cls) -> Callable[[], object]:
+    # Used by the from_trusted_rows builders, which fill in the attributes themselves instead of running __init__.
+    # While a class is mapped its SQLAlchemy class manager has to create the objects, as it does for loaded rows, so
+    # that each instance carries the state its instrumented attributes are stored through.
+    manager = getattr(cls, '_sa_class_manager', None)
+    if manager is not None:
+        return manager.new_instance
+    return partial(cls.__new__, cls)
+
+
 class Author:
+    __slots__ = ('_id', '_name', 'podcast_list') + MAPPED_CLASS_SLOTS
+
     def __init__(self, author_id: int, name: str):
         validate_non_negative_int(author_id)
         validate_non_empty_string(name, "Author name")
         self._id = author_id
         self._name = name.strip()
-        self.podcast_list = []
+        self.podcast_list = OrderedSet()
 
     @property
     def id(self) -> int:
@@ -61,6 +205,9 @@ class Author:
 
 
 class Podcast:
+    __slots__ = ('_id', '_author', '_title', '_image', '_description', '_language', '_website', '_itunes_id',
+                 'categories', 'episodes', '_reviews') + MAPPED_CLASS_SLOTS
+
     def __init__(self, podcast_id: int, author: Author, title: str = "Untitled", image: str = None,
                  description: str = "", website: str = "", itunes_id: int = None, language: str = "Unspecified"):
         validate_non_negative_int(podcast_id)
@@ -73,10 +220,41 @@ class Podcast:
         self._language = language
         self._website = website
         self._itunes_id = itunes_id
-        self.categories = []
-        self.episodes = []
+        self.categories = OrderedSet()
+        self.episodes = OrderedSet()
         self._reviews: List[Review] = list()
 
+    @classmethod
+    def from_trusted_rows(cls, rows: Iterable[tuple]) -> List[Podcast]:
+        """Build Podcasts from tuples of already validated values, in the constructor's argument order.
+
+        Nothing is checked or stripped, so this is only for rows that have passed validate_podcast_rows or come from a
+        source that has, such as the catalogue files shipped with the app. Building a batch at once keeps the per-row
+        cost to the attribute assignments themselves.
+        """
+        new = trusted_instance_factory(cls)
+        podcasts = []
+        append = podcasts.append
+        for podcast_id, author, title, image, description, website, itunes_id, language in rows:
+            podcast = new()
+            podcast._id = podcast_id
+            podcast._author = author
+            podcast._title = title
+            podcast._image = image
+            podcast._description = description
+            podcast._language = language
+            podcast._website = website
+            podcast._itunes_id = itunes_id
+            podcast.categories = OrderedSet()
+            podcast.episodes = OrderedSet()
+            podcast._reviews = list()
+            append(podcast)
+        return podcasts
+
+    @classmethod
+    def from_trusted_row(cls, *values) -> Podcast:
+        return cls.from_trusted_rows((values,))[0]
+
     @property
     def id(self) -> int:
         return self._id
@@ -186,6 +364,8 @@ class Podcast:
 
 
 class Category:
+    __slots__ = ('_id', '_name', 'podcasts') + MAPPED_CLASS_SLOTS
+
     def __init__(self, category_id: int, name: str):
         validate_non_negative_int(category_id)
         validate_non_empty_string(name, "Category name")
@@ -224,6 +404,8 @@ class Category:
 
 
 class User:
+    __slots__ = ('_username', '_id', '_password', '_subscription_list', '_reviews', '_playlist') + MAPPED_CLASS_SLOTS
+
     def __init__(self, user_id: int, username: str, password: str):
         validate_non_negative_int(user_id)
         validate_non_empty_string(username, "Username")
@@ -343,6 +525,8 @@ class PodcastSubscription:
 
 # Self-defined classes:
 class Episode:
+    __slots__ = ('_id', '_podcast', '_title', '_audio_link', '_audio_length', '_description', '_publish_date') + MAPPED_CLASS_SLOTS
+
     def __init__(self, episode_id: int, podcast: Podcast, audio_link: str, audio_length: int,
                  title: str = "Untitled", description: str = "", publish_date: str = "Undated"):
         validate_non_negative_int(episode_id)
@@ -358,6 +542,28 @@ class Episode:
         self._description = description
         self._publish_date = publish_date
 
+    @classmethod
+    def from_trusted_rows(cls, rows: Iterable[tuple]) -> List[Episode]:
+        """Build Episodes from tuples of already validated values, in the constructor's argument order."""
+        new = trusted_instance_factory(cls)
+        episodes = []
+        append = episodes.append
+        for episode_id, podcast, audio_link, audio_length, title, description, publish_date in rows:
+            episode = new()
+            episode._id = episode_id
+            episode._podcast = podcast
+            episode._title = title
+            episode._audio_link = audio_link
+            episode._audio_length = audio_length
+            episode._description = description
+            episode._publish_date = publish_date
+            append(episode)
+        return episodes
+
+    @classmethod
+    def from_trusted_row(cls, *values) -> Episode:
+        return cls.from_trusted_rows((values,))[0]
+
     @property
     def id(self) -> int:
         return self._id
@@ -434,6 +640,8 @@ class Episode:
         return NotImplemented
 
 class Review:
+    __slots__ = ('_poster', '_podcast', '_rating', '_comment') + MAPPED_CLASS_SLOTS
+
     def __init__(self, poster: User, podcast: Podcast, rating: int, comment: str = "No comment"): #removed id
         if poster is None or not isinstance(poster, User):
             raise TypeError("Poster must be a User object and cannot be None.")
@@ -504,6 +712,49 @@ class Review:
             return self._rating < other._rating
         return NotImplemented
 
+# Ratings counted in a RatingSummary's histogram
+RATING_VALUES = range(1, 6)
+
+class RatingSummary:
+    """Review count, rating total and a histogram of ratings 1-5 for one podcast, kept up to date review by review."""
+
+    def __init__(self, count: int = 0, total: int = 0, histogram: Iterable[int] = None):
+        self._count = count
+        self._total = total
+        self._histogram = list(histogram) if histogram is not None else [0] * len(RATING_VALUES)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    @property
+    def histogram(self) -> dict:
+        return {rating: self._histogram[rating - 1] for rating in RATING_VALUES}
+
+    @property
+    def average(self) -> float | None:
+        if self._count == 0:
+            return None
+        return self._total / self._count
+
+    def add_rating(self, rating: int):
+        self._count += 1
+        self._total += rating
+        if rating in RATING_VALUES:
+            self._histogram[rating - 1] += 1
+
+    def __eq__(self, other):
+        if not isinstance(other, RatingSummary):
+            return False
+        return (self._count, self._total, self._histogram) == (other._count, other._total, other._histogram)
+
+    def __repr__(self):
+        return f"<RatingSummary {self._count} reviews, average {self.average}>"
+
 class Playlist:
     def __init__(self, playlist_id: int, creator: User, playlist_name: str = "Untitled"):
         validate_non_negative_int(playlist_id)
@@ -512,8 +763,8 @@ class Playlist:
         self._id = playlist_id
         self._creator = creator
         self._name = playlist_name
-        self._episode_list = []
-        self._podcast_list: List[Podcast] = list()
+        self._episode_list = OrderedSet()
+        self._podcast_list = OrderedSet()
 
     @property
     def id(self) -> int:
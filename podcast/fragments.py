@@ -0,0 +1,23 @@
+"""Rendered parts of pages that are the same for every visitor, cached by the data they show."""
+
+from typing import Callable, Iterable, List
+
+from flask import render_template
+from markupsafe import Markup
+
+from podcast.adapters.shared_cache import cached
+
+
+def render_fragment(template_name: str, key: tuple, scopes: Iterable[str], context: Callable[[], dict]) -> Markup:
+    # The page cache holds the rendered text under the template, key and the versions of the scopes; context is only
+    # called, and the template only rendered, when it does not have them.
+    return Markup(cached(('fragment', template_name) + key, scopes,
+                         lambda: str(render_template(template_name, **context()))))
+
+
+def render_fragments(template_name: str, key: tuple, scopes: Iterable[str],
+                     contexts: Callable[[], List[dict]]) -> List[Markup]:
+    # The same for a template rendered once per item, such as each episode of a page, as one cache entry.
+    return [Markup(text) for text in cached(
+        ('fragments', template_name) + key, scopes,
+        lambda: [str(render_template(template_name, **context)) for context in contexts()])]
@@ -1,11 +1,13 @@
-from flask import Blueprint, render_template, session, url_for
-import podcast.adapters.repository as repo
+from flask import Blueprint, render_template, session, url_for, g
 import podcast.home.services as services
+from podcast.adapters.shared_cache import CATALOGUE
+from podcast.conditional import conditional
 
 home_blueprint = Blueprint('home_bp', __name__)
 
 @home_blueprint.route('/', methods=['GET'])
+@conditional(lambda: (CATALOGUE,))
 def home():
-    featured = services.featured_podcasts(repo.repo_instance)
+    featured = services.featured_podcasts(g.repository)
     session['history'] = url_for('home_bp.home')
     return render_template('/layout.html', podcasts=featured)
\ No newline at end of file
@@ -1,7 +1,6 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, session
+from flask import Blueprint, render_template, redirect, url_for, flash, session, g
 from podcast.authentication.authentication import login_required
 import podcast.playlist.services as services
-import podcast.adapters.repository as repo
 
 playlist_bp = Blueprint('playlist', __name__)
 
@@ -12,9 +11,9 @@ def add_to_playlist(podcast_id, episode_id):
         flash('Session expired or invalid. Please register or log in again.', 'warning')
         return redirect(url_for('authentication_bp.register'))
 
-    item = services.get_item(podcast_id, episode_id)
+    item = services.get_item(g.repository, podcast_id, episode_id)
     if item:
-        services.add_to_user_playlist(session['user_name'], item)
+        services.add_to_user_playlist(g.repository, session['user_name'], item)
         flash(f"'{ item.title }' has been added to your playlist!", 'success')
     return redirect(url_for('show_bp.show', podcast_id=podcast_id))
 
@@ -25,9 +24,9 @@ def remove_from_playlist(podcast_id, episode_id):
         flash('Session expired or invalid. Please register or log in again.', 'warning')
         return redirect(url_for('authentication_bp.register'))
 
-    item = services.get_item(podcast_id, episode_id)
+    item = services.get_item(g.repository, podcast_id, episode_id)
     if item:
-        services.remove_from_user_playlist(session['user_name'], item)
+        services.remove_from_user_playlist(g.repository, session['user_name'], item)
         flash(f"'{ item.title }' has been removed from your playlist!", 'info')
 
     return redirect(url_for('show_bp.show', podcast_id=podcast_id))
@@ -42,14 +41,14 @@ def view_playlist():
 
     user_name = session['user_name']
 
-    user = repo.repo_instance.get_user(user_name)
+    user = g.repository.get_user(user_name)
     if user is None:
         flash('User not found. Please log in again.', 'warning')
         session.clear()
         return redirect(url_for('authentication_bp.login'))
 
-    podcast_playlist = services.get_user_podcast_playlist(user_name)
-    episode_playlist = services.get_user_episode_playlist(user_name)
+    podcast_playlist = services.get_user_podcast_playlist(g.repository, user_name)
+    episode_playlist = services.get_user_episode_playlist(g.repository, user_name)
 
     session['history'] = url_for('playlist.view_playlist')
 
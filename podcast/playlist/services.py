@@ -1,39 +1,43 @@
-from podcast.adapters.repository import repo_instance
+from podcast.adapters.repository import AbstractRepository
 from podcast.domainmodel.model import Podcast, Episode
 
-def get_podcast(podcast_id: int):
+# Relationships read for each playlist row
+PLAYLIST_PODCAST_LOAD = ('author',)
+PLAYLIST_EPISODE_LOAD = ('podcast.author',)
+
+def get_podcast(repo: AbstractRepository, podcast_id: int):
     """Retrieve a podcast by its ID."""
-    return repo_instance.get_podcast(podcast_id)
+    return repo.get_podcast(podcast_id)
 
-def get_item(podcast_id: int, episode_id: int):
+def get_item(repo: AbstractRepository, podcast_id: int, episode_id: int):
     if episode_id is not 0:
-        return repo_instance.get_episode(podcast_id, episode_id)
-    return repo_instance.get_podcast(podcast_id)
+        return repo.get_episode(podcast_id, episode_id)
+    return repo.get_podcast(podcast_id)
 
-def add_to_user_playlist(user_name: str, item: Podcast | Episode):
-    user = repo_instance.get_user(user_name)
-    return repo_instance.add_to_user_playlist(user, item)
+def add_to_user_playlist(repo: AbstractRepository, user_name: str, item: Podcast | Episode):
+    user = repo.get_user(user_name)
+    return repo.add_to_user_playlist(user, item)
 
-def remove_from_user_playlist(user_name: str, item: Podcast | Episode):
-    user = repo_instance.get_user(user_name)
-    return repo_instance.remove_from_user_playlist(user, item)
+def remove_from_user_playlist(repo: AbstractRepository, user_name: str, item: Podcast | Episode):
+    user = repo.get_user(user_name)
+    return repo.remove_from_user_playlist(user, item)
 
-def get_user_playlist_details(user_name: str):
+def get_user_playlist_details(repo: AbstractRepository, user_name: str):
     """Retrieve the playlist for a specific user."""
-    user = repo_instance.get_user(user_name)
-    playlist = repo_instance.get_user_playlist(user)
+    user = repo.get_user(user_name)
+    playlist = repo.get_user_playlist(user)
 
     playlist_dict = {
         'username': user_name,
         'title': playlist.name,
-        'total': repo_instance.get_playlist_total(playlist)
+        'total': repo.get_playlist_total(playlist)
     }
 
     return playlist_dict
 
-def get_user_podcast_playlist(user_name: str):
-    user = repo_instance.get_user(user_name)
-    playlist = repo_instance.get_user_podcast_playlist(user)
+def get_user_podcast_playlist(repo: AbstractRepository, user_name: str):
+    user = repo.get_user(user_name)
+    playlist = repo.get_user_podcast_playlist(user, load=PLAYLIST_PODCAST_LOAD)
     podcasts_dict = []
 
     for podcast in playlist:
@@ -47,9 +51,9 @@ def get_user_podcast_playlist(user_name: str):
 
     return podcasts_dict
 
-def get_user_episode_playlist(user_name: str):
-    user = repo_instance.get_user(user_name)
-    playlist = repo_instance.get_user_episode_playlist(user)
+def get_user_episode_playlist(repo: AbstractRepository, user_name: str):
+    user = repo.get_user(user_name)
+    playlist = repo.get_user_episode_playlist(user, load=PLAYLIST_EPISODE_LOAD)
     episodes_dict = []
 
     for episode in playlist:
@@ -1,10 +1,13 @@
-from flask import Blueprint, render_template, request, url_for, session
-import podcast.adapters.repository as repo
+from flask import Blueprint, render_template, request, url_for, session, g
 import podcast.search.services as services
+from podcast.adapters.shared_cache import CATALOGUE
+from podcast.conditional import conditional
+from podcast.fragments import render_fragment
 
 search_blueprint = Blueprint('search_bp', __name__)
 
 @search_blueprint.route('/search', methods=['GET'])
+@conditional(lambda: (CATALOGUE,))
 def search():
     podcasts_per_page = 10
 
@@ -17,11 +20,13 @@ def search():
     else:
         cursor = int(cursor)
 
-    results = services.search_podcasts(repo.repo_instance, search_term, search_filter)
-    number_of_podcasts = services.get_number_of_podcasts(results)
-    maximum_width = services.get_maximum_width(results)
-
-    results = results[cursor : cursor + podcasts_per_page]
+    # Only the current page of results is fetched; the repository counts the rest.
+    number_of_podcasts, results = services.get_search_page(g.repository, search_term, search_filter,
+                                                           podcasts_per_page, cursor)
+    maximum_width = services.get_maximum_width(number_of_podcasts)
+    podcast_cards = render_fragment(
+        'fragments/podcast_cards.html', ('search', search_term, search_filter, podcasts_per_page, cursor), (CATALOGUE,),
+        lambda: {'podcasts': results, 'number_of_podcasts': number_of_podcasts, 'maximum_width': maximum_width})
 
     first_podcast_url = None
     last_podcast_url = None
@@ -47,12 +52,11 @@ def search():
     return render_template(
         '/catalogue.html',
         title=title,
-        podcasts=results,
+        podcast_cards=podcast_cards,
         first_podcast_url=first_podcast_url,
         last_podcast_url=last_podcast_url,
         next_podcast_url=next_podcast_url,
         prev_podcast_url=prev_podcast_url,
         cursor=cursor,
-        number_of_podcasts=number_of_podcasts,
-        maximum_width=maximum_width
+        number_of_podcasts=number_of_podcasts
     )
\ No newline at end of file
@@ -1,28 +1,39 @@
 from podcast.adapters.repository import AbstractRepository
+from podcast.adapters.shared_cache import CATALOGUE, cached
 from typing import Iterable
 from podcast.domainmodel.model import Podcast
 
-def search_podcasts(repo: AbstractRepository, search_term: str, search_filter: str):
-    return podcasts_to_dict(repo.search_podcasts(search_term, search_filter))
+def search_podcasts(repo: AbstractRepository, search_term: str, search_filter: str, limit: int = None,
+                    offset: int = 0):
+    return podcasts_to_dict(repo.search_podcasts(search_term, search_filter, limit, offset))
+
+def get_number_of_search_results(repo: AbstractRepository, search_term: str, search_filter: str):
+    return repo.get_number_of_search_results(search_term, search_filter)
 
 def podcast_to_dict(podcast: Podcast):
+    # Plain values only, so the dicts can be kept in the shared cache.
     podcast_dict = {
         'podcast_id': podcast.id,
         'title': podcast.title,
-        'author':  podcast.author,
+        'author':  podcast.author.name if podcast.author is not None else None,
         'image': podcast.image,
         'description': podcast.description,
         'language': podcast.language,
         'website': podcast.website,
         'itunes': podcast.itunes_id,
-        'categories': podcast.categories
+        'categories': [category.name for category in podcast.categories]
     }
     return podcast_dict
 
 def podcasts_to_dict(podcasts: Iterable[Podcast]):
     return [podcast_to_dict(podcast) for podcast in podcasts]
 
-def get_number_of_podcasts(results: list):
-    return len(results)
-def get_maximum_width(results: list):
-    return (100 / 5) * len(results)
\ No newline at end of file
+def get_search_page(repo: AbstractRepository, search_term: str, search_filter: str, limit: int = None,
+                    offset: int = 0):
+    # (number of results, podcast dicts of the page), shared between worker processes until the catalogue changes.
+    return cached(('search', search_term, search_filter, limit, offset), (CATALOGUE,),
+                  lambda: (get_number_of_search_results(repo, search_term, search_filter),
+                           search_podcasts(repo, search_term, search_filter, limit, offset)))
+
+def get_maximum_width(number_of_results: int):
+    return (100 / 5) * number_of_results
\ No newline at end of file
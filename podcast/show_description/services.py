@@ -1,5 +1,6 @@
 from podcast.adapters.repository import AbstractRepository
 from podcast.adapters.repository import repo_instance
+from podcast.adapters.shared_cache import CATALOGUE, cached, podcast_scope
 from podcast.domainmodel.model import Podcast, make_review, Review, Episode
 from typing import List, Iterable
 
@@ -74,55 +75,111 @@ def add_review(podcast_id: int, comment_text: str, user_name: str, rating: int,
     repo.add_review(review)
 
 
-def get_reviews_for_podcast(podcast_id, repo: AbstractRepository):
+def get_reviews_for_podcast(podcast_id, repo: AbstractRepository, limit: int = None, offset: int = 0):
     podcast = repo.get_podcast(podcast_id)
-    reviews = repo.get_reviews()
 
     if podcast is None:
         raise NonExistentPodcastException
 
+    reviews = repo.get_reviews_for_podcast(podcast_id, limit, offset)
     review_dicts = []
 
     for review in reviews:
         review_dict = {
         'username': review._poster._username,
-        'podcast': review._podcast,
+        'podcast': podcast,
         'rating': review._rating,
         'comment': review._comment
         }
-        if review._podcast._id == podcast_id:
-            review_dicts.append(review_dict)
+        review_dicts.append(review_dict)
 
     return review_dicts
 
 
+def get_number_of_reviews(repo: AbstractRepository, podcast_id: int):
+    return repo.get_number_of_reviews_for_podcast(podcast_id)
+
+
+def get_rating_summary(repo: AbstractRepository, podcast_id: int):
+    return repo.get_rating_summary(podcast_id)
+
+
 def get_podcast(repo: AbstractRepository, podcast_id: int):
-    podcasts = repo.get_podcasts()
-    for podcast in podcasts:
-        if podcast.id == podcast_id:
-            return podcast
-    return None
+    return repo.get_podcast(podcast_id)
 
 
 def get_number_of_episodes(repo: AbstractRepository, podcast: Podcast):
     return repo.get_number_of_episodes(podcast)
 
 
+def episode_listing_dict(episode: Episode):
+    episode_dict = {
+        'title': episode.title,
+        'description': episode.description,
+        'audio_link': episode.audio_link,
+        'audio_length': episode.audio_length,
+        'publish_date': episode.publish_date,
+        'id': episode.id,
+    }
+    return episode_dict
+
+
 def get_episodes(repo: AbstractRepository, podcast: Podcast):
     episodes = repo.get_episodes(podcast)
-    episodes_dicts = []
-
-    for episode in episodes:
-        episode_dict = {
-            'title': episode.title,
-            'description': episode.description,
-            'audio_link': episode.audio_link,
-            'audio_length': episode.audio_length,
-            'publish_date': episode.publish_date,
-            'id': episode.id,
+    return [episode_listing_dict(episode) for episode in episodes]
+
+
+def get_episodes_page(repo: AbstractRepository, podcast_id: int, after_id: int = None, before_id: int = None,
+                      last: bool = False, limit: int = 3):
+    """Return one page of a podcast's episodes as (episode dicts, has previous page, has next page)."""
+    if before_id is not None or last:
+        episodes = repo.get_episodes_page_before(podcast_id, before_id, limit)
+        if len(episodes) < limit:
+            # Walking back reached the first episode; show a full first page instead of a short one.
+            episodes = repo.get_episodes_page(podcast_id, None, limit)
+    else:
+        episodes = repo.get_episodes_page(podcast_id, after_id, limit)
+
+    has_previous = len(episodes) > 0 and len(repo.get_episodes_page_before(podcast_id, episodes[0].id, 1)) > 0
+    has_next = len(episodes) > 0 and len(repo.get_episodes_page(podcast_id, episodes[-1].id, 1)) > 0
+    return [episode_listing_dict(episode) for episode in episodes], has_previous, has_next
+
+def podcast_details_dict(podcast: Podcast):
+    # What the description page shows of the podcast, in plain values so it can be kept in the shared cache.
+    details_dict = {
+        'id': podcast.id,
+        'title': podcast.title,
+        'author': podcast.author.name if podcast.author is not None else None,
+        'image': podcast.image,
+        'description': podcast.description,
+        'language': podcast.language,
+        'website': podcast.website,
+        'categories': [category.name for category in podcast.categories]
+    }
+    return details_dict
+
+
+def get_podcast_page(repo: AbstractRepository, podcast_id: int, after_id: int = None, before_id: int = None,
+                     last: bool = False, limit: int = 3):
+    """Return the podcast details, episode page and rating summary the description page shows, as a dict.
+
+    Shared between worker processes through the shared cache, if there is one, until the catalogue changes or the
+    podcast gets a review or an episode.
+    """
+    def read_page():
+        podcast = repo.get_podcast(podcast_id)
+        episodes, has_previous, has_next = get_episodes_page(repo, podcast_id, after_id, before_id, last, limit)
+        return {
+            'podcast': podcast_details_dict(podcast),
+            'number_of_episodes': get_number_of_episodes(repo, podcast),
+            'episodes': episodes,
+            'has_previous': has_previous,
+            'has_next': has_next,
+            'rating_summary': get_rating_summary(repo, podcast_id)
         }
-        episodes_dicts.append(episode_dict)
-    return episodes_dicts
+
+    return cached(('show', podcast_id, after_id, before_id, last, limit), (CATALOGUE, podcast_scope(podcast_id)),
+                  read_page)
 
 def episode_length_to_min(length: int):
     minutes = length // 60
@@ -1,19 +1,34 @@
-from flask import Blueprint, render_template, request, url_for, session, redirect
+from flask import Blueprint, render_template, request, url_for, session, redirect, g
 from flask_wtf import FlaskForm
 from wtforms.fields.numeric import IntegerField
 from wtforms.fields.simple import TextAreaField, HiddenField, SubmitField
 from wtforms.validators import DataRequired, Length, NumberRange
 
-import podcast.adapters.repository as repo
 import podcast.show_description.services as services
+from podcast.adapters.shared_cache import CATALOGUE, podcast_scope
+from podcast.conditional import conditional
+from podcast.fragments import render_fragment, render_fragments
 from podcast.authentication.authentication import login_required
 
 show_blueprint = Blueprint('show_bp', __name__)
 
 @show_blueprint.route('/show_description/<int:podcast_id>', methods=['GET'])
+# The back button leads to the page the session visited last.
+@conditional(lambda podcast_id: (CATALOGUE, podcast_scope(podcast_id)), personal=('user_name', 'history'),
+             records_history=False)
 def show(podcast_id):
-    podcast = services.get_podcast(repo.repo_instance, podcast_id)
-    podcast_dict = services.podcast_to_dict(podcast)
+    # Episode pages are addressed by episode id, as on the browse page.
+    after_id = request.args.get('after', type=int)
+    before_id = request.args.get('before', type=int)
+    last_page = request.args.get('page') == 'last'
+    episodes_per_page = 3
+
+    page = services.get_podcast_page(g.repository, podcast_id, after_id=after_id, before_id=before_id,
+                                     last=last_page, limit=episodes_per_page)
+    podcast = page['podcast']
+    episodes, has_previous, has_next = page['episodes'], page['has_previous'], page['has_next']
+    num_episodes = page['number_of_episodes']
+    podcast_dict = {'id': podcast['id']}
     podcast_to_show_reviews = request.args.get('view_reviews_for')
 
     if podcast_to_show_reviews is None:
@@ -23,42 +38,39 @@ def show(podcast_id):
             podcast_to_show_reviews = int(podcast_to_show_reviews)
         except ValueError:
             podcast_to_show_reviews = -1
-    
-    episodes_per_page = 3
-
-    episode_cursor = request.args.get('cursor')
-
-    if episode_cursor is None:
-        # Cursor starts at beginning
-        episode_cursor = 0
-    else:
-        # Convert string cursor to int
-        episode_cursor = int(episode_cursor)
-
-    num_episodes = services.get_number_of_episodes(repo.repo_instance, podcast)
-    all_episodes = services.get_episodes(repo.repo_instance, podcast)
-
-    # Episodes to show on this page
-    episodes = all_episodes[episode_cursor : episode_cursor + episodes_per_page]
 
     first_episode_url = None
     last_episode_url = None
     next_episode_url = None
     prev_episode_url = None
 
-    if episode_cursor > 0:
-        # There are podcasts before
-        prev_episode_url = url_for('show_bp.show', podcast_id=podcast_id, cursor=episode_cursor - episodes_per_page)
+    if has_previous:
+        # There are episodes before
+        prev_episode_url = url_for('show_bp.show', podcast_id=podcast_id, before=episodes[0]['id'])
         first_episode_url = url_for('show_bp.show', podcast_id=podcast_id)
 
-    if episode_cursor + episodes_per_page < num_episodes:
-        # There are next and last podcasts
-        next_episode_url = url_for('show_bp.show', podcast_id=podcast_id, cursor=episode_cursor + episodes_per_page)
-
-        last_cursor = episodes_per_page * int(num_episodes / episodes_per_page)
-        if num_episodes % episodes_per_page == 0:
-            last_cursor -= episodes_per_page
-        last_episode_url = url_for('show_bp.show', podcast_id=podcast_id, cursor=last_cursor)
+    if has_next:
+        # There are next and last episodes
+        next_episode_url = url_for('show_bp.show', podcast_id=podcast_id, after=episodes[-1]['id'])
+        last_episode_url = url_for('show_bp.show', podcast_id=podcast_id, page='last')
+
+    # The podcast's details, episodes and reviews are rendered once for every visitor; the playlist buttons, which
+    # depend on the visitor, are rendered around them.
+    scopes = (CATALOGUE, podcast_scope(podcast_id))
+    rating_summary = page['rating_summary']
+    podcast_details = render_fragment('fragments/podcast_details.html', ('show', podcast_id), scopes,
+                                      lambda: {'podcast': podcast, 'rating_summary': rating_summary})
+    episode_fragments = render_fragments(
+        'fragments/episode.html', ('show', podcast_id, after_id, before_id, last_page, episodes_per_page), scopes,
+        lambda: [{'episode': episode, 'episode_length_to_min': services.episode_length_to_min}
+                 for episode in episodes])
+
+    # Reviews are only read from the repository when they are shown and not cached; otherwise the count is enough.
+    number_of_reviews = rating_summary.count
+    review_list = None
+    if podcast_to_show_reviews == podcast_id:
+        review_list = render_fragment('fragments/reviews.html', ('show', podcast_id), scopes,
+                                      lambda: {'reviews': services.get_reviews_for_podcast(podcast_id, g.repository)})
 
     # Construct urls for viewing podcast reviews and adding reviews.
     podcast_dict['view_review_url'] = url_for('show_bp.show', podcast_id=podcast_id, view_reviews_for=podcast_dict['id'])
@@ -69,12 +81,12 @@ def show(podcast_id):
     user_podcast_playlist = []
     user_episode_playlist = []
 
-    if 'user_name' in session and repo.repo_instance.get_user(session['user_name']):
+    if 'user_name' in session and g.repository.get_user(session['user_name']):
         user_in_session = True
-        user_podcast_playlist = services.get_user_podcast_playlist(repo.repo_instance, session['user_name'])
-        user_episode_playlist = services.get_user_episode_playlist(repo.repo_instance, session['user_name'])
+        user_podcast_playlist = services.get_user_podcast_playlist(g.repository, session['user_name'])
+        user_episode_playlist = services.get_user_episode_playlist(g.repository, session['user_name'])
 
-    if 'user_name' in session and not repo.repo_instance.get_user(session['user_name']):
+    if 'user_name' in session and not g.repository.get_user(session['user_name']):
         session.pop('user_name', None)
 
     print("Podcast to show reviews",podcast_to_show_reviews)
@@ -84,14 +96,17 @@ def show(podcast_id):
         title='Episodes',
         podcast=podcast,
         podcast_dict=podcast_dict,
+        podcast_details=podcast_details,
         episodes=episodes,
+        episode_fragments=episode_fragments,
         number_of_episodes=num_episodes,
         first_episode_url=first_episode_url,
         last_episode_url=last_episode_url,
         prev_episode_url=prev_episode_url,
         next_episode_url=next_episode_url,
-        episode_length_to_min=services.episode_length_to_min,
         show_reviews_for_podcast=podcast_to_show_reviews,
+        review_list=review_list,
+        number_of_reviews=number_of_reviews,
         add_review_url=add_review_url,
         user_in_session=user_in_session,
         user_podcast_playlist=user_podcast_playlist,
@@ -116,10 +131,10 @@ def review_podcast():
         podcast_id = int(form.podcast_id.data)
 
         # Use the service layer to store the new comment.
-        services.add_review(podcast_id, form.comment.data, user_name, form.rating.data, repo.repo_instance)
+        services.add_review(podcast_id, form.comment.data, user_name, form.rating.data, g.repository)
 
         # Retrieve the article in dict form.
-        podcast = services.get_podcast(repo.repo_instance, podcast_id)
+        podcast = services.get_podcast(g.repository, podcast_id)
 
         # Cause the web browser to display the page of all articles that have the same date as the commented article,
         # and display all comments, including the new comment.
@@ -137,7 +152,7 @@ def review_podcast():
 
     # For a GET or an unsuccessful POST, retrieve the article to comment in dict form, and return a Web page that allows
     # the user to enter a comment. The generated Web page includes a form object.
-    podcast = services.get_podcast(repo.repo_instance, podcast_id)
+    podcast = services.get_podcast(g.repository, podcast_id)
 
     return render_template(
         'review_podcast.html',
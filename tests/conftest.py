@@ -22,7 +22,11 @@ def client():
         'TESTING': True,  # Set to True during testing.
         'REPOSITORY': 'memory',
         'TEST_DATA_PATH': TEST_DATA_PATH,  # Path for loading test data into the repository.
-        'WTF_CSRF_ENABLED': False  # test_client will not send a CSRF token, so disable validation.
+        'WTF_CSRF_ENABLED': False,  # test_client will not send a CSRF token, so disable validation.
+        # Settings the tests rely on, whatever the .env file says.
+        'CATALOGUE_SNAPSHOT_DIR': None,
+        'LOCAL_CACHE_SIZE': 1000,
+        'COMPRESSION_LEVEL': 6,
     })
 
     return my_app.test_client()
@@ -122,3 +122,225 @@ def test_podcasts_with_comment(client):
     assert b'Yeahhhh!!' in response.data
 
 
+
+
+def test_cached_fragments_follow_reviews_and_keep_playlist_buttons_per_user(client, auth):
+    # Rendered for a visitor first, so that the podcast's details, episodes and reviews are cached.
+    response = client.get('/show_description/1?view_reviews_for=1')
+    assert b'Log In to Add Episode to Playlist' in response.data
+    assert b'Cached or not' not in response.data
+    assert '3.0★ from 2 review(s)'.encode() in response.data
+
+    auth.login()
+    client.post('/review_podcast', data={'comment': 'Cached or not', 'podcast_id': 1, 'rating': 5})
+    response = client.get('/show_description/1?view_reviews_for=1')
+    assert b'Cached or not' in response.data
+    assert '3.7★ from 3 review(s)'.encode() in response.data
+    assert b'Add Episode to Playlist' in response.data
+    assert b'Log In to Add Episode to Playlist' not in response.data
+
+
+def test_preloaded_app_serves_requests_from_forked_worker(client):
+    import gc
+    import os
+    from podcast import prepare_for_fork, reinitialise_after_fork
+
+    prepare_for_fork()
+    try:
+        assert gc.get_freeze_count() > 0 and not gc.isenabled()
+
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # The worker: nothing it does may raise past this point, or pytest would carry on in two processes.
+            try:
+                reinitialise_after_fork()
+                result = f"{gc.isenabled()} {client.get('/browse').status_code}"
+            except BaseException as error:
+                result = repr(error)
+            os.write(write_end, result.encode())
+            os._exit(0)
+
+        os.close(write_end)
+        with os.fdopen(read_end) as pipe:
+            result = pipe.read()
+        os.waitpid(pid, 0)
+        assert result == "True 200"
+    finally:
+        gc.unfreeze()
+        gc.enable()
+
+
+def test_catalogue_reload_keeps_users_and_reviews(client, auth, tmp_path):
+    import shutil
+    from podcast.adapters.catalogue_reload import CatalogueWatcher
+
+    for name in ('podcasts.csv', 'episodes.csv'):
+        shutil.copy(get_project_root() / "tests" / "data" / name, tmp_path / name)
+    watcher = CatalogueWatcher(tmp_path, interval=60)
+    assert not watcher.check()
+
+    auth.login()
+    client.post('/review_podcast', data={'comment': 'Who is this?', 'podcast_id': 2, 'rating': 5})
+    client.get('/add_to_playlist/2/0')
+
+    podcasts_file = tmp_path / 'podcasts.csv'
+    podcasts_file.write_text(podcasts_file.read_text(encoding='utf-8').replace(
+        'Brian Denny Radio', 'Brian Denny Radio Reloaded'), encoding='utf-8')
+    assert watcher.check()
+
+    # The new catalogue is served, and the user, their review and their playlist carried over to it.
+    response = client.get('/show_description/2?view_reviews_for=2')
+    assert b'Brian Denny Radio Reloaded' in response.data
+    assert b'Who is this?' in response.data
+    assert b'Brian Denny Radio Reloaded' in client.get('/my_playlist').data
+
+    # A file that does not validate leaves the current catalogue in place.
+    podcasts_file.write_text(podcasts_file.read_text(encoding='utf-8').replace(
+        'Brian Denny Radio Reloaded', '  '), encoding='utf-8')
+    assert watcher.check()
+    assert b'Brian Denny Radio Reloaded' in client.get('/show_description/2').data
+
+
+def test_user_journal_survives_restart(tmp_path):
+    config = {
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': get_project_root() / "tests" / "data",
+        'WTF_CSRF_ENABLED': False,
+        'USER_JOURNAL_PATH': str(tmp_path / 'user-journal.jsonl'),
+        'CATALOGUE_SNAPSHOT_DIR': None,
+        'LOCAL_CACHE_SIZE': 1000,
+        'COMPRESSION_LEVEL': 6,
+    }
+    client = create_app(config).test_client()
+    client.post('/authentication/register', data={'user_name': 'gmichael', 'password': 'CarelessWhisper1984'})
+    client.post('/authentication/login', data={'user_name': 'gmichael', 'password': 'CarelessWhisper1984'})
+    client.post('/review_podcast', data={'comment': 'Worth a restart', 'podcast_id': 2, 'rating': 4})
+
+    # A new app, as after a restart, has the registration and the review back.
+    client = create_app(config).test_client()
+    response = client.post('/authentication/login', data={'user_name': 'gmichael', 'password': 'CarelessWhisper1984'})
+    assert response.headers['Location'] == '/'
+    assert b'Worth a restart' in client.get('/show_description/2?view_reviews_for=2').data
+
+
+def test_pages_are_not_sent_again_until_their_data_changes(client, auth):
+    response = client.get('/show_description/1')
+    etag = response.headers['ETag']
+    assert 'Cookie' in response.headers['Vary']
+    for path in ('/', '/browse', '/search?search_term=Radio&search_filter=Title'):
+        first = client.get(path)
+        again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+        assert (again.status_code, again.data) == (304, b'')
+
+    # The catalogue pages above recorded themselves as the page to go back to, which the podcast page links to.
+    response = client.get('/show_description/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert client.get('/show_description/1', headers={'If-None-Match': etag}).status_code == 304
+
+    # Logging in, reviews and playlist changes each give the podcast page a new version. Pages showing a flashed
+    # message have none, as the message must not be shown again.
+    auth.login()
+    response = client.get('/show_description/1', headers={'If-None-Match': etag})
+    assert b'Login successful!' in response.data and 'ETag' not in response.headers
+    response = client.get('/show_description/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    client.post('/review_podcast', data={'comment': 'Revalidate', 'podcast_id': 1, 'rating': 4})
+    response = client.get('/show_description/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    client.get('/add_to_playlist/1/0')
+    assert b'has been added to your playlist' in client.get('/show_description/1').data
+    response = client.get('/show_description/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert client.get('/show_description/1', headers={'If-None-Match': etag}).status_code == 304
+
+def test_if_modified_since_is_only_trusted_without_a_session(client, auth):
+    response = client.get('/browse')
+    last_modified = response.headers['Last-Modified']
+    assert client.get('/browse', headers={'If-Modified-Since': last_modified}).status_code == 304
+    auth.login()
+    assert client.get('/browse', headers={'If-Modified-Since': last_modified}).status_code == 200
+
+
+def test_pages_are_compressed_for_clients_that_take_gzip(client):
+    import gzip
+
+    plain = client.get('/show_description/1')
+    assert 'Content-Encoding' not in plain.headers
+    response = client.get('/show_description/1', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert int(response.headers['Content-Length']) < len(plain.data) / 2
+
+    # Redirects and other small bodies are sent as they are.
+    response = client.get('/review_podcast?podcast_id=1', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 302 and 'Content-Encoding' not in response.headers
+
+
+def test_static_files_are_served_from_precompressed_copies(client, tmp_path):
+    import gzip
+    import shutil
+    from podcast.compression import precompress_static
+
+    shutil.copytree(get_project_root() / "podcast" / "static", tmp_path, dirs_exist_ok=True)
+    stats = precompress_static(tmp_path)
+    # The stylesheet is compressed; the logo, a PNG, is left alone.
+    assert stats['files'] == 1 and (tmp_path / 'css' / 'main.css.gz').exists()
+    assert not list(tmp_path.glob('*.png.gz'))
+
+    client.application.static_folder = str(tmp_path)
+    response = client.get('/static/css/main.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.get_data()) == (tmp_path / 'css' / 'main.css').read_bytes()
+    response.close()
+    response = client.get('/static/css/main.css')
+    assert 'Content-Encoding' not in response.headers
+    response.close()
+
+
+def test_pages_link_static_files_under_fingerprinted_urls(client):
+    import re
+
+    page = client.get('/').data.decode()
+    stylesheet = re.search(r'href="(/static/css/main\.[0-9a-f]{12}\.css)"', page).group(1)
+    assert re.search(r'src="/static/podcast-lib-logo%20copy\.[0-9a-f]{12}\.png"', page)
+    assert '../static' not in page
+
+    response = client.get(stylesheet)
+    assert response.status_code == 200
+    assert response.get_data() == (get_project_root() / "podcast" / "static" / "css" / "main.css").read_bytes()
+    assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 60 * 60
+    response.close()
+    # The file's own name is still served, and checked back on as before.
+    response = client.get('/static/css/main.css')
+    assert response.status_code == 200 and not response.cache_control.immutable
+    response.close()
+
+
+def test_fingerprinted_static_files_are_served_without_compression():
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': get_project_root() / "tests" / "data",
+        'WTF_CSRF_ENABLED': False,
+        'CATALOGUE_SNAPSHOT_DIR': None,
+        'LOCAL_CACHE_SIZE': 1000,
+        'COMPRESSION_LEVEL': 0,
+    })
+    import re
+
+    client = app.test_client()
+    stylesheet = re.search(r'href="(/static/css/main\.[0-9a-f]{12}\.css)"', client.get('/').data.decode()).group(1)
+    for path in ('/static/css/main.css', stylesheet):
+        response = client.get(path)
+        assert response.status_code == 200 and response.mimetype == 'text/css'
+        response.close()
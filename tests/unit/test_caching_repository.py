@@ -0,0 +1,77 @@
+import pytest
+
+from podcast.adapters.caching_repository import CachingRepository, LRUCache, MISSING
+from podcast.domainmodel.model import Episode, User, make_review
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def caching_repo(in_memory_repo):
+    return CachingRepository(in_memory_repo, max_size=2, ttl=10, clock=FakeClock())
+
+
+def test_lru_cache_evicts_least_recently_used_and_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(max_size=2, ttl=10, clock=clock)
+    cache.put(('a',), 1, cache.generation)
+    cache.put(('b',), 2, cache.generation)
+    assert cache.get(('a',)) == 1
+    cache.put(('c',), 3, cache.generation)
+    assert cache.get(('b',)) is MISSING
+    assert cache.get(('a',)) == 1
+
+    clock.now = 10
+    assert cache.get(('a',)) is MISSING
+
+    # A result read before an invalidation finished is not stored.
+    generation = cache.generation
+    cache.invalidate(lambda key: True)
+    cache.put(('d',), 4, generation)
+    assert cache.get(('d',)) is MISSING
+    assert cache.stats() == {'size': 0, 'hits': 2, 'misses': 3, 'evictions': 1, 'expirations': 1}
+
+
+def test_caching_repository_serves_repeated_reads_from_cache(caching_repo, in_memory_repo):
+    podcast = caching_repo.get_podcast(1)
+    assert caching_repo.get_podcast(1) is podcast
+    assert caching_repo.get_number_of_podcasts() == caching_repo.get_number_of_podcasts() == 5
+    assert caching_repo.get_podcast(999) is None
+    assert caching_repo.get_podcast(999) is None
+    assert caching_repo.cache_stats()['get_podcast'] == {'size': 2, 'hits': 2, 'misses': 2, 'evictions': 0,
+                                                         'expirations': 0}
+    # Methods of the wrapped repository that are not cached are passed through.
+    assert caching_repo.get_episode(1, podcast.episodes[0].id) is in_memory_repo.get_episode(1, podcast.episodes[0].id)
+
+
+def test_caching_repository_writes_invalidate_what_they_change(caching_repo):
+    podcast = caching_repo.get_podcast(2)
+    assert caching_repo.get_number_of_reviews_for_podcast(2) == 0
+    assert caching_repo.get_rating_summaries([1, 2])[2].count == 0
+    assert caching_repo.get_rating_summary(2).count == 0
+
+    user = User(3, 'dave', '123456789')
+    caching_repo.add_user(user)
+    caching_repo.add_review(make_review("Cached", user, podcast, 4))
+    assert caching_repo.get_number_of_reviews_for_podcast(2) == 1
+    assert caching_repo.get_rating_summaries([1, 2])[2].count == 1
+    assert caching_repo.get_rating_summary(2).count == 1
+
+    assert list(caching_repo.get_user_podcast_playlist(user)) == []
+    caching_repo.add_to_user_playlist(user, podcast)
+    assert list(caching_repo.get_user_podcast_playlist(user)) == [podcast]
+    caching_repo.remove_from_user_playlist(user, podcast)
+    assert list(caching_repo.get_user_podcast_playlist(user)) == []
+
+    episode = Episode(6, caching_repo.get_podcast(1), "http://audio-link.com", 60, "New Episode")
+    assert episode not in caching_repo.get_episodes_page(1, None, 100)
+    caching_repo.add_episode(episode)
+    assert episode in caching_repo.get_episodes_page(1, None, 100)
+    caching_repo.remove_episode(episode)
+    assert episode not in caching_repo.get_episodes_page(1, None, 100)
@@ -5,7 +5,8 @@ import pytest
 from podcast import create_app
 from podcast.adapters import memory_repository
 from podcast.adapters.memory_repository import MemoryRepository
-from podcast.domainmodel.model import Author, Podcast, Category, User, PodcastSubscription, Episode, Review, Playlist
+from podcast.domainmodel.model import Author, Podcast, Category, User, PodcastSubscription, Episode, Review, Playlist, \
+    RatingSummary, OrderedSet, validate_episode_rows
 from podcast.adapters.datareader.csvdatareader import CSVDataReader
 
 from utils import get_project_root
@@ -672,4 +673,125 @@ def test_database_of_podcasts():
 def test_get_author():
     csvdatareader = CSVDataReader()
     csvdatareader.read_podcasts(DATA_PATH)
-    csvdatareader.read_episodes(DATA_PATH)
\ No newline at end of file
+    csvdatareader.read_episodes(DATA_PATH)
+
+
+def test_reader_indexes():
+    csvdatareader = CSVDataReader()
+    csvdatareader.read_podcasts(DATA_PATH)
+    csvdatareader.read_episodes(DATA_PATH)
+
+    assert len(csvdatareader.podcasts_by_id) == 1000
+    assert csvdatareader.podcasts_by_id[14] is csvdatareader.dataset_of_podcasts[13]
+
+    # Authors and categories are shared by name rather than duplicated per podcast.
+    assert len(csvdatareader.authors_by_name) == len(csvdatareader.dataset_of_authors)
+    assert len(csvdatareader.categories_by_name) == len(csvdatareader.dataset_of_categories)
+    for podcast in csvdatareader.dataset_of_podcasts:
+        assert csvdatareader.authors_by_name[podcast.author.name] is podcast.author
+        for category in podcast.categories:
+            assert csvdatareader.categories_by_name[category.name] is category
+
+
+def test_iter_episodes_in_batches():
+    csvdatareader = CSVDataReader()
+    csvdatareader.read_podcasts(DATA_PATH)
+
+    batches = list(csvdatareader.iter_episodes(DATA_PATH, batch_size=1000))
+    assert [len(batch) for batch in batches] == [1000] * 5 + [633]
+    assert all(isinstance(episode, Episode) for batch in batches for episode in batch)
+
+    # Streaming leaves the reader and the podcasts untouched.
+    assert csvdatareader.dataset_of_episodes == []
+    assert all(len(podcast.episodes) == 0 for podcast in csvdatareader.dataset_of_podcasts)
+
+
+def test_rating_summary_add_rating():
+    summary = RatingSummary()
+    assert summary.count == 0 and summary.average is None
+
+    for rating in (5, 4, 5, 1):
+        summary.add_rating(rating)
+
+    assert summary.count == 4
+    assert summary.total == 15
+    assert summary.average == 3.75
+    assert summary.histogram == {1: 1, 2: 0, 3: 0, 4: 1, 5: 2}
+    assert summary == RatingSummary(4, 15, [1, 0, 0, 1, 2])
+
+
+def test_domain_objects_keep_attributes_in_slots():
+    author = Author(1, "Doctor Squee")
+    podcast = Podcast(1, author, "My Podcast")
+    episode = Episode(1, podcast, "http://audio-link.com", 60, "Episode 1")
+    category = Category(1, "Comedy")
+    user = User(1, "shyamli", "pw12345")
+    review = Review(user, podcast, 4, "Great")
+
+    # The attribute dict is only there for the database mapping; plain domain objects never allocate it.
+    for instance in (author, podcast, episode, category, user, review):
+        assert instance.__dict__ == {}
+    assert episode.podcast is podcast and podcast.title == "My Podcast"
+
+
+def test_ordered_set_behaves_like_the_list_it_replaces():
+    import pickle
+
+    podcast = Podcast(1, Author(1, "Doctor Squee"), "My Podcast")
+    episodes = [Episode(episode_id, podcast, "http://audio-link.com", 60, f"Episode {episode_id}")
+                for episode_id in (3, 1, 2)]
+    for episode in episodes + episodes:
+        podcast.add_episode(episode)
+        podcast.episodes.append(episode)
+
+    assert podcast.episodes == episodes
+    assert len(podcast.episodes) == 3 and podcast.episodes[0] is episodes[0] and podcast.episodes[1:] == episodes[1:]
+    assert repr(podcast.episodes) == repr(episodes)
+    assert episodes[1] in podcast.episodes and podcast.episodes.index(episodes[1]) == 1
+
+    podcast.remove_episode(episodes[1])
+    # Counting after a change does not rebuild the list copy.
+    assert len(podcast.episodes) == 2 and podcast.episodes._list is None
+    assert podcast.episodes == [episodes[0], episodes[2]]
+    with pytest.raises(ValueError):
+        podcast.episodes.remove(episodes[1])
+
+    restored = pickle.loads(pickle.dumps(podcast))
+    assert len(restored.episodes) == 2 and restored.episodes == [episodes[0], episodes[2]]
+    assert restored.episodes[0].podcast is restored and episodes[2] in restored.episodes
+
+
+def test_trusted_rows_build_the_same_objects_as_the_constructors():
+    author = Author(1, "Doctor Squee")
+    podcast_row = (1, author, "My Podcast", "http://image.com", "A description", "http://website.com", 7, "English")
+    podcast = Podcast.from_trusted_row(*podcast_row)
+    constructed = Podcast(*podcast_row)
+    for attribute in ('id', 'author', 'title', 'image', 'description', 'website', 'itunes_id', 'language'):
+        assert getattr(podcast, attribute) == getattr(constructed, attribute)
+    assert podcast.episodes == [] and podcast.categories == [] and podcast.number_of_reviews == 0
+
+    episode_rows = [(episode_id, podcast, "http://audio-link.com", 60, f"Episode {episode_id}", "", "2020-01-01")
+                    for episode_id in (2, 1)]
+    episodes = Episode.from_trusted_rows(episode_rows)
+    assert episodes == [Episode(*row) for row in episode_rows]
+    assert [episode.title for episode in episodes] == ["Episode 2", "Episode 1"]
+    assert episodes[0].podcast is podcast and episodes[1].publish_date == "2020-01-01"
+
+
+def test_batch_validation_rejects_what_the_constructor_rejects(tmp_path):
+    podcast = Podcast(1, Author(1, "Doctor Squee"), "My Podcast")
+    rows = [(1, podcast, "http://audio-link.com", 60), (2, podcast, "http://audio-link.com", -5)]
+    with pytest.raises(ValueError, match="Row 1"):
+        validate_episode_rows(rows)
+    with pytest.raises(TypeError, match="Row 0"):
+        validate_episode_rows([(1, "not a podcast", "http://audio-link.com", 60)])
+
+    # An untrusted reader validates the csv rows before building from them; a trusted one does not.
+    (tmp_path / "podcasts.csv").write_text(
+        "id,title,image,description,language,categories,website,author,itunes_id\n"
+        "1,  ,,,English,Comedy,,Someone,1\n", encoding='utf-8')
+    with pytest.raises(ValueError, match="Podcast title"):
+        CSVDataReader().read_podcasts(tmp_path)
+    trusted_reader = CSVDataReader(trusted=True)
+    trusted_reader.read_podcasts(tmp_path)
+    assert trusted_reader.podcasts_by_id[1].title == ""
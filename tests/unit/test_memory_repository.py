@@ -179,4 +179,341 @@ def test_repository_can_get_playlist_total(in_memory_repo):
     playlist = in_memory_repo.get_user_playlist(user)
     playlist_total = in_memory_repo.get_playlist_total(playlist)
 
-    assert playlist_total == 2
\ No newline at end of file
+    assert playlist_total == 2
+
+def test_populate_saves_and_reuses_snapshot(tmp_path, monkeypatch):
+    from podcast.adapters import repository_populate
+    from podcast.adapters.datareader.csvdatareader import CSVDataReader
+
+    data_path = get_project_root() / "tests" / "data"
+    snapshot_dir = tmp_path / "snapshots"
+
+    first_repo = MemoryRepository()
+    repository_populate.populate(data_path, first_repo, False, snapshot_dir=snapshot_dir)
+    assert len(list(snapshot_dir.iterdir())) == 1
+
+    # A second start must not parse the csv files at all.
+    def fail(*args):
+        raise AssertionError("csv files parsed despite a valid snapshot")
+    monkeypatch.setattr(CSVDataReader, "read_podcasts", fail)
+
+    second_repo = MemoryRepository()
+    repository_populate.populate(data_path, second_repo, False, snapshot_dir=snapshot_dir)
+    assert second_repo.get_number_of_podcasts() == first_repo.get_number_of_podcasts()
+    assert second_repo.get_user('thorke') is not None
+    podcast = second_repo.get_podcast(1)
+    assert all(episode.podcast is podcast for episode in second_repo.get_episodes(podcast))
+
+
+def test_populate_rebuilds_snapshot_when_data_changes(tmp_path):
+    import shutil
+    from podcast.adapters import repository_populate
+
+    data_path = tmp_path / "data"
+    shutil.copytree(get_project_root() / "tests" / "data", data_path)
+    snapshot_dir = tmp_path / "snapshots"
+    repository_populate.populate(data_path, MemoryRepository(), False, snapshot_dir=snapshot_dir)
+
+    podcasts_csv = data_path / "podcasts.csv"
+    podcasts_csv.write_text(podcasts_csv.read_text(encoding="utf-8").replace("Tallin Messages", "Tallinn Messages"),
+                            encoding="utf-8")
+
+    repo = MemoryRepository()
+    repository_populate.populate(data_path, repo, False, snapshot_dir=snapshot_dir)
+    assert repo.get_podcast(4).title == "Tallinn Messages"
+
+
+def test_repository_keyed_lookups_follow_adds_and_removes(in_memory_repo):
+    podcast = in_memory_repo.get_podcast(1)
+    episode = in_memory_repo.get_episode(1, 4)
+    assert episode.title == "Week 16 Day 5"
+    assert in_memory_repo.get_episode(2, 4) is None
+
+    new_podcast = Podcast(7, Author(7, "New Author"), "New Podcast")
+    new_episode = Episode(100, new_podcast, "http://audio-link.com", 60, "New Episode")
+    new_podcast.add_episode(new_episode)
+    in_memory_repo.add_podcast(new_podcast)
+    assert in_memory_repo.get_podcast(7) is new_podcast
+    assert in_memory_repo.get_episode(7, 100) is new_episode
+
+    in_memory_repo.remove_podcast(new_podcast)
+    assert in_memory_repo.get_podcast(7) is None
+    assert in_memory_repo.get_episode(7, 100) is None
+
+    in_memory_repo.add_episode(episode)
+    in_memory_repo.remove_episode(episode)
+    assert in_memory_repo.get_episode(1, 4) is None
+    assert podcast is in_memory_repo.get_podcast(1)
+
+
+def test_repository_search_podcasts(in_memory_repo):
+    assert [podcast.id for podcast in in_memory_repo.search_podcasts("radio", "Title")] == [1, 2, 3]
+    assert [podcast.id for podcast in in_memory_repo.search_podcasts("ITALIAN", "Language")] == [3]
+    assert [podcast.id for podcast in in_memory_repo.search_podcasts("church", "Author")] == [4]
+    assert in_memory_repo.search_podcasts("", "Title") == []
+    assert in_memory_repo.search_podcasts("radio", "Website") == []
+
+    # Podcast 5 matches through two of its categories but is listed once.
+    assert [podcast.id for podcast in in_memory_repo.search_podcasts("i", "Category")] == [1, 2, 3, 4, 5]
+    assert [podcast.id for podcast in in_memory_repo.search_podcasts("ti", "Category")] == [2, 5]
+
+
+def test_repository_search_follows_adds_and_removes(in_memory_repo):
+    podcast = Podcast(6, Author(6, "Test Author"), "Radio Test", language="English")
+    podcast.add_category(Category(40, "Technology"))
+    in_memory_repo.add_podcast(podcast)
+    assert podcast in in_memory_repo.search_podcasts("radio test", "Title")
+    assert in_memory_repo.search_podcasts("technology", "Category") == [podcast]
+
+    in_memory_repo.remove_podcast(podcast)
+    assert in_memory_repo.search_podcasts("radio test", "Title") == []
+    assert in_memory_repo.search_podcasts("technology", "Category") == []
+
+
+def test_repository_podcast_pages(in_memory_repo):
+    def ids(podcasts):
+        return [podcast.id for podcast in podcasts]
+
+    assert ids(in_memory_repo.get_podcasts_page(None, 2)) == [1, 2]
+    assert ids(in_memory_repo.get_podcasts_page(2, 2)) == [3, 4]
+    assert ids(in_memory_repo.get_podcasts_page(4, 2)) == [5]
+    assert in_memory_repo.get_podcasts_page(5, 2) == []
+    assert ids(in_memory_repo.get_podcasts_page_before(None, 2)) == [4, 5]
+    assert ids(in_memory_repo.get_podcasts_page_before(3, 5)) == [1, 2]
+
+
+def test_repository_episode_pages_follow_add_and_remove(in_memory_repo):
+    def ids(episodes):
+        return [episode.id for episode in episodes]
+
+    assert ids(in_memory_repo.get_episodes_page(1, None, 2)) == [1, 4]
+    assert ids(in_memory_repo.get_episodes_page(1, 4, 2)) == [8]
+    assert ids(in_memory_repo.get_episodes_page_before(1, 8, 1)) == [4]
+    assert in_memory_repo.get_episodes_page(99) == []
+
+    podcast = in_memory_repo.get_podcast(1)
+    episode = Episode(6, podcast, "http://audio-link.com", 60, "New Episode")
+    in_memory_repo.add_episode(episode)
+    assert ids(in_memory_repo.get_episodes_page(1, 4, 2)) == [6, 8]
+    in_memory_repo.remove_episode(episode)
+    assert ids(in_memory_repo.get_episodes_page(1, 4, 2)) == [8]
+
+
+def test_repository_episode_count_and_pages_agree(in_memory_repo):
+    def check(expected_ids):
+        pages = in_memory_repo.get_episodes_page(1, None, 2) + in_memory_repo.get_episodes_page(1, 4, 2)
+        assert [episode.id for episode in pages] == expected_ids
+        assert [episode.id for episode in in_memory_repo.get_episodes(podcast)] == expected_ids
+        assert in_memory_repo.get_number_of_episodes(podcast) == len(expected_ids)
+
+    podcast = in_memory_repo.get_podcast(1)
+    check([1, 4, 8])
+    episode = Episode(6, podcast, "http://audio-link.com", 60, "New Episode")
+    in_memory_repo.add_episode(episode)
+    check([1, 4, 6, 8])
+    in_memory_repo.remove_episode(episode)
+    check([1, 4, 8])
+
+
+def test_repository_reviews_for_podcast(in_memory_repo):
+    reviews = in_memory_repo.get_reviews_for_podcast(1)
+    assert len(reviews) == 2 and all(review.podcast.id == 1 for review in reviews)
+    assert in_memory_repo.get_reviews_for_podcast(1, limit=1, offset=1) == reviews[1:]
+    assert in_memory_repo.get_number_of_reviews_for_podcast(1) == 2
+    assert in_memory_repo.get_reviews_for_podcast(3) == []
+
+    user = in_memory_repo.get_user('fmercury')
+    review = make_review("Great", user, in_memory_repo.get_podcast(3), 5)
+    in_memory_repo.add_review(review)
+    assert in_memory_repo.get_reviews_for_podcast(3) == [review]
+    assert in_memory_repo.get_number_of_reviews_for_podcast(3) == 1
+
+
+def test_repository_add_review_leaves_lists_being_iterated_unchanged(in_memory_repo):
+    user = in_memory_repo.get_user('fmercury')
+    review = make_review("Great", user, in_memory_repo.get_podcast(1), 5)
+    podcast_reviews = in_memory_repo.get_reviews_for_podcast(1)
+    user_reviews = user._reviews
+    before = (list(podcast_reviews), list(user_reviews))
+
+    in_memory_repo.add_review(review)
+    assert (podcast_reviews, user_reviews) == before
+    assert in_memory_repo.get_reviews_for_podcast(1)[-1] is review and user._reviews[-1] is review
+    assert in_memory_repo.get_reviews()[-1] is review
+
+
+def test_repository_rating_summary_follows_reviews(in_memory_repo):
+    before = in_memory_repo.get_rating_summary(1)
+    before_count, before_total, before_fives = before.count, before.total, before.histogram[5]
+    assert before_count == 2
+
+    user = in_memory_repo.get_user('fmercury')
+    in_memory_repo.add_review(make_review("Great", user, in_memory_repo.get_podcast(1), 5))
+    summary = in_memory_repo.get_rating_summary(1)
+    assert summary.count == before_count + 1
+    assert summary.total == before_total + 5
+    assert summary.histogram[5] == before_fives + 1
+
+    summaries = in_memory_repo.get_rating_summaries([1, 3])
+    assert summaries[1] is summary and summaries[3].count == 0
+
+
+def test_repository_concurrent_readers_and_writers(in_memory_repo):
+    import sys
+    import threading
+
+    user = in_memory_repo.get_user('fmercury')
+    podcast_ids = [podcast.id for podcast in in_memory_repo.get_podcasts()]
+    episodes = [episode for podcast in in_memory_repo.get_podcasts() for episode in podcast.episodes]
+    reviews_before = len(in_memory_repo.get_reviews())
+    writers, reviews_per_writer = 4, 200
+    writing = threading.Event()
+    writing.set()
+    errors = []
+
+    def write(number: int):
+        try:
+            own_episodes = episodes[number::writers]
+            for count in range(reviews_per_writer):
+                podcast = in_memory_repo.get_podcast(podcast_ids[count % len(podcast_ids)])
+                in_memory_repo.add_review(make_review("Concurrent", user, podcast, count % 5 + 1))
+                episode = own_episodes[count % len(own_episodes)]
+                if episode in in_memory_repo.get_user_episode_playlist(user):
+                    in_memory_repo.remove_from_user_playlist(user, episode)
+                else:
+                    in_memory_repo.add_to_user_playlist(user, episode)
+        except Exception as error:
+            errors.append(error)
+
+    def read():
+        try:
+            while writing.is_set():
+                podcasts = in_memory_repo.get_podcasts()
+                assert [podcast.id for podcast in podcasts] == podcast_ids
+                for podcast_id in podcast_ids:
+                    # Each summary is published whole, so its count always matches its histogram and total.
+                    summary = in_memory_repo.get_rating_summary(podcast_id)
+                    histogram = summary.histogram
+                    assert summary.count == sum(histogram.values())
+                    assert summary.total == sum(rating * count for rating, count in histogram.items())
+                    reviews = in_memory_repo.get_reviews_for_podcast(podcast_id)
+                    assert all(review.podcast.id == podcast_id for review in reviews)
+                playlist = in_memory_repo.get_user_episode_playlist(user)
+                assert len(list(playlist)) == len(playlist)
+        except Exception as error:
+            errors.append(error)
+
+    # Switch threads as often as possible, so readers and writers interleave inside the repository's methods.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        writer_threads = [threading.Thread(target=write, args=(number,)) for number in range(writers)]
+        for thread in readers + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        writing.clear()
+        for thread in readers:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    # No write was lost.
+    assert len(in_memory_repo.get_reviews()) == reviews_before + writers * reviews_per_writer
+    for podcast_id in podcast_ids:
+        assert (in_memory_repo.get_rating_summary(podcast_id).count
+                == in_memory_repo.get_number_of_reviews_for_podcast(podcast_id))
+
+
+def test_repository_hand_over_to_reloaded_catalogue(in_memory_repo):
+    from podcast.adapters import repository_populate
+
+    user = in_memory_repo.get_user('fmercury')
+    in_memory_repo.add_to_user_playlist(user, in_memory_repo.get_podcast(2))
+    reviews_of_podcast_1 = [(review.comment, review.rating) for review in in_memory_repo.get_reviews_for_podcast(1)]
+
+    successor = MemoryRepository()
+    repository_populate.populate(get_project_root() / "tests" / "data", successor, False, catalogue_only=True)
+    assert successor.get_user('fmercury') is None and successor.get_reviews() == []
+
+    in_memory_repo.hand_over_to(successor)
+    moved_user = successor.get_user('fmercury')
+    assert moved_user is not user and moved_user.password == user.password
+    assert list(moved_user.playlist.podcast_list) == [successor.get_podcast(2)]
+    assert moved_user.playlist.podcast_list[0] is not in_memory_repo.get_podcast(2)
+    assert [(review.comment, review.rating) for review in successor.get_reviews_for_podcast(1)] == reviews_of_podcast_1
+    assert all(review.podcast is successor.get_podcast(1) for review in successor.get_reviews_for_podcast(1))
+
+    # Writes made through the old repository by requests still holding it end up in the successor.
+    in_memory_repo.add_review(make_review("Late review", user, in_memory_repo.get_podcast(3), 4))
+    in_memory_repo.remove_from_user_playlist(user, in_memory_repo.get_podcast(2))
+    assert [review.comment for review in successor.get_reviews_for_podcast(3)] == ["Late review"]
+    assert in_memory_repo.get_reviews_for_podcast(3) == []
+    assert list(moved_user.playlist.podcast_list) == []
+
+
+def test_repository_journal_replays_user_changes(in_memory_repo, tmp_path):
+    from podcast.adapters import repository_populate
+    from podcast.adapters.journal import Journal, read_journal
+
+    journal_path = tmp_path / 'journal.jsonl'
+    in_memory_repo.attach_journal(Journal(journal_path))
+    user = User(3, 'dave', '123456789')
+    in_memory_repo.add_user(user)
+    in_memory_repo.add_review(make_review("Journaled", user, in_memory_repo.get_podcast(2), 4))
+    in_memory_repo.add_to_user_playlist(user, in_memory_repo.get_podcast(1))
+    episode = in_memory_repo.get_podcast(1).episodes[0]
+    in_memory_repo.add_to_user_playlist(user, episode)
+    in_memory_repo.remove_from_user_playlist(user, in_memory_repo.get_podcast(1))
+    assert [record['op'] for record in read_journal(journal_path)] == [
+        'add_user', 'add_review', 'add_to_playlist', 'add_to_playlist', 'remove_from_playlist']
+
+    # A crash in the middle of writing a record leaves part of a line, which is neither replayed nor appended to.
+    with open(journal_path, mode='a', encoding='utf-8') as journal_file:
+        journal_file.write('{"op": "add_us')
+
+    restarted = MemoryRepository()
+    repository_populate.populate(get_project_root() / "tests" / "data", restarted, False)
+    assert restarted.replay_journal(read_journal(journal_path)) == 5
+    replayed_user = restarted.get_user('dave')
+    assert replayed_user.password == '123456789'
+    assert [review.comment for review in restarted.get_reviews_for_podcast(2)] == ["Journaled"]
+    assert list(replayed_user.playlist.podcast_list) == []
+    assert list(replayed_user.playlist.episode_list) == [restarted.get_episode(1, episode.id)]
+
+    restarted.attach_journal(Journal(journal_path))
+    restarted.add_user(User(4, 'erin', '123456789'))
+    assert [record['op'] for record in read_journal(journal_path)][-2:] == ['remove_from_playlist', 'add_user']
+
+
+def test_journal_group_commit_shares_fsyncs(tmp_path):
+    import threading
+    from podcast.adapters.journal import Journal, read_journal
+
+    journal = Journal(tmp_path / 'journal.jsonl')
+    threads = [threading.Thread(target=lambda number=number: [journal.append({'op': 'test', 'number': number})
+                                                              for _ in range(50)])
+               for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    assert len(list(read_journal(tmp_path / 'journal.jsonl'))) == 400
+    # Every append returned only once durable, and writers waiting together were covered by a single fsync.
+    assert journal.syncs < 400
+
+
+def test_populate_validates_all_but_the_shipped_catalogue(tmp_path):
+    from podcast.adapters import repository_populate
+
+    (tmp_path / "podcasts.csv").write_text(
+        "id,title,image,description,language,categories,website,author,itunes_id\n"
+        "1,  ,,,English,Comedy,,Someone,1\n", encoding='utf-8')
+    with pytest.raises(ValueError, match="Podcast title"):
+        repository_populate.populate(tmp_path, MemoryRepository(), False)
+    assert repository_populate.is_shipped_catalogue(get_project_root() / "podcast" / "adapters" / "data")
+    assert not repository_populate.is_shipped_catalogue(get_project_root() / "tests" / "data")
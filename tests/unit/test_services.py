@@ -66,6 +66,29 @@ def test_can_get_episodes(in_memory_repo):
     episodes = show_description_services.get_episodes(in_memory_repo, podcast)
     assert episodes[1]['title'] == "Week 16 Day 5"
 
+def test_can_get_browse_pages(in_memory_repo):
+    podcasts, has_previous, has_next = browse_services.get_podcasts_page(in_memory_repo, after_id=2, limit=2)
+    assert [podcast['podcast_id'] for podcast in podcasts] == [3, 4]
+    assert has_previous and has_next
+
+    podcasts, has_previous, has_next = browse_services.get_podcasts_page(in_memory_repo, last=True, limit=2)
+    assert [podcast['podcast_id'] for podcast in podcasts] == [4, 5]
+    assert has_previous and not has_next
+
+    # Walking back past the start gives a full first page.
+    podcasts, has_previous, has_next = browse_services.get_podcasts_page(in_memory_repo, before_id=2, limit=2)
+    assert [podcast['podcast_id'] for podcast in podcasts] == [1, 2]
+    assert not has_previous and has_next
+
+def test_can_get_episode_pages(in_memory_repo):
+    episodes, has_previous, has_next = show_description_services.get_episodes_page(in_memory_repo, 1, limit=2)
+    assert [episode['id'] for episode in episodes] == [1, 4]
+    assert not has_previous and has_next
+
+    episodes, has_previous, has_next = show_description_services.get_episodes_page(in_memory_repo, 1, after_id=4)
+    assert [episode['id'] for episode in episodes] == [8]
+    assert has_previous and not has_next
+
 # get_number_of_episodes
 def test_can_get_episodes_count(in_memory_repo):
     podcast = show_description_services.get_podcast(in_memory_repo, 1)
@@ -0,0 +1,56 @@
+import threading
+
+from podcast.adapters.shared_cache import CATALOGUE, REVIEWS, LocalCache, SharedCache, podcast_scope
+
+
+def test_shared_cache_entries_are_shared_until_a_scope_is_bumped(tmp_path):
+    path = tmp_path / 'shared-cache.db'
+    # Two instances on one file stand for two worker processes.
+    first, second = SharedCache(path), SharedCache(path)
+    computed = []
+
+    def compute(value):
+        computed.append(value)
+        return {'podcasts': [value]}
+
+    scopes = (CATALOGUE, podcast_scope(1))
+    assert first.get_or_compute('page', scopes, lambda: compute(1)) == {'podcasts': [1]}
+    assert second.get_or_compute('page', scopes, lambda: compute(2)) == {'podcasts': [1]}
+
+    # A write in one process is seen by the other at once; bumps of unrelated scopes change nothing.
+    second.bump(REVIEWS, podcast_scope(2))
+    assert first.get_or_compute('page', scopes, lambda: compute(3)) == {'podcasts': [1]}
+    second.bump(podcast_scope(1))
+    assert first.get_or_compute('page', scopes, lambda: compute(4)) == {'podcasts': [4]}
+    assert computed == [1, 4]
+    assert (first.hits, first.misses, second.hits) == (1, 2, 1)
+
+    # Data computed while a write bumped its scopes is never served.
+    first.get_or_compute('racing', scopes, lambda: second.bump(CATALOGUE) or 'before the write')
+    assert first.get_or_compute('racing', scopes, lambda: 'after the write') == 'after the write'
+
+
+def test_shared_cache_connections_are_per_thread(tmp_path):
+    cache = SharedCache(tmp_path / 'shared-cache.db')
+    results = []
+    threads = [threading.Thread(target=lambda number=number: results.append(
+        cache.get_or_compute(f'key {number % 4}', (CATALOGUE,), lambda: number % 4))) for number in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == sorted(number % 4 for number in range(16))
+    assert cache.stats()['size'] == 4
+
+
+def test_local_cache_evicts_least_recently_used_and_follows_bumps():
+    cache = LocalCache(max_entries=2)
+    assert cache.get_or_compute('a', (CATALOGUE,), lambda: 1) == 1
+    assert cache.get_or_compute('b', (REVIEWS,), lambda: 2) == 2
+    assert cache.get_or_compute('a', (CATALOGUE,), lambda: 'recomputed') == 1
+    assert cache.get_or_compute('c', (CATALOGUE,), lambda: 3) == 3
+    assert cache.get_or_compute('b', (REVIEWS,), lambda: 'evicted') == 'evicted'
+
+    cache.bump(CATALOGUE)
+    assert cache.get_or_compute('c', (CATALOGUE,), lambda: 'bumped') == 'bumped'
+    assert cache.stats() == {'size': 2, 'hits': 1, 'misses': 5}
@@ -1,10 +1,18 @@
 from datetime import date, datetime
 from typing import List
 
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
 import pytest
 
-from podcast.domainmodel.model import User, Podcast, Review, make_review, Author, Episode
+from podcast.domainmodel.model import User, Podcast, Review, make_review, Author, Episode, RatingSummary, \
+    OrderedSet
 from podcast.adapters.repository import RepositoryException
+from podcast.adapters import database_repository, repository_populate
+import podcast.browse.services as browse_services
+import podcast.playlist.services as playlist_services
+from utils import get_project_root
 
 
 def test_repository_can_add_a_user(database_repo):
@@ -191,4 +199,368 @@ def test_repository_can_get_playlist_total(database_repo):
     playlist = database_repo.get_user_playlist(user)
     playlist_total = database_repo.get_playlist_total(user)
 
-    assert playlist_total == 2
\ No newline at end of file
+    assert playlist_total == 2
+
+def test_repository_full_text_search_matches_ilike_search(session_factory):
+    ilike_repo = database_repository.SqlAlchemyRepository(session_factory)
+    fts_repo = database_repository.SqlAlchemyRepository(session_factory, full_text_search=True)
+    fts_repo.create_search_index()
+
+    for search_term, search_filter in [("radio", "Title"), ("COMEDY", "Category"), ("church", "Author"),
+                                       ("english", "Language"), ("ti", "Category"), ('"quoted', "Title")]:
+        expected = sorted(podcast.id for podcast in ilike_repo.search_podcasts(search_term, search_filter))
+        found = fts_repo.search_podcasts(search_term, search_filter)
+        assert sorted(podcast.id for podcast in found) == expected
+        assert fts_repo.get_number_of_search_results(search_term, search_filter) == len(expected)
+
+    # A term spanning two of a podcast's category names matches neither of them.
+    podcast = next(podcast for podcast in ilike_repo.get_podcasts() if len(podcast.categories) > 1)
+    names = fts_repo._session_cm.session.execute(text(
+        f"SELECT categories FROM {database_repository.SEARCH_TABLE} WHERE rowid = :podcast_id"),
+        {'podcast_id': podcast.id}).scalar().split(' | ')
+    spanning_term = f"{names[0][-2:]} | {names[1][:2]}"
+    assert ilike_repo.search_podcasts(spanning_term, "Category") == []
+    assert fts_repo.search_podcasts(spanning_term, "Category") == []
+    assert fts_repo.get_number_of_search_results(spanning_term, "Category") == 0
+
+    first_page = fts_repo.search_podcasts("radio", "Title", limit=10)
+    second_page = fts_repo.search_podcasts("radio", "Title", limit=10, offset=10)
+    assert len(first_page) == 10
+    assert not {podcast.id for podcast in first_page} & {podcast.id for podcast in second_page}
+
+
+def test_repository_full_text_search_follows_new_podcasts(session_factory):
+    repo = database_repository.SqlAlchemyRepository(session_factory, full_text_search=True)
+    repo.create_search_index()
+    assert repo.search_podcasts("zzyzx", "Title") == []
+
+    podcast = Podcast(repo.get_number_of_podcasts() + 1, Author(9999, "Zzyzx Author"), "The Zzyzx Show")
+    repo.add_podcast(podcast)
+    assert [found.id for found in repo.search_podcasts("zzyzx", "Title")] == [podcast.id]
+    assert [found.id for found in repo.search_podcasts("zzyzx author", "Author")] == [podcast.id]
+
+
+def test_pooled_engine_reuses_tuned_connections(tmp_path):
+    engine = database_repository.create_database_engine(f"sqlite:///{tmp_path / 'pooled.db'}", pool_mode='queue')
+
+    with engine.connect() as connection:
+        first_connection = connection.connection.dbapi_connection
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    with engine.connect() as connection:
+        assert connection.connection.dbapi_connection is first_connection
+    engine.dispose()
+
+    with pytest.raises(ValueError):
+        database_repository.create_database_engine(f"sqlite:///{tmp_path / 'pooled.db'}", pool_mode='static')
+
+
+def test_forked_worker_opens_its_own_connections(database_engine):
+    import os
+
+    engine = database_repository.create_database_engine(database_engine.url.render_as_string(), pool_mode='queue')
+    repo = database_repository.SqlAlchemyRepository(sessionmaker(autocommit=False, autoflush=True, bind=engine))
+    number_of_podcasts = repo.get_number_of_podcasts()
+    assert engine.pool.checkedin() == 1
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # The worker: nothing it does may raise past this point, or pytest would carry on in two processes.
+        try:
+            repo.reinitialise_after_fork()
+            inherited = engine.pool.checkedin()
+            result = f"{inherited} {repo.get_number_of_podcasts()}"
+        except BaseException as error:
+            result = repr(error)
+        os.write(write_end, result.encode())
+        os._exit(0)
+
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        result = pipe.read()
+    os.waitpid(pid, 0)
+
+    # The worker started from an empty pool, and the master's pooled connection still works after the worker exited.
+    assert result == f"0 {number_of_podcasts}"
+    repo.reset_session()
+    assert repo.get_number_of_podcasts() == number_of_podcasts
+    repo.close_session()
+    engine.dispose()
+
+
+def count_queries(engine, function):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = function()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+
+def test_browse_page_query_count_is_constant(session_factory):
+    repo = database_repository.SqlAlchemyRepository(session_factory)
+    engine = session_factory.kw['bind']
+
+    podcasts, queries = count_queries(engine, lambda: browse_services.get_podcasts(repo))
+    assert len(podcasts) == repo.get_number_of_podcasts()
+    # One query for podcasts joined with their authors, plus SELECT ... IN batches for the categories.
+    assert queries <= 4
+    assert podcasts[0]['categories'] == [category.name for category in repo.get_podcast(podcasts[0]['id']).categories]
+
+    # Without the plan every podcast lazily loads its categories on its own.
+    repo.reset_session()
+    _, lazy_queries = count_queries(engine, lambda: [podcast.categories[:] for podcast in repo.get_podcasts()])
+    assert lazy_queries > len(podcasts)
+
+
+def test_playlist_page_query_count_is_constant(session_factory):
+    repo = database_repository.SqlAlchemyRepository(session_factory)
+    engine = session_factory.kw['bind']
+    user = User(1, 'dave', '123456789')
+    repo.add_user(user)
+    for podcast_id in (1, 2, 3):
+        repo.add_to_user_playlist(user, repo.get_podcast(podcast_id))
+        repo.add_to_user_playlist(user, repo.get_podcast(podcast_id).episodes[0])
+    repo.reset_session()
+
+    episodes, episode_queries = count_queries(engine, lambda: playlist_services.get_user_episode_playlist(repo, 'dave'))
+    assert [episode['podcast_id'] for episode in episodes] == [1, 2, 3]
+    assert all(episode['author'] is not None for episode in episodes)
+    repo.reset_session()
+
+    podcasts, podcast_queries = count_queries(engine, lambda: playlist_services.get_user_podcast_playlist(repo, 'dave'))
+    assert [podcast['id'] for podcast in podcasts] == [1, 2, 3]
+    # User, playlist, then a single query for the items and what they show.
+    assert episode_queries <= 3 and podcast_queries <= 3
+
+
+def test_repository_keyset_pages_match_full_listing(database_repo):
+    all_ids = [podcast.id for podcast in database_repo.get_podcasts()]
+
+    first_page = database_repo.get_podcasts_page(None, 10, load=('author', 'categories'))
+    assert [podcast.id for podcast in first_page] == all_ids[:10]
+    assert [podcast.id for podcast in database_repo.get_podcasts_page(all_ids[9], 10)] == all_ids[10:20]
+    assert [podcast.id for podcast in database_repo.get_podcasts_page_before(None, 10)] == all_ids[-10:]
+    assert [podcast.id for podcast in database_repo.get_podcasts_page_before(all_ids[20], 10)] == all_ids[10:20]
+
+    episode_ids = sorted(episode.id for episode in database_repo.get_podcast(1).episodes)
+    assert [episode.id for episode in database_repo.get_episodes_page(1, None, 2)] == episode_ids[:2]
+    assert [episode.id for episode in database_repo.get_episodes_page(1, episode_ids[1], 3)] == episode_ids[2:5]
+    assert [episode.id for episode in database_repo.get_episodes_page_before(1, None, 2)] == episode_ids[-2:]
+
+
+def test_repository_reviews_for_podcast_use_index(database_repo, session_factory):
+    expected = [review for review in database_repo.get_reviews() if review.podcast.id == 1]
+    reviews = database_repo.get_reviews_for_podcast(1)
+    assert len(reviews) > 0 and reviews == expected
+    assert database_repo.get_reviews_for_podcast(1, limit=1, offset=1) == expected[1:2]
+    assert database_repo.get_number_of_reviews_for_podcast(1) == len(expected)
+    assert database_repo.get_reviews_for_podcast(3) == []
+
+    with session_factory.kw['bind'].connect() as connection:
+        plan = connection.execute(text("EXPLAIN QUERY PLAN SELECT * FROM reviews WHERE podcast_id = 1")).all()
+    assert 'ix_reviews_podcast_id' in ' '.join(row[-1] for row in plan)
+
+
+def test_repository_rating_summary_is_kept_in_step_with_reviews(database_repo):
+    before = database_repo.get_rating_summary(1)
+    assert before.count > 0
+
+    # A podcast object loaded before the review was added must not write stale counts back when merged later.
+    stale_podcast = database_repo.get_podcast(1)
+    user = database_repo.get_user('thorke')
+    database_repo.add_review(make_review("Five stars", user, stale_podcast, 5))
+    database_repo.add_podcast(stale_podcast)
+
+    summary = database_repo.get_rating_summary(1)
+    assert summary.count == before.count + 1
+    assert summary.total == before.total + 5
+    assert summary.histogram[5] == before.histogram[5] + 1
+    assert database_repo.get_rating_summary(3).count == 0
+
+
+def test_bulk_load_computes_rating_summaries(empty_session):
+    session_factory = sessionmaker(bind=empty_session.get_bind())
+    repo = database_repository.SqlAlchemyRepository(session_factory)
+    repository_populate.populate(get_project_root() / "tests" / "data", repo, database_mode=True)
+
+    # tests/data reviews podcast 1 twice, rated 1 and 5, and no other podcast.
+    summary = repo.get_rating_summary(1)
+    assert (summary.count, summary.total) == (2, 6)
+    assert summary.histogram == {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}
+    assert summary == RatingSummary(2, 6, [1, 0, 0, 0, 1])
+    assert repo.get_rating_summary(2) == RatingSummary()
+
+
+def test_replace_catalogue_keeps_user_data_of_remaining_podcasts(database_repo):
+    from podcast.adapters.datareader.csvdatareader import CSVDataReader
+
+    user = database_repo.get_user('thorke')
+    database_repo.add_review(make_review("Gone with the podcast", user, database_repo.get_podcast(100), 4))
+    reviews_of_podcast_1 = [(review.comment, review.rating) for review in database_repo.get_reviews_for_podcast(1)]
+    database_repo.reset_session()
+
+    data_path = get_project_root() / "tests" / "data"
+    reader = CSVDataReader(trusted=True)
+    reader.read_podcasts(data_path)
+    reader.podcasts_by_id[1].title = "D-Hour Radio Network Reloaded"
+    database_repo.replace_catalogue(reader.authors_by_name.values(), reader.categories_by_name.values(),
+                                    reader.podcasts_by_id.values(), reader.iter_episodes(data_path))
+    database_repo.reset_session()
+
+    assert database_repo.get_number_of_podcasts() == len(reader.podcasts_by_id)
+    assert database_repo.get_podcast(1).title == "D-Hour Radio Network Reloaded"
+    assert database_repo.get_podcast(100) is None
+    # Reviews of podcasts still in the catalogue stay, with their rating summaries; the others are removed.
+    assert [(review.comment, review.rating) for review in database_repo.get_reviews_for_podcast(1)] \
+        == reviews_of_podcast_1
+    assert database_repo.get_rating_summary(1).count == len(reviews_of_podcast_1)
+    assert all(review.podcast is not None for review in database_repo.get_reviews())
+    assert database_repo.get_user('thorke') is not None
+
+
+def test_repository_collections_are_ordered_sets(database_repo):
+    podcast = database_repo.get_podcast(1)
+    assert isinstance(podcast.episodes, OrderedSet) and isinstance(podcast.categories, OrderedSet)
+
+    user = User(3, 'dave', '123456789')
+    database_repo.add_user(user)
+    episode = podcast.episodes[0]
+    episode_id = episode.id
+    database_repo.add_to_user_playlist(user, episode)
+    database_repo.add_to_user_playlist(user, episode)
+    database_repo.reset_session()
+
+    # Adding the same episode twice leaves a single playlist row.
+    user = database_repo.get_user('dave')
+    assert [episode.id for episode in database_repo.get_user_episode_playlist(user)] == [episode_id]
+    database_repo.remove_from_user_playlist(user, database_repo.get_user_episode_playlist(user)[0])
+    database_repo.reset_session()
+    assert database_repo.get_user_episode_playlist(database_repo.get_user('dave')) == []
+
+
+def test_caching_repository_hands_cached_objects_to_later_sessions(database_repo, session_factory):
+    from podcast.adapters.caching_repository import CachingRepository
+
+    cached_repo = CachingRepository(database_repo)
+    page = cached_repo.get_podcasts_page(None, 3)
+    summary = cached_repo.get_rating_summary(1)
+    database_repo.reset_session()
+
+    # No queries for the cached results; the relationships not loaded before are loaded in the new session.
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(session_factory.kw['bind'], 'before_cursor_execute', listener)
+    try:
+        cached_page = cached_repo.get_podcasts_page(None, 3)
+        assert cached_page == page and statements == []
+        assert cached_page[0].author.name and len(cached_page[0].categories) > 0
+        assert cached_repo.get_rating_summary(1) == summary and len(statements) == 2
+    finally:
+        event.remove(session_factory.kw['bind'], 'before_cursor_execute', listener)
+
+    user = cached_repo.get_user('thorke')
+    cached_repo.add_review(make_review("Invalidated", user, cached_repo.get_podcast(1), 5))
+    assert cached_repo.get_rating_summary(1).count == summary.count + 1
+    assert cached_repo.cache_stats()['get_podcasts_page']['hits'] == 1
+
+
+def test_shared_cache_pages_follow_writes_of_other_processes(database_repo, tmp_path, monkeypatch):
+    from podcast.adapters import shared_cache
+    from podcast.adapters.caching_repository import CachingRepository
+    import podcast.show_description.services as show_services
+
+    path = tmp_path / 'shared-cache.db'
+    monkeypatch.setattr(shared_cache, 'instance', shared_cache.SharedCache(path))
+    page = show_services.get_podcast_page(database_repo, 1)
+    assert page['podcast']['author'] == database_repo.get_podcast(1).author.name
+
+    # Another worker, with its own connection to the cache file, adds a review.
+    other_worker = CachingRepository(database_repo, max_size=0, shared_cache=shared_cache.SharedCache(path))
+    assert show_services.get_podcast_page(other_worker, 1) == page
+    other_worker.add_review(make_review("Shared", other_worker.get_user('thorke'), other_worker.get_podcast(1), 5))
+    database_repo.reset_session()
+
+    assert show_services.get_podcast_page(database_repo, 1)['rating_summary'].count == \
+        page['rating_summary'].count + 1
+    assert shared_cache.instance.stats() == {'size': 1, 'hits': 1, 'misses': 2}
+
+
+def test_only_the_master_watches_the_catalogue_of_a_shared_database(database_repo, tmp_path, monkeypatch):
+    import podcast.adapters.repository as repo
+    from podcast.adapters import catalogue_reload
+    from podcast.adapters.memory_repository import MemoryRepository
+
+    master_watcher = catalogue_reload.CatalogueWatcher(tmp_path, interval=60)
+    monkeypatch.setattr(catalogue_reload, 'watcher', master_watcher)
+    monkeypatch.setattr(repo, 'repo_instance', database_repo)
+    catalogue_reload.restart_watcher_after_fork()
+    assert catalogue_reload.watcher is master_watcher
+
+    # Memory mode workers each have a catalogue of their own to reload.
+    monkeypatch.setattr(repo, 'repo_instance', MemoryRepository())
+    catalogue_reload.restart_watcher_after_fork()
+    assert catalogue_reload.watcher is not master_watcher and catalogue_reload.watcher.is_alive()
+    catalogue_reload.watcher.stop()
+
+
+def test_app_start_drops_pages_cached_by_the_previous_deployment(tmp_path, monkeypatch):
+    from sqlalchemy.orm import clear_mappers
+    from podcast import create_app
+    from podcast.adapters import shared_cache
+    import podcast.adapters.repository as repo
+
+    # The apps set these globals, which go back to what they were after the test.
+    monkeypatch.setattr(shared_cache, 'instance', None)
+    monkeypatch.setattr(repo, 'repo_instance', None)
+
+    config = {
+        'TESTING': False,
+        'REPOSITORY': 'database',
+        'TEST_DATA_PATH': get_project_root() / "tests" / "data",
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'deployed.db'}",
+        'SQLALCHEMY_POOL': 'null',
+        'SHARED_CACHE_PATH': str(tmp_path / 'shared-cache.db'),
+        'CATALOGUE_RELOAD_INTERVAL': 0,
+    }
+    clear_mappers()
+    create_app(config)
+    shared_cache.instance.get_or_compute('page', (shared_cache.CATALOGUE,), lambda: 'rendered by the old templates')
+    epoch = shared_cache.instance.versions((shared_cache.EPOCH,))
+
+    # Started again on the same database, which is not repopulated.
+    clear_mappers()
+    create_app(config)
+    assert shared_cache.instance.stats()['size'] == 0
+    assert shared_cache.instance.versions((shared_cache.EPOCH,)) != epoch
+    assert shared_cache.instance.get_or_compute('page', (shared_cache.CATALOGUE,), lambda: 'new') == 'new'
+
+
+def test_shared_cache_entries_are_not_computed_from_stale_process_caches(database_repo, tmp_path, monkeypatch):
+    from podcast.adapters import shared_cache
+    from podcast.adapters.caching_repository import CachingRepository
+    import podcast.show_description.services as show_services
+
+    # Two workers, each with its own repository cache and connection to the shared cache file.
+    path = tmp_path / 'shared-cache.db'
+    worker_a = CachingRepository(database_repo, shared_cache=shared_cache.SharedCache(path))
+    worker_b = CachingRepository(database_repo, shared_cache=shared_cache.SharedCache(path))
+
+    def page_of(worker):
+        monkeypatch.setattr(shared_cache, 'instance', worker.shared_cache)
+        database_repo.reset_session()
+        return show_services.get_podcast_page(worker, 1)
+
+    count = page_of(worker_b)['rating_summary'].count
+    worker_a.add_review(make_review("Fresh", worker_a.get_user('thorke'), worker_a.get_podcast(1), 5))
+
+    # Worker b's own cache still holds the old summary, but the shared entry is computed from the database.
+    assert page_of(worker_b)['rating_summary'].count == count + 1
+    assert page_of(worker_a)['rating_summary'].count == count + 1
@@ -160,4 +160,27 @@ def test_saving_of_review(empty_session):
     insert_review(empty_session, user_id, podcast_id)
 
     rows = list(empty_session.execute(text('SELECT user_id, podcast_id, rating, comment FROM reviews')))
-    assert rows == [(user_id, podcast_id, 5, "Great podcast!")]
\ No newline at end of file
+    assert rows == [(user_id, podcast_id, 5, "Great podcast!")]
+
+def test_slotted_classes_survive_mapping_and_clear_mappers(empty_session):
+    from sqlalchemy.orm import clear_mappers
+    from podcast.adapters.orm import map_model_to_tables
+
+    # Mapped instances keep their column values in the instrumented __dict__.
+    author = Author(1, "Mapped Author")
+    empty_session.add(author)
+    empty_session.commit()
+    assert empty_session.query(Author).one().name == "Mapped Author"
+
+    # Once unmapped the classes are plain domain classes again, keeping their attributes in slots, and can be mapped
+    # once more.
+    clear_mappers()
+    podcast = Podcast(1, Author(2, "Plain Author"), "Plain Podcast")
+    assert podcast.title == "Plain Podcast" and podcast.author.name == "Plain Author"
+    assert podcast.__dict__ == {} and podcast.author.__dict__ == {}
+    assert type(vars(Podcast)['_title']).__name__ == 'member_descriptor'
+    map_model_to_tables()
+    assert Podcast(2, Author(3, "Remapped"), "Remapped Podcast").title == "Remapped Podcast"
+    clear_mappers()
+    assert Podcast(3, Author(4, "Unmapped Again"), "Unmapped Podcast").__dict__ == {}
+    map_model_to_tables()
@@ -48,4 +48,32 @@ def test_database_populate_select_all_users(database_engine):
     name_of_users_table = inspector.get_table_names()[4]
 
     with database_engine.connect() as connection:
-        select_statement = select(mapper_registry.metadata.tables[name_of_users_table])
\ No newline at end of file
+        select_statement = select(mapper_registry.metadata.tables[name_of_users_table])
+
+def test_database_populate_bulk_loads_empty_database(empty_session):
+    from sqlalchemy import func
+    from sqlalchemy.orm import sessionmaker
+
+    from podcast.adapters import database_repository, repository_populate
+    from utils import get_project_root
+
+    session_factory = sessionmaker(bind=empty_session.get_bind())
+    repo = database_repository.SqlAlchemyRepository(session_factory)
+    stats = repository_populate.populate(get_project_root() / "tests" / "data", repo, True)
+
+    tables = mapper_registry.metadata.tables
+    with empty_session.get_bind().connect() as connection:
+        def count(table_name):
+            return connection.execute(select(func.count()).select_from(tables[table_name])).scalar()
+
+        assert count('podcasts') == 5
+        assert count('episodes') == 10
+        assert count('users') == 2
+        assert count('playlists') == 2
+        assert count('reviews') == 2
+        assert stats['rows'] == sum(count(table.name) for table in mapper_registry.metadata.sorted_tables)
+        assert stats['rows_per_second'] > 0
+
+    podcast = repo.get_podcast(1)
+    assert [episode.id for episode in repo.get_episodes(podcast)] == [1, 4, 8]
+    assert len(podcast.categories) == 2